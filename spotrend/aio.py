@@ -0,0 +1,290 @@
+import asyncio
+import time
+from spotrend.api import *
+from spotrend.client import *
+from spotrend.exceptions import *
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+
+class AsyncClient():
+    """
+    Asyncio counterpart of the Client. The requests are sent through a pooled aiohttp session
+    and a semaphore bounds the number of requests in flight, so a single event loop can
+    keep hundreds of calls running without threads. The credentials and the token are taken
+    from a regular Client, which is shared with any synchronous caller.
+    """
+
+    def __init__(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None,
+                 client: Client = None, concurrency: int = 100, limit_per_host: int = 100,
+                 connect_timeout: float = 3.05, read_timeout: float = 27, coalesce: bool = True, decoder=None,
+                 hooks: Hooks = None):
+        """
+        - Parameters:
+            - client (Client): the synchronous client owning the credentials and the token
+            - concurrency (int): maximum number of requests in flight
+            - limit_per_host (int): maximum number of pooled connections for each host
+            - connect_timeout (float): seconds to wait for the connection to be established
+            - read_timeout (float): seconds to wait for the server to send the response
+            - coalesce (bool): share a single request between identical GETs in flight
+            - decoder (str | callable): the JSON decoder of the responses, orjson if it is installed
+            - hooks (Hooks): the callbacks observing the requests, by default the hooks of the client
+        """
+        if aiohttp is None:
+            raise SpotrendRequestError(
+                'The asyncio client requires aiohttp. Please, install it with pip install aiohttp.')
+        self.client = client or registry.get_client(client_id, client_secret, redirect_uri)
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.session = None
+        self.semaphore = None
+        self.inflight = {} if coalesce else None
+        self.loads = get_decoder(decoder)
+        self.hooks = hooks if hooks is not None else self.client.hooks
+
+    @property
+    def token(self) -> dict:
+        return self.client.token
+
+    async def get_session(self):
+        """
+        Return the pooled aiohttp session, it is created on first use inside the running loop.
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, auto_decompress=True)
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self.session
+
+    async def get_token(self, tokens: TokenManager) -> dict:
+        """
+        Return a valid shared token, the refresh runs in a worker thread so the loop is not blocked.
+        """
+        token = tokens.token
+        if tokens.expiring(token):
+            token = await asyncio.get_running_loop().run_in_executor(None, tokens.refresh, token)
+        return token
+
+    async def refresh_token(self, tokens: TokenManager, expired: dict = None) -> dict:
+        """
+        Refresh the shared token once for all the callers that got the expired one.
+        - Parameters:
+            - tokens (TokenManager): the manager of the token
+            - expired (dict): the token rejected by the server, the refresh is skipped if it was already replaced
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, tokens.refresh, expired)
+
+    async def make_request(self, endpoint: str, method: str = "GET", params: dict = None, data: dict = None,
+                           fields: str = None) -> dict:
+        """
+        Make a request to the Spotify API.
+        The calls share the rate limiter of the synchronous client, so the 429 pauses are seen by both.
+        - Parameters:
+            - fields (str): optional projection of the response, sent as the fields parameter to
+            the endpoints supporting it and applied to the decoded response in any case
+        """
+        url = self.client.get_url(endpoint)
+        if fields is not None:
+            projection = Projection(fields)
+            if supports_fields(url):
+                params = dict(params or {}, fields=projection.fields)
+            return projection.apply(await self.make_request(url, method, params, data))
+        params = encode_params(params)
+        cache = self.client.cache if method == "GET" else None
+        if cache is not None:
+            content = cache.get(url, params, self.client.cache_namespace)
+            if content is not None:
+                self.hooks.emit("cache_hit", method=method, url=url, revalidated=False)
+                return decode_response(200, content, self.loads)
+        if method == "GET" and self.inflight is not None:
+            # identical lookups in flight await the same task, shielded from the cancellation of a single caller
+            key = (method, ResponseCache.get_key(url, params))
+            task = self.inflight.get(key)
+            if task is None:
+                task = self.inflight[key] = asyncio.ensure_future(self.send(url, method, params, data))
+                task.add_done_callback(lambda _: self.inflight.pop(key, None))
+            return await asyncio.shield(task)
+        return await self.send(url, method, params, data)
+
+    async def send(self, url: str, method: str = "GET", params: dict = None, data: dict = None) -> dict:
+        """
+        Send a request with the retry policy of the rate limiter and the conditional and cached GETs.
+        """
+        session = await self.get_session()
+        tokens = self.client.get_tokens(url, method)
+        cache = self.client.cache if method == "GET" else None
+        etags = self.client.etags if method == "GET" else None
+        validator = etags.get(url, params, self.client.cache_namespace) if etags is not None else None
+        rate_limiter = self.client.rate_limiter
+        refreshed = False
+        attempt = 0
+        while True:
+            await asyncio.sleep(rate_limiter.reserve())
+            token = await self.get_token(tokens)
+            headers = self.get_headers(token)
+            if validator is not None:
+                headers["If-None-Match"] = validator[0]
+            self.hooks.emit("before_send", method=method, url=url, params=params, attempt=attempt)
+            try:
+                async with self.semaphore:
+                    start = time.perf_counter()
+                    async with session.request(method, url, headers=headers, params=params, json=data) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        etag = response.headers.get("ETag")
+                        content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if attempt >= rate_limiter.max_retries:
+                    raise SpotrendConnectionError(f"Cannot reach the Spotify API: {error}") from error
+                delay = rate_limiter.backoff(attempt)
+                self.hooks.emit("retry", method=method, url=url, status=None, delay=delay, attempt=attempt, error=error)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.hooks.emit("after_response", method=method, url=url, status=status,
+                            elapsed=time.perf_counter() - start, size=len(content), attempt=attempt)
+            if status == 401 and not refreshed:
+                await self.refresh_token(tokens, token)
+                refreshed = True
+                continue
+            delay = rate_limiter.retry_delay(status, retry_after, attempt)
+            if delay is None:
+                if status == 304 and validator is not None:
+                    etags.revalidated()
+                    self.hooks.emit("cache_hit", method=method, url=url, revalidated=True)
+                    status, content = 200, validator[1]
+                elif status == 200 and etags is not None and etag:
+                    etags.set(url, params, etag, content, self.client.cache_namespace)
+                result = decode_response(status, content, self.loads)
+                if cache is not None and status == 200:
+                    cache.set(url, params, content, self.client.cache_namespace)
+                return result
+            self.hooks.emit("retry", method=method, url=url, status=status, delay=delay, attempt=attempt, error=None)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def get_headers(token: dict) -> dict:
+        return {
+            "Authorization": f"Bearer {token['access_token']}"
+        }
+
+    async def close(self) -> None:
+        """
+        Close the pooled aiohttp session.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncSpotrend(Spotrend):
+    """
+    Spotrend facade returning awaitables. It has the same methods of Spotrend, each one
+    sends its request through an AsyncClient and has to be awaited.
+    """
+
+    def __init__(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None,
+                 client: AsyncClient = None, concurrency: int = 100):
+        self.client = client or AsyncClient(client_id, client_secret, redirect_uri, concurrency=concurrency)
+        self.version = "v1"
+        self.dispatcher = None
+        self.models = False
+
+    async def put_resource(self, resource_id: str, resource_type: str, params: dict = None) -> bool:
+        endpoint = f"{resource_type}/{resource_id}"
+        if resource_type not in items or resource_id == None:
+            raise SpotrendInvalidDataError('The type of data is invalid.')
+        return await self.client.make_request(endpoint=endpoint, method="PUT", params=params) != None
+
+    async def _batch(self, lookup_ids: list, endpoint: str, request, merge):
+        lookup_ids, positions = normalize_ids(lookup_ids, self._id_type(endpoint))
+        chunks = self._chunks(lookup_ids, endpoint)
+        results = await asyncio.gather(*(request(chunk) for chunk in chunks))
+        return expand(merge(chunks, results), positions)
+
+    async def _fan_out(self, markets, request, merge):
+        if markets == "all":
+            markets = (await self.get_available_markets())["markets"]
+        markets = list(dict.fromkeys(markets))
+        results = await asyncio.gather(*(request(market) for market in markets))
+        return merge(markets, results)
+
+    async def _iter_items(self, page_request, key: str = None):
+        following = None
+        try:
+            page = await page_request()
+            while page:
+                if key is not None:
+                    page = page[key]
+                following = asyncio.ensure_future(self.client.make_request(page["next"])) if page.get("next") else None
+                for item in page.get("items", []):
+                    yield item
+                page = await following if following is not None else None
+        finally:
+            if following is not None and not following.done():
+                following.cancel()
+
+    async def expand_playlist_items(self, playlist_id: str, market: str = None, hydrate: tuple = (),
+                                    concurrency: int = None, buffer: int = None):
+        concurrency = concurrency or 8
+        buffer = max(buffer or 2 * concurrency, 1)
+        hydrate, known = self._hydration(hydrate)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(offset: int) -> list:
+            async with semaphore:
+                page = await self.get_playlist_items(playlist_id, market=market, limit=100, offset=offset)
+            return page, await self._hydrate_items(page.get("items", []), hydrate, known, market)
+
+        first, items = await fetch(0)
+        for item in items:
+            yield item
+        offsets = iter(range(len(first.get("items", [])), first.get("total", 0), 100))
+        if first.get("next") is None or not first.get("items"):
+            return
+        pending = deque(asyncio.ensure_future(fetch(offset)) for offset in islice(offsets, buffer))
+        try:
+            while pending:
+                _, items = await pending.popleft()
+                for offset in islice(offsets, 1):
+                    pending.append(asyncio.ensure_future(fetch(offset)))
+                for item in items:
+                    yield item
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _hydrate_items(self, items: list, hydrate: tuple, known: dict, market: str = None) -> list:
+        for type, lookup_ids in self._hydration_ids(items, hydrate, known).items():
+            params = {"market": market} if type == "albums" and market is not None else {}
+            fetched = await self._batch(lookup_ids, type, lambda ids, type=type, params=params: self.client.make_request(
+                type, method="GET", params=dict(params, ids=ids)), self._merge_resources(type))
+            known[type].update(zip(lookup_ids, fetched[type]))
+        return self._hydrated(items, known)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def __enter__(self):
+        # close is a coroutine here, a plain with block could not await it
+        raise TypeError("AsyncSpotrend is an asynchronous context manager, use async with")
+
+    def __exit__(self, *exc):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
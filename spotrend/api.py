@@ -1,19 +1,45 @@
-import logging
 from spotrend.client import *
 from spotrend.pattern import *
 from spotrend.exceptions import *
-import re
+from spotrend.batching import *
+from spotrend.models import *
+from spotrend.markets import *
+from spotrend.ids import *
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 
-logging.basicConfig(
-    format='%(asctime)s - %(levelname)s: %(message)s')
+class Spotrend():
 
+    def __init__(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None, client: Client = None,
+                 max_workers: int = 8, grant: str = "authorization_code", batching: bool = False,
+                 batch_window: float = 0.005, models: bool = False, fan_out_workers: int = 32,
+                 token_file: str = "token.json"):
+        # the clients of the registry are keyed by user through their token file, and share one connection pool
+        self.client = client or registry.get_client(client_id, client_secret, redirect_uri, grant=grant,
+                                                    token_file=token_file)
+        self.version = "v1"
+        self.max_workers = max_workers
+        self.fan_out_workers = fan_out_workers
+        # opt-in: single albums, artists, episodes and tracks lookups are merged in several-items calls
+        self.dispatcher = BatchDispatcher(self, window=batch_window) if batching else None
+        # opt-in: resources are returned as compact models of spotrend.models instead of dicts
+        self.models = models
 
-class Spotrend(metaclass=Singleton):
+    def close(self) -> None:
+        """
+        Release the pooled connections used by the underlying client
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        self.client.close()
 
-    def __init__(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None, client: Client = None):
-        self.client = client or Client(client_id, client_secret, redirect_uri)
-        self.version = "v1"
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def get_available_markets(self) -> dict:
         """
@@ -149,9 +175,23 @@ class Spotrend(metaclass=Singleton):
         params = {}
         if market != None:
             params['market'] = market
-        endpoint = f"https://api.spotify.com/{self.version}/artists/{artist_id}/top-tracks"
+        endpoint = f"artists/{normalize_id(artist_id, 'artists')}/top-tracks"
         return self.client.make_request(endpoint, method="GET", params=params)
 
+    def get_artist_top_tracks_by_market(self, artist_id: str, markets="all") -> MarketMatrix:
+        """
+        Get the top tracks of an artist in several markets, the markets are requested concurrently
+        - Parameters:
+            - artist_id (str): urn, uri or id of the artist
+            - markets (list): the ISO 3166-1 alpha-2 country codes, "all" for every available market
+        - Returns:
+            - MarketMatrix: the distinct top tracks and their rank in each market
+        """
+        artist_id = normalize_id(artist_id, "artists")
+        return self._fan_out(markets, lambda market: self.get_artist_top_tracks(artist_id, market=market),
+                             lambda markets, results: MarketMatrix.from_lists(
+                                 markets, [(result or {}).get("tracks") for result in results]))
+
     def get_artist_related_artist(self, artist_id : str) -> dict:
         """
             Get Spotify catalog information about artists similar to a given artist. 
@@ -165,7 +205,7 @@ class Spotrend(metaclass=Singleton):
             the official Spotify API documentation at:  
             https://developer.spotify.com/documentation/web-api/reference/#/operations/get-an-artists-related-artists
         """
-        endpoint = f"https://api.spotify.com/{self.version}/artists/{artist_id}/related-artists"
+        endpoint = f"artists/{normalize_id(artist_id, 'artists')}/related-artists"
         return self.client.make_request(endpoint, method="GET")
 
     def get_album_tracks(self, album_id: str, market: str = None, limit: int = 20, offset: int = 0) -> dict:
@@ -189,9 +229,22 @@ class Spotrend(metaclass=Singleton):
         if limit < 0 or limit > 50:
             raise SpotrendQuotaError(
                 'The limit of 50 exceeded. Please, try with another limit.')
-        endpoint = f"https://api.spotify.com/{self.version}/albums/{album_id}/tracks"
+        endpoint = f"albums/{normalize_id(album_id, 'albums')}/tracks"
         return self.client.make_request(endpoint, method="GET", params=params)
 
+    def iter_album_tracks(self, album_id: str, market: str = None, limit: int = 50):
+        """
+        Iterate over all the tracks of an album, the pages are fetched lazily following the next cursor
+        - Parameters:
+            - album_id (str) : the urn, uri or id of the album
+            - market (str) : optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - limit (int): The number of items of each page. Default: 50. Minimum: 1. Maximum: 50.
+        - Returns:
+            - generator : the Spotify simplified track objects of the album
+        """
+        album_id = normalize_id(album_id, "albums")
+        return self._iter_items(lambda: self.get_album_tracks(album_id, market=market, limit=limit))
+
     def get_user_saved_albums(self, limit: int = 20, market: str = None, offset: int = 0) -> dict:
         """
         Return the user saved albums 
@@ -211,25 +264,35 @@ class Spotrend(metaclass=Singleton):
         if limit < 0 or limit > 50:
             raise SpotrendQuotaError(
                 'The limit of 50 exceeded. Please, try with another limit.')
-        endpoint = f"https://api.spotify.com/{self.version}/me/albums"
+        endpoint = "me/albums"
         return self.client.make_request(endpoint, method="GET", params=params)
 
+    def iter_user_saved_albums(self, market: str = None, limit: int = 50):
+        """
+        Iterate over all the saved albums of the current user, the pages are fetched lazily following the next cursor
+        - Parameters:
+            - market (str): optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - limit (int): The number of items of each page. Default: 50. Minimum: 1. Maximum: 50.
+        - Returns:
+            - generator : the saved album objects of the current logged user
+        """
+        return self._iter_items(lambda: self.get_user_saved_albums(limit=limit, market=market))
+
     def save_albums_for_current_user(self, album_ids: list = []) -> dict:
         """
         Save albums for the current user inside the "Your Music" libraries
         - Parameters:
           - album_ids (list): list of albums ids to save in the "Your Music" library
         - Returns:
-            - dict:  The status code of the saving operation
+            - bool: True if every chunk of albums was saved
         - Documentation:
             - If you want to check the structure of the response, check 
             the official Spotify API documentation at:  
             https://developer.spotify.com/documentation/web-api/reference/#/operations/save-albums-user
         """
-        data = {"ids": album_ids}
-        params = data
-        endpoint = f"https://api.spotify.com/{self.version}/me/albums"
-        return self.client.make_request(endpoint, method="PUT", params=params, data=data)
+        endpoint = "me/albums"
+        return self._batch(album_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="PUT", params={"ids": ids}, data={"ids": ids}), self._merge_status)
 
     def remove_user_saved_album(self, album_ids: list = []) -> dict:
         """
@@ -237,16 +300,15 @@ class Spotrend(metaclass=Singleton):
         - Parameters:
           - album_ids (list): list of albums ids to save in the "Your Music" library
         - Returns:
-            - dict:  The status code of the saving operation
+            - bool: True if every chunk of albums was removed
         - Documentation:
             - If you want to check the structure of the response, check 
             the official Spotify API documentation at:  
             https://developer.spotify.com/documentation/web-api/reference/#/operations/save-albums-user
         """   
-        data = {"ids": album_ids}
-        params = data
-        endpoint = f"https://api.spotify.com/{self.version}/me/albums"
-        return self.client.make_request(endpoint, method="DELETE", params=params, data=data)
+        endpoint = "me/albums"
+        return self._batch(album_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="DELETE", params={"ids": ids}, data={"ids": ids}), self._merge_status)
 
     def check_user_saved_albums(self, albums_ids: list = []) -> list:
         """
@@ -260,9 +322,9 @@ class Spotrend(metaclass=Singleton):
             the official Spotify API documentation at:  
             https://developer.spotify.com/documentation/web-api/reference/#/operations/check-users-saved-albums
         """
-        params = {"ids": albums_ids}
-        endpoint = "https://api.spotify.com/v1/me/albums/contains"
-        return self.client.make_request(endpoint, method="GET", params=params)
+        endpoint = "me/albums/contains"
+        return self._batch(albums_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="GET", params={"ids": ids}), self._merge_flags)
 
     def get_new_releases(self, country: str = None, limit: int = 20, offset: int = 0) -> dict:
         """
@@ -285,9 +347,33 @@ class Spotrend(metaclass=Singleton):
         if limit < 0 or limit > 50:
             raise SpotrendQuotaError(
                 'The limit of 50 exceeded. Please, try with another limit.')
-        endpoint = "https://api.spotify.com/v1/browse/new-releases"
+        endpoint = "browse/new-releases"
         return self.client.make_request(endpoint, method="GET", params=params)
 
+    def get_new_releases_by_market(self, markets="all", limit: int = 20) -> MarketMatrix:
+        """
+        Get the new album releases of several markets, the markets are requested concurrently
+        - Parameters:
+            - markets (list): the ISO 3166-1 alpha-2 country codes, "all" for every available market
+            - limit (int): The maximum number of albums of each market. Default: 20. Minimum: 1. Maximum: 50.
+        - Returns:
+            - MarketMatrix: the distinct albums and their rank in each market
+        """
+        return self._fan_out(markets, lambda market: self.get_new_releases(country=market, limit=limit),
+                             lambda markets, results: MarketMatrix.from_lists(
+                                 markets, [(result or {}).get("albums", {}).get("items") for result in results]))
+
+    def iter_new_releases(self, country: str = None, limit: int = 50):
+        """
+        Iterate over all the new album releases, the pages are fetched lazily following the next cursor
+        - Parameters:
+            - country (str): optional ISO 3166-1 alpha-2 country code of the releases
+            - limit (int): The number of items of each page. Default: 50. Minimum: 1. Maximum: 50.
+        - Returns:
+            - generator : the Spotify simplified album objects of the new releases
+        """
+        return self._iter_items(lambda: self.get_new_releases(country=country, limit=limit), key="albums")
+
     def get_playlist(self, playlist_id, additional_type: str = None, fields: str = None, market: str = None) -> dict:
         """
         Return an object with playlist information
@@ -304,11 +390,11 @@ class Spotrend(metaclass=Singleton):
         param = {}
         if additional_type != None and additional_type.lower() in ("track", "episode"):
             param["additional_type"] = additional_type.lower()
-        if fields != None and self._field_regex(fields):
-            param['fields'] = fields.lower()
+        if fields != None and not self._field_regex(fields):
+            fields = None
         if market != None:
             param['market'] = market
-        return self.get_resource(playlist_id, "playlists", params=param)
+        return self.get_resource(playlist_id, "playlists", params=param, fields=fields)
 
     def get_several_playlists(self, playlist_ids: list = [], additional_type: str = None, fields: str = None, market: str = None) -> dict:
         """
@@ -326,11 +412,90 @@ class Spotrend(metaclass=Singleton):
         param = {}
         if additional_type != None and additional_type.lower() in ("track", "episode"):
             param["additional_type"] = additional_type.lower()
-        if fields != None and self._field_regex(fields):
-            param['fields'] = fields.lower()
+        if fields != None and not self._field_regex(fields):
+            fields = None
         if market != None:
             param['market'] = market
-        return self.get_several_resources(playlist_ids, "playlists", params=param)
+        return self.get_several_resources(playlist_ids, "playlists", params=param, fields=fields)
+
+    def get_playlist_items(self, playlist_id: str, market: str = None, limit: int = 20, offset: int = 0,
+                           fields: str = None) -> dict:
+        """
+        Return the items of a playlist
+        - Parameters:
+            - playlist_id (str) : the urn, uri or id of the playlist
+            - market (str) : optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - fields (str) : optional projection of the paging object, e.g. total,items(added_at,track(id,name))
+            - limit (int): The maximum number of items to return. Default: 20. Minimum: 1. Maximum: 100.
+            - offset (int): The index of the first item to return. Default: 0 (the first item). Use with limit to get
+            the next set of items.
+        - Returns:
+            - dict : paging object of the playlist track objects
+        - Documentation:
+            - If you want to check the structure of the response, check
+            the official Spotify API documentation at:
+            https://developer.spotify.com/documentation/web-api/reference/#/operations/get-playlists-tracks
+        """
+        param = {"limit": limit, "offset": offset}
+        if market != None:
+            param['market'] = market
+        if limit < 0 or limit > 100:
+            raise SpotrendQuotaError(
+                'The limit of 100 exceeded. Please, try with another limit.')
+        return self.get_resource(playlist_id, "playlists", params=param, fields=fields, path="tracks")
+
+    def iter_playlist_items(self, playlist_id: str, market: str = None, limit: int = 100):
+        """
+        Iterate over all the items of a playlist, the pages are fetched lazily following the next cursor
+        - Parameters:
+            - playlist_id (str) : the urn, uri or id of the playlist
+            - market (str) : optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - limit (int): The number of items of each page. Default: 100. Minimum: 1. Maximum: 100.
+        - Returns:
+            - generator : the playlist track objects, holding added_at and the track
+        """
+        return self._iter_items(lambda: self.get_playlist_items(playlist_id, market=market, limit=limit))
+
+    def expand_playlist_items(self, playlist_id: str, market: str = None, hydrate: tuple = (), concurrency: int = None,
+                              buffer: int = None):
+        """
+        Iterate over all the items of a playlist in order, fetching the pages concurrently. The first
+        page gives tracks.total, the following offset windows are requested in parallel and held in a
+        bounded reorder buffer until the items before them are yielded.
+        - Parameters:
+            - playlist_id (str) : the urn, uri or id of the playlist
+            - market (str) : optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - hydrate (tuple): replace the simplified objects of the tracks with the full ones, fetched
+            in batches: artists, albums or both
+            - concurrency (int): number of pages requested at the same time. Default: max_workers.
+            - buffer (int): maximum number of pages requested ahead of the one being yielded. Default: 2 * concurrency.
+        - Returns:
+            - generator : the playlist track objects, holding added_at and the track
+        """
+        concurrency = concurrency or self.max_workers
+        buffer = max(buffer or 2 * concurrency, 1)
+        hydrate, known = self._hydration(hydrate)
+
+        def fetch(offset: int) -> list:
+            page = self.get_playlist_items(playlist_id, market=market, limit=100, offset=offset)
+            return page, self._hydrate_items(page.get("items", []), hydrate, known, market)
+
+        first, items = fetch(0)
+        yield from items
+        offsets = iter(range(len(first.get("items", [])), first.get("total", 0), 100))
+        if first.get("next") is None or not first.get("items"):
+            return
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = deque(executor.submit(fetch, offset) for offset in islice(offsets, buffer))
+            try:
+                while pending:
+                    _, items = pending.popleft().result()
+                    for offset in islice(offsets, 1):
+                        pending.append(executor.submit(fetch, offset))
+                    yield from items
+            finally:
+                for future in pending:
+                    future.cancel()
 
     def get_episode(self, episode_id, market: str = None) -> dict:
         """
@@ -376,9 +541,9 @@ class Spotrend(metaclass=Singleton):
         - Returns:
             - bool : True if the operation was successful, False otherwise
         """
-        params = {"ids": episode_ids}
-        endpoint = "https://api.spotify.com/v1/me/episodes"
-        return self.client.make_request(endpoint, method="PUT", params=params)
+        endpoint = "me/episodes"
+        return self._batch(episode_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="PUT", params={"ids": ids}), self._merge_status)
     
     def remove_user_saved_episodes(self, episode_ids: list = []) -> bool:
         """
@@ -392,9 +557,9 @@ class Spotrend(metaclass=Singleton):
             the official Spotify API documentation at:
             https://developer.spotify.com/documentation/web-api/reference/#/operations/remove-user-saved-episodes
         """
-        params = {"ids": episode_ids}
-        endpoint = "https://api.spotify.com/v1/me/episodes"
-        return self.client.make_request(endpoint, method="DELETE", params=params)
+        endpoint = "me/episodes"
+        return self._batch(episode_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="DELETE", params={"ids": ids}), self._merge_status)
     
     def check_user_saved_episodes(self, episodes_ids: list = []) -> list:
         """
@@ -408,9 +573,9 @@ class Spotrend(metaclass=Singleton):
             the official Spotify API documentation at:
             https://developer.spotify.com/documentation/web-api/reference/#/operations/check-user-saved-episodes
         """
-        params = {"ids": episodes_ids}
-        endpoint = "https://api.spotify.com/v1/me/episodes/contains"
-        return self.client.make_request(endpoint, method="GET", params=params)
+        endpoint = "me/episodes/contains"
+        return self._batch(episodes_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="GET", params={"ids": ids}), self._merge_flags)
         
     def get_chapter(self, chapter_id, market: str = None) -> dict:
         """
@@ -475,17 +640,35 @@ class Spotrend(metaclass=Singleton):
         - Returns:
             - dict : the logged account profile information
         """
-        endpoint = f"https://api.spotify.com/{self.version}/me"
+        endpoint = "me"
         return self.client.make_request(endpoint, method="GET")
     
-    def get_user_saved_shows(self):
+    def get_user_saved_shows(self, limit: int = 20, offset: int = 0):
         """
         Get current user saved shows
+        - Parameters:
+            - limit (int): The maximum number of items to return. Default: 20. Minimum: 1. Maximum: 50.
+            - offset (int): The index of the first item to return. Default: 0 (the first item). Use with limit to get
+            the next set of items.
         - Returns:
             - dict : the logged account profile information
         """
-        endpoint = f"https://api.spotify.com/{self.version}/me/shows"
-        return self.client.make_request(endpoint, method="GET")
+        params = {"limit": limit, "offset": offset}
+        if limit < 0 or limit > 50:
+            raise SpotrendQuotaError(
+                'The limit of 50 exceeded. Please, try with another limit.')
+        endpoint = "me/shows"
+        return self.client.make_request(endpoint, method="GET", params=params)
+
+    def iter_user_saved_shows(self, limit: int = 50):
+        """
+        Iterate over all the saved shows of the current user, the pages are fetched lazily following the next cursor
+        - Parameters:
+            - limit (int): The number of items of each page. Default: 50. Minimum: 1. Maximum: 50.
+        - Returns:
+            - generator : the saved show objects of the current logged user
+        """
+        return self._iter_items(lambda: self.get_user_saved_shows(limit=limit))
 
     def get_show(self, show_id : str, market: str = None) -> dict:
         """
@@ -523,12 +706,15 @@ class Spotrend(metaclass=Singleton):
             param['market'] = market
         return self.get_several_resources(show_ids, "shows", params=param)
     
-    def get_show_episodes(self, show_id : str, market: str = None) -> dict:
+    def get_show_episodes(self, show_id : str, market: str = None, limit: int = 20, offset: int = 0) -> dict:
         """
         Return a list with episode of input showe
         - Parameters:
             - show_id (str) : the urn, uri or id of the show
             - market (str) : optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - limit (int): The maximum number of items to return. Default: 20. Minimum: 1. Maximum: 50.
+            - offset (int): The index of the first item to return. Default: 0 (the first item). Use with limit to get
+            the next set of items.
         - Returns:
             - dict : collection of Spotify show information
         - Documentation:
@@ -536,10 +722,25 @@ class Spotrend(metaclass=Singleton):
             the official Spotify API documentation at:  
             https://developer.spotify.com/documentation/web-api/reference/#/operations/get-a-shows-episodes
         """
-        param = {}
+        param = {"limit": limit, "offset": offset}
         if market!= None:
             param['market'] = market
-        return self.get_resource(f"{show_id}/episodes", "shows", params=param)
+        if limit < 0 or limit > 50:
+            raise SpotrendQuotaError(
+                'The limit of 50 exceeded. Please, try with another limit.')
+        return self.get_resource(show_id, "shows", params=param, path="episodes")
+
+    def iter_show_episodes(self, show_id : str, market: str = None, limit: int = 50):
+        """
+        Iterate over all the episodes of a show, the pages are fetched lazily following the next cursor
+        - Parameters:
+            - show_id (str) : the urn, uri or id of the show
+            - market (str) : optional parameter for data filtering on a specific ISO 3166-1 alpha-2 country code
+            - limit (int): The number of items of each page. Default: 50. Minimum: 1. Maximum: 50.
+        - Returns:
+            - generator : the Spotify simplified episode objects of the show
+        """
+        return self._iter_items(lambda: self.get_show_episodes(show_id, market=market, limit=limit))
     
     def put_show_for_current_user(self, show_ids : list) -> bool:
         """
@@ -552,9 +753,9 @@ class Spotrend(metaclass=Singleton):
             the official Spotify API documentation at: 
             https://developer.spotify.com/documentation/web-api/reference/#/operations/add-shows-to-my-saved-shows
         """
-        if len(show_ids) > 50:
-            raise SpotrendQuotaError("The maximum number of shows is 50")
-        return self.client.make_request(f"https://api.spotify.com/{self.version}/me/shows", method="PUT", params=json.dumps(show_ids))
+        endpoint = "me/shows"
+        return self._batch(show_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="PUT", params={"ids": ids}), self._merge_status)
 
     def delete_show_from_current_user(self, show_ids : list) -> bool:
         """
@@ -569,9 +770,9 @@ class Spotrend(metaclass=Singleton):
             go to the official Spotify API documentation:
             https://developer.spotify.com/documentation/general/guides/authorization/code-flow/
         """
-        if len(show_ids) > 50:
-            raise SpotrendQuotaError("The maximum number of shows is 50")
-        return self.client.make_request(f"https://api.spotify.com/{self.version}/me/shows", method="DELETE", params=json.dumps(show_ids)) != None
+        endpoint = "me/shows"
+        return self._batch(show_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="DELETE", params={"ids": ids}), self._merge_status)
 
     def check_user_saved_shows(self, show_ids : list) -> list:
         """
@@ -584,18 +785,188 @@ class Spotrend(metaclass=Singleton):
             - If you want to check the structure of the response, check the official Spotify API documentation:
             https://developer.spotify.com/documentation/web-api/reference/#/operations/check-users-saved-shows
         """
-        if len(show_ids) > 50:
-            raise SpotrendQuotaError("The maximum number of shows is 50")
-        return self.client.make_request(f"https://api.spotify.com/{self.version}/me/shows/contains", method="GET", params=json.dumps(show_ids))
+        endpoint = "me/shows/contains"
+        return self._batch(show_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="GET", params={"ids": ids}), self._merge_flags)
     
+    def _iter_items(self, page_request, key: str = None):
+        """
+        Yield the items of a paged response following the next cursor. While the items of a page
+        are consumed the next page is already requested, and only these two pages are held in memory.
+        - Parameters:
+            - page_request (callable): function requesting the first page
+            - key (str): optional key wrapping the paging object in the response, e.g. albums
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            following = None
+            try:
+                page = page_request()
+                while page:
+                    if key is not None:
+                        page = page[key]
+                    following = executor.submit(self.client.make_request, page["next"]) if page.get("next") else None
+                    yield from page.get("items", [])
+                    page = following.result() if following is not None else None
+            finally:
+                if following is not None:
+                    following.cancel()
+
+    @staticmethod
+    def _hydration(hydrate: tuple) -> tuple:
+        """
+        Check the objects to hydrate in the playlist items, and return them with an empty store of the fetched ones
+        """
+        hydrate = (hydrate,) if isinstance(hydrate, str) else tuple(hydrate)
+        if any(type not in ("artists", "albums") for type in hydrate):
+            raise SpotrendInvalidDataError('Only the artists and the albums of the tracks can be hydrated.')
+        return hydrate, {type: {} for type in hydrate}
+
+    def _hydrate_items(self, items: list, hydrate: tuple, known: dict, market: str = None) -> list:
+        """
+        Return the playlist items with the full artists and albums of their tracks, the objects
+        missing from the store are fetched with the several-items endpoints
+        """
+        for type, lookup_ids in self._hydration_ids(items, hydrate, known).items():
+            params = {"market": market} if type == "albums" and market is not None else {}
+            fetched = self._batch(lookup_ids, type, lambda ids, type=type, params=params: self.client.make_request(
+                type, method="GET", params=dict(params, ids=ids)), self._merge_resources(type))
+            known[type].update(zip(lookup_ids, fetched[type]))
+        return self._hydrated(items, known)
+
+    @staticmethod
+    def _hydration_ids(items: list, hydrate: tuple, known: dict) -> dict:
+        """
+        Return the ids of the artists and albums of the items not fetched yet
+        """
+        missing = {type: {} for type in hydrate}
+        for item in items:
+            track = item.get("track") if item else None
+            if not track or track.get("type") != "track" or track.get("is_local"):
+                continue
+            if "artists" in missing:
+                for artist in track.get("artists") or ():
+                    if artist.get("id") and artist["id"] not in known["artists"]:
+                        missing["artists"][artist["id"]] = None
+            if "albums" in missing:
+                album = track.get("album") or {}
+                if album.get("id") and album["id"] not in known["albums"]:
+                    missing["albums"][album["id"]] = None
+        return {type: list(lookup_ids) for type, lookup_ids in missing.items() if lookup_ids}
+
+    @staticmethod
+    def _hydrated(items: list, known: dict) -> list:
+        """
+        Return copies of the items whose tracks point to the fetched artists and albums
+        """
+        if not known:
+            return items
+        artists, albums = known.get("artists", {}), known.get("albums", {})
+        hydrated = []
+        for item in items:
+            track = item.get("track") if item else None
+            if not track or track.get("type") != "track":
+                hydrated.append(item)
+                continue
+            track = dict(track)
+            if artists and track.get("artists"):
+                track["artists"] = [artists.get(artist.get("id")) or artist for artist in track["artists"]]
+            if albums and track.get("album"):
+                track["album"] = albums.get(track["album"].get("id")) or track["album"]
+            hydrated.append(dict(item, track=track))
+        return hydrated
+
+    def _batch(self, lookup_ids: list, endpoint: str, request, merge):
+        """
+        Split the ids by the maximum size accepted by the endpoint, send the chunks
+        concurrently on a bounded pool of workers and merge the responses in input order
+        - Parameters:
+            - lookup_ids (list): the ids of the batch request
+            - endpoint (str): the endpoint used to look up the maximum batch size
+            - request (callable): function sending the request for a single chunk of ids
+            - merge (callable): function merging the chunks and their responses
+        """
+        lookup_ids, positions = normalize_ids(lookup_ids, self._id_type(endpoint))
+        chunks = self._chunks(lookup_ids, endpoint)
+        if len(chunks) <= 1:
+            results = [request(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                results = list(executor.map(request, chunks))
+        return expand(merge(chunks, results), positions)
+
+    @staticmethod
+    def _id_type(endpoint: str) -> str:
+        """
+        Return the resource type of the ids sent to an endpoint, e.g. me/albums/contains -> albums
+        """
+        return [segment for segment in endpoint.split("/") if segment not in ("me", "contains")][-1]
+
+    def _fan_out(self, markets, request, merge):
+        """
+        Send a request for each market concurrently and merge the responses in market order.
+        The requests share the rate limiter of the client, so the fan-out is throttled with the other calls.
+        - Parameters:
+            - markets (list): the ISO 3166-1 alpha-2 country codes, "all" for every available market
+            - request (callable): function sending the request of a single market
+            - merge (callable): function merging the markets and their responses
+        """
+        if markets == "all":
+            markets = self.get_available_markets()["markets"]
+        markets = list(dict.fromkeys(markets))
+        if not markets:
+            return merge(markets, [])
+        with ThreadPoolExecutor(max_workers=min(self.fan_out_workers, len(markets))) as executor:
+            results = list(executor.map(request, markets))
+        return merge(markets, results)
+
+    @staticmethod
+    def _chunks(lookup_ids: list, endpoint: str) -> list:
+        """
+        Split the ids in chunks of the maximum size accepted by the endpoint
+        """
+        size = batch_limits.get(endpoint, 20)
+        lookup_ids = list(lookup_ids)
+        return [lookup_ids[i:i + size] for i in range(0, len(lookup_ids), size)]
+
+    @staticmethod
+    def _merge_resources(key: str):
+        """
+        Merge the several-resources responses in a single object
+        """
+        def merge(chunks: list, results: list) -> dict:
+            merged = []
+            for result in results:
+                merged.extend(result[key])
+            return {key: merged}
+        return merge
+
+    @staticmethod
+    def _merge_flags(chunks: list, results: list) -> list:
+        """
+        Concatenate the boolean lists of the contains endpoints
+        """
+        merged = []
+        for result in results:
+            merged.extend(result)
+        return merged
+
+    @staticmethod
+    def _merge_status(chunks: list, results: list) -> bool:
+        """
+        True once the request of every chunk succeeded, a failed chunk raises the error of the client
+        """
+        return True
+
     @staticmethod
     def _field_regex(fields: str) -> bool:
         """
-        Regex checker for the fields parameter available in some params
+        Checker for the fields parameter available in some params, see Projection for the syntax
         """
-        # limited control caused by pumping-lemma
-        pattern = re.compile(r"(\w+\.)?\w+\(\w+(\,\w+)*\)")
-        return bool(pattern.match(fields))
+        try:
+            Projection(fields)
+        except SpotrendInvalidDataError:
+            return False
+        return True
 
     def put_resource(self, resource_id: str, resource_type: str, params: dict = None) -> bool:
         """
@@ -612,21 +983,24 @@ class Spotrend(metaclass=Singleton):
             go to the official Spotify API documentation:
             https://developer.spotify.com/documentation/general/guides/authorization/code-flow/
         """
-        endpoint = f"https://api.spotify.com/{self.version}/{resource_type}/{resource_id}?"
-        if type not in items or resource_id == None:
+        endpoint = f"{resource_type}/{resource_id}?"
+        if resource_type not in items or resource_id == None:
             raise SpotrendInvalidDataError('The type of data is invalid.')
         if endpoint[-1] == '?':
             endpoint = endpoint[:-1]
         result : dict = self.client.make_request(endpoint=endpoint, method="PUT", params=params)
         return result != None
     
-    def get_resource(self, lookup_id: str, type: str,  params: dict = {}) -> dict:
+    def get_resource(self, lookup_id: str, type: str,  params: dict = {}, fields: str = None,
+                     path: str = None) -> dict:
         """
         Fundamental method to retrieve a resource of a specific type with optional param
         - Parameters:
             - lookup_id (str): the lookup id of the resource
             - type (str): the type of the resource
             - params (dict): a dictionary key-value for the input param fields
+            - fields (str): optional projection of the response, see Projection for the syntax
+            - path (str): optional sub-resource of the resource, e.g. episodes for shows/{id}/episodes
         - Returns:
             - dict : object with information about the required resource
         - Documentation:
@@ -635,16 +1009,25 @@ class Spotrend(metaclass=Singleton):
             go to the official Spotify API documentation:
             https://developer.spotify.com/documentation/general/guides/authorization/code-flow/
         """
-        endpoint = f"https://api.spotify.com/{self.version}/{type}/{lookup_id}?"
         if type not in items or lookup_id == None:
             raise SpotrendInvalidDataError('The type of data is invalid.')
-        if endpoint[-1] == '?':
-            endpoint = endpoint[:-1]
-        return self.client.make_request(endpoint=endpoint, method="GET", params=params)
+        if type in id_types.values():
+            lookup_id = normalize_id(lookup_id, type)
+        if self.dispatcher is not None and type in batchable and path is None and set(params) <= {"market"} \
+                and fields is None:
+            result = self.dispatcher.get(type, lookup_id, params)
+        else:
+            endpoint = f"{type}/{lookup_id}" if path is None else f"{type}/{lookup_id}/{path}"
+            options = {"fields": fields} if fields is not None else {}
+            result = self.client.make_request(endpoint=endpoint, method="GET", params=params, **options)
+        if self.models and path is None:
+            return parse(result, type)
+        return result
 
     def put_several_resources(self, resource_ids: list, resource_type: str, params : dict = {}) -> bool:
         """
-        Fundamental method to put several resources of a specific type with optional parameters
+        Fundamental method to put several resources of a specific type with optional parameters.
+        The ids are split by the maximum size accepted by the endpoint and the chunks are sent concurrently.
         - Parameters:
             - resource_ids (list): list of urn, uri or id of the resources
             - resource_type (str): the type of the resource
@@ -657,24 +1040,23 @@ class Spotrend(metaclass=Singleton):
             go to the official Spotify API documentation:
             https://developer.spotify.com/documentation/general/guides/authorization/code-flow/
         """
-        if len(resource_ids) == 0 or type not in items:
+        if len(resource_ids) == 0 or resource_type not in items:
             raise SpotrendInvalidDataError(
                 'You need to specify a spotify ID, URI or URL.')
-        elif len(resource_ids) > 20:
-            raise SpotrendQuotaError(
-                'The maximum size of ids is 20 different items')
-        endpoint = f"https://api.spotify.com/{self.version}/{resource_type}"
-        params['ids'] = resource_ids
-        return self.client.make_request(endpoint, method="PUT", params=params) != None
+        endpoint = resource_type
+        return self._batch(resource_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="PUT", params=dict(params, ids=ids)), self._merge_status)
         
-    def get_several_resources(self, lookup_ids: list[str], type: str, params: dict = {}) -> dict:
+    def get_several_resources(self, lookup_ids: list[str], type: str, params: dict = {}, fields: str = None) -> dict:
         """
         Fundamental method to retrieve a batch response on multiple resources request
-        of a specific type with optional param
+        of a specific type with optional param. The ids are split by the maximum size
+        accepted by the endpoint and the chunks are requested concurrently.
         - Parameters:
             - lookup_ids (list): the lookup ids related to the batch resources
             - type (str): the type of the resource
             - params (dict): a dictionary key-value for the input param fields
+            - fields (str): optional projection of each resource, see Projection for the syntax
         - Returns:
             - dict : object with information about the required resource
         - Documentation:
@@ -686,12 +1068,13 @@ class Spotrend(metaclass=Singleton):
         if len(lookup_ids) == 0 or type not in items:
             raise SpotrendInvalidDataError(
                 'You need to specify a spotify ID, URI or URL.')
-        elif len(lookup_ids) > 20:
-            raise SpotrendQuotaError(
-                'The maximum size of ids is 20 different items')
-        endpoint = f"https://api.spotify.com/{self.version}/{type}"
-        params['ids'] = lookup_ids
-        return self.client.make_request(endpoint, method="GET", params=params)
+        endpoint = type
+        options = {"fields": f"{type}({fields})"} if fields is not None else {}
+        result = self._batch(lookup_ids, endpoint, lambda ids: self.client.make_request(
+            endpoint, method="GET", params=dict(params, ids=ids), **options), self._merge_resources(type))
+        if self.models:
+            return {type: [parse(item, type) for item in result[type]]}
+        return result
 
     def get_available_resource(self, type: str) -> dict:
         """
@@ -703,6 +1086,6 @@ class Spotrend(metaclass=Singleton):
         - Returns:
             - dict : an object with the list of available resource's items
         """
-        endpoint = f"https://api.spotify.com/{self.version}/{type}"
+        endpoint = type
         return self.client.make_request(endpoint, method="GET")
 
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from spotrend.items import *
+from spotrend.exceptions import *
+
+# resource types whose several-items endpoint returns the same object of the single-item one
+batchable = ("albums", "artists", "episodes", "tracks")
+
+
+class BatchDispatcher():
+    """
+    Micro-batching dispatcher merging single-resource lookups into several-resources calls.
+    The lookups of the same type and params are collected for a short window, or until the
+    maximum batch size of the endpoint is reached, and sent as one /tracks?ids=... request;
+    each caller then receives its own item.
+    """
+
+    def __init__(self, spotrend, window: float = 0.005, max_workers: int = 4):
+        """
+        - Parameters:
+            - spotrend (Spotrend): the facade sending the several-resources requests
+            - window (float): seconds a batch waits for other lookups before being sent
+            - max_workers (int): number of batches sent concurrently
+        """
+        self.spotrend = spotrend
+        self.window = window
+        self.pending = {}
+        self.deadlines = {}
+        self.closed = False
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="spotrend-batching", daemon=True)
+        self._worker.start()
+
+    def submit(self, type: str, lookup_id: str, params: dict = None) -> Future:
+        """
+        Enqueue a lookup in the batch of its type and params
+        - Returns:
+            - Future: resolved with the resource object
+        """
+        if type not in batchable:
+            raise SpotrendInvalidDataError(f'The type {type} cannot be batched.')
+        future = Future()
+        key = (type, tuple(sorted((params or {}).items())))
+        with self._condition:
+            if self.closed:
+                raise SpotrendRequestError('The dispatcher has been closed.')
+            batch = self.pending.setdefault(key, [])
+            batch.append((lookup_id, future))
+            if len(batch) == 1:
+                self.deadlines[key] = time.monotonic() + self.window
+            if len(batch) >= batch_limits[type]:
+                self._dispatch(key)
+            self._condition.notify()
+        return future
+
+    def get(self, type: str, lookup_id: str, params: dict = None) -> dict:
+        """
+        Look up a resource through the next batch of its type and wait for it
+        """
+        return self.submit(type, lookup_id, params).result()
+
+    def close(self) -> None:
+        """
+        Send the pending batches and stop the dispatcher
+        """
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            for key in list(self.pending):
+                self._dispatch(key)
+            self._condition.notify()
+        self._worker.join()
+        self.executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self.closed:
+                if not self.deadlines:
+                    self._condition.wait()
+                    continue
+                key, deadline = min(self.deadlines.items(), key=lambda item: item[1])
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                self._dispatch(key)
+
+    def _dispatch(self, key: tuple) -> None:
+        # called holding the condition lock
+        batch = self.pending.pop(key)
+        del self.deadlines[key]
+        self.executor.submit(self._flush, key, batch)
+
+    def _flush(self, key: tuple, batch: list) -> None:
+        type, params = key
+        lookup_ids = list(dict.fromkeys(lookup_id for lookup_id, _ in batch))
+        try:
+            response = self.spotrend.get_several_resources(lookup_ids, type, params=dict(params))
+            resources = dict(zip(lookup_ids, response[type]))
+        except BaseException as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for lookup_id, future in batch:
+            resource = resources.get(lookup_id)
+            if resource is None:
+                future.set_exception(SpotrendNotFoundError(f'The {type} {lookup_id} does not exist.'))
+            else:
+                future.set_result(resource)
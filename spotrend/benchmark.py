@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from spotrend.api import *
+from spotrend.mock import *
+from spotrend.ratelimit import RateLimiter
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# benchmarks run by default, in order
+benchmarks = ("single_get", "several_get", "pagination", "token_refresh", "bulk_export")
+
+
+def percentiles(samples: list) -> dict:
+    """
+    Return the p50, p95 and p99 of a list of durations in milliseconds
+    """
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+def peak_rss() -> int:
+    """
+    Return the peak resident set size of the process in KiB, None if it cannot be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class Benchmark():
+    """
+    Benchmarks of the hot paths of Spotrend and Client against the MockSpotifyServer. Each
+    benchmark reports the requests per second sent to the server, the latency percentiles of
+    its operations, the bytes allocated by Python during the run and the peak RSS.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, concurrency: int = 8, scale: float = 1.0,
+                 seed: int = 0):
+        """
+        - Parameters:
+            - latency (float): seconds added by the server to every response
+            - error_rate (float): fraction of the requests failing with a 503
+            - concurrency (int): number of threads sending the operations
+            - scale (float): multiplier of the number of operations of each benchmark
+            - seed (int): seed of the catalog and of the injected errors
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.concurrency = concurrency
+        self.scale = scale
+        self.seed = seed
+
+    def run(self, names: list = None) -> dict:
+        """
+        Run the benchmarks and return the results with the configuration and the environment
+        """
+        names = list(names or benchmarks)
+        results = {}
+        with MockSpotifyServer(tracks=self.count(5000), albums=self.count(200), artists=self.count(200),
+                               playlists=2, latency=self.latency, error_rate=self.error_rate, seed=self.seed) as mock:
+            for name in names:
+                client = mock.client(rate_limiter=RateLimiter(rate=None, backoff_base=0.01, backoff_cap=0.1),
+                                     transport=Transport(pool_maxsize=self.concurrency))
+                try:
+                    results[name] = getattr(self, f"bench_{name}")(mock, Spotrend(client=client))
+                finally:
+                    client.transport.close()
+        return {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"latency": self.latency, "error_rate": self.error_rate, "concurrency": self.concurrency,
+                       "scale": self.scale, "seed": self.seed},
+            "results": results,
+        }
+
+    def count(self, size: int) -> int:
+        return max(1, int(size * self.scale))
+
+    def bench_single_get(self, mock: MockSpotifyServer, spotrend: Spotrend) -> dict:
+        track_ids = list(mock.tracks)[:self.count(1000)]
+        return self.measure(mock, [lambda track_id=track_id: spotrend.get_track(track_id) for track_id in track_ids])
+
+    def bench_several_get(self, mock: MockSpotifyServer, spotrend: Spotrend) -> dict:
+        track_ids = list(mock.tracks)
+        chunks = [track_ids[start:start + 500] for start in range(0, len(track_ids), 500)]
+        return self.measure(mock, [lambda chunk=chunk: spotrend.get_several_tracks(chunk) for chunk in chunks])
+
+    def bench_pagination(self, mock: MockSpotifyServer, spotrend: Spotrend) -> dict:
+        album_ids = list(mock.albums)[:self.count(100)]
+        return self.measure(mock, [lambda album_id=album_id: sum(1 for _ in spotrend.iter_album_tracks(album_id, limit=10))
+                                   for album_id in album_ids])
+
+    def bench_token_refresh(self, mock: MockSpotifyServer, spotrend: Spotrend) -> dict:
+        # each round revokes the token, then a burst of concurrent requests finds it expired
+        artist_ids = list(mock.artists)[:self.concurrency]
+        return self.measure(mock, [lambda artist_id=artist_id: spotrend.get_artist(artist_id) for artist_id in artist_ids],
+                            rounds=self.count(20), before_round=mock.expire_tokens)
+
+    def bench_bulk_export(self, mock: MockSpotifyServer, spotrend: Spotrend) -> dict:
+        from spotrend.data import DataImport
+        track_ids = list(mock.tracks)
+        rows = []
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "tracks.parquet")
+
+            def export():
+                stream = (spotrend.get_several_tracks(track_ids[start:start + 1000])
+                          for start in range(0, len(track_ids), 1000))
+                rows.append(DataImport("tracks", batch_size=2000).to_parquet(stream, path))
+
+            result = self.measure(mock, [export])
+        result["rows"] = rows[0] if rows else 0
+        result["rows_per_second"] = round(result["rows"] / result["seconds"], 1) if result["seconds"] else None
+        return result
+
+    def measure(self, mock: MockSpotifyServer, operations: list, rounds: int = 1, before_round=None) -> dict:
+        """
+        Run the operations on the thread pool and measure them. The operations run twice: the
+        timings are taken on the first run and the allocations on the second one, under tracemalloc.
+        - Parameters:
+            - operations (list): the callables measured, each one is an operation
+            - rounds (int): number of times the operations are run
+            - before_round (callable): optional function called before each round
+        """
+        latencies = []
+        errors = []
+
+        def timed(operation):
+            start = time.perf_counter()
+            try:
+                operation()
+            except Exception as error:
+                errors.append(error)
+            latencies.append(time.perf_counter() - start)
+
+        def run() -> None:
+            for _ in range(rounds):
+                if before_round is not None:
+                    before_round()
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    list(executor.map(timed, operations))
+
+        requests, tokens = sum(mock.statuses.values()), mock.calls["api/token"]
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        requests, tokens = sum(mock.statuses.values()) - requests, mock.calls["api/token"] - tokens
+        result = dict({
+            "operations": len(operations) * rounds,
+            "errors": len(errors),
+            "requests": requests,
+            "token_requests": tokens,
+            "seconds": round(seconds, 4),
+            "requests_per_second": round(requests / seconds, 1) if seconds else None,
+        }, **percentiles(latencies))
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_allocated_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        result["peak_rss_kib"] = peak_rss()
+        return result
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """
+    Compare two benchmark results
+    - Parameters:
+        - baseline (dict): the results of the reference release
+        - current (dict): the results to check
+        - tolerance (float): relative change accepted before a metric is a regression
+    - Returns:
+        - list: a description of each regression
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        checks = [("requests_per_second", -1), ("p95_ms", 1), ("p99_ms", 1), ("peak_allocated_bytes", 1)]
+        for metric, direction in checks:
+            before, after = reference.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if change * direction > tolerance:
+                regressions.append(f"{name}.{metric}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark spotrend against a local mock of the Spotify API")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of the requests failing with 503")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of threads sending the operations")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the size of the benchmarks")
+    parser.add_argument("--only", nargs="*", choices=benchmarks, help="benchmarks to run, all by default")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file of the results")
+    parser.add_argument("--compare", help="JSON file of baseline results, regressions make the exit status 1")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change accepted by --compare")
+    args = parser.parse_args(argv)
+    results = Benchmark(latency=args.latency, error_rate=args.error_rate, concurrency=args.concurrency,
+                        scale=args.scale).run(args.only)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    for name, result in results["results"].items():
+        print(f"{name:<14} {result['requests_per_second']:>10} req/s  p50 {result['p50_ms']} ms  "
+              f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for regression in regressions:
+            print(f"regression {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
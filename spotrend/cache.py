@@ -0,0 +1,333 @@
+import sqlite3
+import threading
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+# seconds each resource type is kept in the cache, 0 disables the cache for the resource
+default_ttls = {
+    "markets": 86400,
+    "genres": 86400,
+    "artists": 3600,
+    "albums": 3600,
+    "tracks": 3600,
+    "shows": 3600,
+    "episodes": 3600,
+    "audiobooks": 3600,
+    "chapters": 3600,
+    "browse": 3600,
+    "playlists": 300,
+    "users": 300,
+    "me": 0,
+}
+
+
+class CacheBackend(ABC):
+    """
+    Storage of the cached payloads. A backend maps a string key on the raw response
+    content and drops the entries after their ttl, a backend missing one of the methods
+    cannot be instantiated.
+    """
+
+    def __init__(self):
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache bounded by the number of entries.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class SqliteCache(CacheBackend):
+    """
+    On-disk cache stored in a sqlite database, the least recently used entries are
+    evicted when the number of entries exceeds maxsize. The entries are counted once when
+    the database is opened and then tracked on each write, the count is not shared with
+    other processes writing the same file.
+    """
+
+    def __init__(self, path: str = "spotrend-cache.sqlite", maxsize: int = 100000):
+        super().__init__()
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self.count = self.connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: str) -> bytes:
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                self.count -= self.connection.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+                return None
+            self.connection.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            # a lookup on the primary key tells a new entry from a replaced one
+            exists = self.connection.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, expires, now))
+            if exists is None:
+                self.count += 1
+            excess = self.count - self.maxsize
+            if excess > 0:
+                evicted = self.connection.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                    (excess,)).rowcount
+                self.count -= evicted
+                self.evictions += evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self.count -= self.connection.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM cache")
+            self.count = 0
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared between processes stored in Redis, the ttl of the entries is handled
+    by Redis and the eviction by the maxmemory-policy of the server.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "spotrend:", client=None):
+        super().__init__()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> bytes:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float = None) -> None:
+        if ttl is None:
+            self.client.set(self.prefix + key, value)
+        else:
+            self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+
+class ResponseCache():
+    """
+    Opt-in cache of the GET responses of the Spotify API. The entries are keyed on the
+    namespace of the client, the endpoint and the normalized params (market included) and
+    expire after the ttl of their resource type, so a backend shared by the clients of
+    several users never serves the responses of a user to another one.
+    """
+
+    def __init__(self, backend: CacheBackend = None, ttls: dict = None):
+        """
+        - Parameters:
+            - backend (CacheBackend): the storage of the payloads, by default an in-memory LRU
+            - ttls (dict): seconds each resource type is kept, merged on top of the default ones
+        """
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = dict(default_ttls, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(url: str, params: dict = None, namespace: str = None) -> str:
+        """
+        Normalize the url and the params in a cache key
+        - Parameters:
+            - namespace (str): the client owning the entry, see Client.cache_namespace
+        """
+        parsed = urllib.parse.urlsplit(url)
+        query = urllib.parse.parse_qsl(parsed.query) + list((params or {}).items())
+        query = urllib.parse.urlencode(sorted((key, str(value)) for key, value in query))
+        key = f"{parsed.netloc}{parsed.path}?{query}"
+        return f"{namespace} {key}" if namespace else key
+
+    def get_ttl(self, url: str) -> float:
+        """
+        Return the ttl of the resource type of the url, None if the type is unknown
+        """
+        segments = urllib.parse.urlsplit(url).path.strip("/").split("/")
+        if segments and segments[0] == "v1":
+            segments = segments[1:]
+        if not segments:
+            return None
+        if segments[:2] == ["recommendations", "available-genre-seeds"]:
+            return self.ttls.get("genres")
+        return self.ttls.get(segments[0])
+
+    def get(self, url: str, params: dict = None, namespace: str = None) -> bytes:
+        """
+        Return the cached payload of a request, None on a miss
+        """
+        if not self.get_ttl(url):
+            return None
+        value = self.backend.get(self.get_key(url, params, namespace))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, url: str, params: dict, value: bytes, namespace: str = None) -> None:
+        """
+        Store the payload of a request according to the ttl of its resource type
+        """
+        ttl = self.get_ttl(url)
+        if ttl:
+            self.backend.set(self.get_key(url, params, namespace), value, ttl)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the hit, miss and eviction counters of the cache
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "size": len(self.backend),
+        }
+
+
+class ETagStore():
+    """
+    Store of the ETag validators of the GET responses. The stored body is sent back when the
+    server answers 304 Not Modified to a conditional request with If-None-Match.
+    """
+
+    def __init__(self, backend: CacheBackend = None):
+        """
+        - Parameters:
+            - backend (CacheBackend): the storage of the validators, by default an in-memory LRU
+        """
+        self.backend = backend if backend is not None else MemoryCache(maxsize=4096)
+        self.revalidations = 0
+        self.modifications = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: dict = None, namespace: str = None) -> tuple:
+        """
+        Return the (etag, body) stored for a request, None if there is no validator
+        """
+        value = self.backend.get(ResponseCache.get_key(url, params, namespace))
+        if value is None:
+            return None
+        etag, _, content = value.partition(b"\n")
+        return etag.decode(), content
+
+    def set(self, url: str, params: dict, etag: str, content: bytes, namespace: str = None) -> None:
+        """
+        Store the validator and the body of a response
+        """
+        with self._lock:
+            self.modifications += 1
+        self.backend.set(ResponseCache.get_key(url, params, namespace), etag.encode() + b"\n" + content)
+
+    def revalidated(self) -> None:
+        """
+        Count a response served from the store after a 304
+        """
+        with self._lock:
+            self.revalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "revalidations": self.revalidations,
+            "modifications": self.modifications,
+            "evictions": self.backend.evictions,
+        }
@@ -1,5 +1,5 @@
-import logging
 import base64
+import time
 import requests
 import os
 import json
@@ -12,10 +12,12 @@ from six.moves import BaseHTTPServer
 from spotrend.items import *
 from spotrend.exceptions import *
 from spotrend.pattern import *
-
-
-logging.basicConfig(
-    format='%(asctime)s - %(levelname)s: %(message)s')
+from spotrend.transport import *
+from spotrend.ratelimit import *
+from spotrend.cache import *
+from spotrend.tokens import *
+from spotrend.decoding import *
+from spotrend.hooks import Hooks
 
 
 def authenticate(func):
@@ -29,6 +31,64 @@ def authenticate(func):
     return wrapper
 
 
+def encode_params(params: dict = None) -> dict:
+    """
+    Encode the query parameters as expected by the Spotify API: lists are sent
+    as comma separated values and empty values are dropped.
+    """
+    if not params:
+        return None
+    encoded = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ",".join(map(str, value))
+        elif isinstance(value, bool):
+            value = str(value).lower()
+        encoded[key] = str(value)
+    return encoded
+
+
+def raise_for_status(status: int, content: bytes = None) -> None:
+    """
+    Map an unsuccessful response of the Spotify API on the Spotrend exceptions.
+    """
+    if 200 <= status < 400:
+        return
+    message = f"Request failed with status code {status}"
+    try:
+        error = json.loads(content)["error"]
+        message = f"{message}: {error['message'] if isinstance(error, dict) else error}"
+    except (TypeError, ValueError, KeyError):
+        pass
+    if status == 400:
+        raise SpotrendInvalidDataError(message)
+    if status == 401:
+        raise SpotrendAuthError(message)
+    if status == 403:
+        raise SpotrendPermissionError(message)
+    if status == 404:
+        raise SpotrendNotFoundError(message)
+    if status == 429:
+        raise SpotrendQuotaError(message)
+    if status >= 500:
+        raise SpotrendServerError(message)
+    raise SpotrendRequestError(message)
+
+
+def decode_response(status: int, content: bytes = None, loads=json.loads) -> dict:
+    """
+    Decode the payload of a Spotify API response, an empty successful response is decoded as an empty dict.
+    - Parameters:
+        - loads (callable): the JSON decoder of the payload
+    """
+    raise_for_status(status, content)
+    if not content:
+        return {}
+    return loads(content)
+
+
 class ServerAuthHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
     def do_GET(self):
@@ -42,7 +102,7 @@ class ServerAuthHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         self.server.server_close()
 
 
-class ServerAuth(BaseHTTPServer.HTTPServer, metaclass=Singleton):
+class ServerAuth(BaseHTTPServer.HTTPServer):
 
     def __init__(self):
         self.port = 8080
@@ -62,21 +122,51 @@ class ServerAuth(BaseHTTPServer.HTTPServer, metaclass=Singleton):
         self.handle_request()
 
 
-class Client(metaclass=Singleton):
+class Client():
+    """
+    Client of the Spotify Web API. The authorization is lazy: a cached token is reused and the
+    authorization code flow only runs the first time a request needs a user token. With the
+    client_credentials grant the catalog endpoints are served by an application token, so the
+    client works headless and only the user-scoped endpoints need the authorization code flow.
+    """
 
-    def __init__(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None, default : bool = True):
+    def __init__(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None, default : bool = True,
+                 transport: Transport = None, rate_limiter: RateLimiter = None,
+                 cache: ResponseCache = None, etags: ETagStore = None,
+                 grant: str = "authorization_code", token_file: str = "token.json", coalesce: bool = True,
+                 decoder=None, hooks: Hooks = None):
         load_dotenv()
         self.client_id = client_id or os.getenv('SPOTREND_CLIENT_ID')
         self.client_secret = client_secret or os.getenv(
             'SPOTREND_CLIENT_SECRET')
         self.redirect_uri = redirect_uri or os.getenv('SPOTREND_REDIRECT_URI')
-        self.token_file = "token.json"
-        self.token = None
+        if grant not in ("authorization_code", "client_credentials"):
+            raise SpotrendAuthError(f"Unsupported grant {grant}")
+        self.grant = grant
+        self.token_file = token_file
+        self.tokens = TokenManager(self.renew_token, self.token_file)
+        self.app_tokens = TokenManager(self.renew_app_token, None)
         self.scope = ' '.join(list(scopes))
         self.authorization_code = None
-        self.server = ServerAuth()
-        self.oauth2()
+        self.default = default
+        self.api_url = "https://api.spotify.com/v1"
+        self.accounts_url = "https://accounts.spotify.com"
+        self.transport = transport or Transport()
+        self.owns_transport = transport is None
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache
+        self.etags = etags
+        self.inflight = SingleFlight() if coalesce else None
+        self.loads = get_decoder(decoder)
+        self.hooks = hooks if hooks is not None else Hooks()
+        # the cached responses of a user are only served back to the clients of the same token
+        self.cache_namespace = f"{self.client_id}:{token_file if token_file is not None else id(self)}"
+        self.server = None
+        self.tokens.load()
 
+    @property
+    def token(self) -> dict:
+        return self.tokens.token
 
     @authenticate
     def get_authorization_url(self) -> str:
@@ -94,11 +184,8 @@ class Client(metaclass=Singleton):
         return url
 
     def get_resource_header(self):
-        if self.token is None or int(self.token["expires_in"]) <= 0:
-            self.refresh_token()
-
         headers = {
-            "Authorization": f"Bearer {self.token['access_token']}"
+            "Authorization": f"Bearer {self.get_tokens(self.api_url).access_token}"
         }
         return headers
 
@@ -109,9 +196,13 @@ class Client(metaclass=Singleton):
             - SpotrendAuthError - in case there is some troubleshooting with the authentication in the client level
         """
         auth_url = self.get_authorization_url()
+        self.server = ServerAuth()
         if not self.default:
             webbrowser.open(auth_url)
-        self.server.start()
+        try:
+            self.server.start()
+        finally:
+            self.server.server_close()
         self.authorization_code = self.server.authorization_code
         self.request_token()
 
@@ -119,71 +210,233 @@ class Client(metaclass=Singleton):
         """
         Request an access token for the Spotify API using the authorization code.
         """
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {base64.b64encode(f'{self.client_id}:{self.client_secret}'.encode()).decode()}"
-        }
         data = {
             "grant_type": "authorization_code",
             "code": self.authorization_code,
             "redirect_uri": self.redirect_uri
         }
-        response = requests.post(
-            "https://accounts.spotify.com/api/token", headers=headers, data=data)
-        print(response.text)
-        if response.status_code == 200:
-            self.token = response.json()
-            with open(self.token_file, "w") as f:
-                json.dump(self.token, f)
-        else:
-            raise Exception(
-                f"Request failed with status code {response.status_code}")
+        # the authorization code can be exchanged only once
+        self.authorization_code = None
+        self.tokens.update(self.post_token(data))
 
     def refresh_token(self) -> None:
         """
         Refresh the access token for the Spotify API.
         """
-        if self.token is None:
-            self.request_token()
+        self.tokens.refresh(self.tokens.token)
 
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {base64.b64encode(f'{self.client_id}:{self.client_secret}'.encode()).decode()}"
-        }
+    def renew_token(self, token: dict = None) -> dict:
+        """
+        Issue a new user token for the token manager: the refresh token is used when available,
+        otherwise the authorization code flow is started.
+        - Parameters:
+            - token (dict): the current token
+        - Returns:
+            - dict: the token response of the Spotify accounts service
+        """
+        if token is None or "refresh_token" not in token:
+            if self.authorization_code is None:
+                self.oauth2()
+            else:
+                self.request_token()
+            return self.tokens.token
         data = {
             "grant_type": "refresh_token",
-            "refresh_token": self.token["refresh_token"]
+            "refresh_token": token["refresh_token"]
         }
-        response = requests.post(
-            "https://accounts.spotify.com/api/token", headers=headers, data=data)
-        if response.status_code == 200:
-            self.token = response.json()
-            with open(self.token_file, "w") as f:
-                json.dump(self.token, f)
-        else:
-            raise Exception(
-                f"Refresh failed with status code {response.status_code}")
-
-    def make_request(self, endpoint: str, method: str = "GET", params: dict = None, data: dict = None) -> dict:
+        return self.post_token(data)
+
+    @authenticate
+    def renew_app_token(self, token: dict = None) -> dict:
         """
-        Make a request to the Spotify API.
+        Issue a new application token with the client credentials grant, no user interaction is needed.
         """
-        if self.token is None or int(self.token["expires_in"]) <= 0:
-            self.refresh_token()
+        return self.post_token({"grant_type": "client_credentials"})
 
+    def get_tokens(self, url: str, method: str = "GET") -> TokenManager:
+        """
+        Return the token manager authorizing a request: the user-scoped endpoints always need
+        the user token, the catalog ones use the application token in client_credentials mode
+        unless a user token is already available.
+        """
+        if self.grant == "client_credentials" and self.tokens.token is None and not self.is_user_scoped(url, method):
+            return self.app_tokens
+        return self.tokens
+
+    def is_user_scoped(self, url: str, method: str = "GET") -> bool:
+        """
+        True if the request acts on behalf of the user, i.e. the /me endpoints and any write request
+        """
+        path = urllib.parse.urlsplit(self.get_url(url)).path
+        prefix = urllib.parse.urlsplit(f"{self.api_url}/me").path
+        return method != "GET" or path == prefix or path.startswith(f"{prefix}/")
+
+    def post_token(self, data: dict) -> dict:
+        """
+        Send a token request to the Spotify accounts service.
+        - Excepts:
+            - SpotrendAuthError - the accounts service refused the token request
+        """
         headers = {
-            "Authorization": f"Bearer {self.token['access_token']}"
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {base64.b64encode(f'{self.client_id}:{self.client_secret}'.encode()).decode()}"
         }
-        url = f"https://api.spotify.com/v1/{endpoint}"
-        response = requests.request(
-            method, url, headers=headers, params=params, json=data)
-        if response.status_code == 401:
-            self.refresh_token()
+        start = time.perf_counter()
+        response = self.transport.post(
+            f"{self.accounts_url}/api/token", headers=headers, data=data)
+        self.hooks.emit("token_refresh", grant=data["grant_type"], status=response.status_code,
+                        elapsed=time.perf_counter() - start)
+        if response.status_code != 200:
+            raise SpotrendAuthError(
+                f"Token request failed with status code {response.status_code}")
+        return response.json()
+
+    def make_request(self, endpoint: str, method: str = "GET", params: dict = None, data: dict = None,
+                     fields: str = None) -> dict:
+        """
+        Make a request to the Spotify API.
+        The calls are throttled by the shared rate limiter, the 429 responses are retried after
+        their Retry-After delay and the 5xx responses with exponential backoff.
+        - Parameters:
+            - fields (str): optional projection of the response, sent as the fields parameter to
+            the endpoints supporting it and applied to the decoded response in any case
+        - Excepts:
+            - SpotrendQuotaError - the rate limit is still exceeded after the last retry
+            - SpotrendServerError - the server is still failing after the last retry
+            - SpotrendConnectionError - the request cannot reach the server
+            - SpotrendRequestError - the server answered with an unexpected status
+        """
+        url = self.get_url(endpoint)
+        if fields is not None:
+            projection = Projection(fields)
+            if supports_fields(url):
+                params = dict(params or {}, fields=projection.fields)
+            return projection.apply(self.make_request(url, method, params, data))
+        params = encode_params(params)
+        if method == "GET" and self.cache is not None:
+            content = self.cache.get(url, params, self.cache_namespace)
+            if content is not None:
+                self.hooks.emit("cache_hit", method=method, url=url, revalidated=False)
+                return decode_response(200, content, self.loads)
+        if method == "GET" and self.inflight is not None:
+            # identical lookups in flight share a single request
+            key = (method, ResponseCache.get_key(url, params))
+            return self.inflight.do(key, self.send, url, method, params, data)
+        return self.send(url, method, params, data)
+
+    def send(self, url: str, method: str = "GET", params: dict = None, data: dict = None) -> dict:
+        """
+        Send a request with the retry policy of the rate limiter and the conditional and cached GETs.
+        """
+        tokens = self.get_tokens(url, method)
+        cacheable = self.cache is not None and method == "GET"
+        validator = (self.etags.get(url, params, self.cache_namespace)
+                     if self.etags is not None and method == "GET" else None)
+        refreshed = False
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            token = tokens.get()
             headers = {
-                "Authorization": f"Bearer {self.token['access_token']}"
+                "Authorization": f"Bearer {token['access_token']}"
             }
-            response = requests.request(
-                method, url, headers=headers, params=params, json=data)
-        if response.status_code == 200:
-            return response.json()
-        return None
+            if validator is not None:
+                headers["If-None-Match"] = validator[0]
+            self.hooks.emit("before_send", method=method, url=url, params=params, attempt=attempt)
+            start = time.perf_counter()
+            try:
+                response = self.transport.request(
+                    method, url, headers=headers, params=params, json=data)
+            except requests.RequestException as error:
+                if attempt >= self.rate_limiter.max_retries:
+                    raise SpotrendConnectionError(f"Cannot reach the Spotify API: {error}") from error
+                delay = self.rate_limiter.backoff(attempt)
+                self.hooks.emit("retry", method=method, url=url, status=None, delay=delay, attempt=attempt, error=error)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.hooks.emit("after_response", method=method, url=url, status=response.status_code,
+                            elapsed=time.perf_counter() - start, size=len(response.content), attempt=attempt)
+            if response.status_code == 401 and not refreshed:
+                tokens.refresh(token)
+                refreshed = True
+                continue
+            delay = self.rate_limiter.retry_delay(
+                response.status_code, response.headers.get("Retry-After"), attempt)
+            if delay is None:
+                status, content = response.status_code, response.content
+                if status == 304 and validator is not None:
+                    self.etags.revalidated()
+                    self.hooks.emit("cache_hit", method=method, url=url, revalidated=True)
+                    status, content = 200, validator[1]
+                elif status == 200 and self.etags is not None and method == "GET" and response.headers.get("ETag"):
+                    self.etags.set(url, params, response.headers["ETag"], content, self.cache_namespace)
+                result = decode_response(status, content, self.loads)
+                if cacheable and status == 200:
+                    self.cache.set(url, params, content, self.cache_namespace)
+                return result
+            self.hooks.emit("retry", method=method, url=url, status=response.status_code, delay=delay,
+                            attempt=attempt, error=None)
+            time.sleep(delay)
+            attempt += 1
+
+    def get_url(self, endpoint: str) -> str:
+        """
+        Resolve an endpoint relative to the Web API base url, absolute urls are kept as they are.
+        """
+        if endpoint.startswith("http://") or endpoint.startswith("https://"):
+            return endpoint
+        return f"{self.api_url}/{endpoint.lstrip('/')}"
+
+    def close(self) -> None:
+        """
+        Release the pooled connections of the client transport, a transport shared with other clients is left open.
+        """
+        if self.owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ClientRegistry(Registry):
+    """
+    Registry of the clients of many Spotify users served by the same process. The clients are
+    keyed by their credentials and token file and share a single connection pool and rate
+    limiter, so asking for the client of a known user costs a dictionary lookup.
+    """
+
+    def __init__(self, maxsize: int = 128, idle_timeout: float = 3600, transport: Transport = None,
+                 rate_limiter: RateLimiter = None):
+        """
+        - Parameters:
+            - maxsize (int): maximum number of clients kept in the registry
+            - idle_timeout (float): seconds after which an unused client is evicted
+            - transport (Transport): the connection pool shared by the clients
+            - rate_limiter (RateLimiter): the rate limiter shared by the clients
+        """
+        super().__init__(Client, maxsize=maxsize, idle_timeout=idle_timeout)
+        self.transport = transport or Transport()
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    def get_client(self, client_id: str = None, client_secret: str = None, redirect_uri: str = None,
+                   grant: str = "authorization_code", token_file: str = "token.json", **kwargs) -> Client:
+        """
+        Return the client of the input credentials, creating it on the first call
+        """
+        key = (client_id, client_secret, redirect_uri, grant, token_file)
+        return self.get(key, client_id, client_secret, redirect_uri, grant=grant, token_file=token_file,
+                        transport=self.transport, rate_limiter=self.rate_limiter, **kwargs)
+
+    def close(self) -> None:
+        """
+        Drop every client and close the shared connection pool
+        """
+        self.clear()
+        self.transport.close()
+
+
+registry = ClientRegistry()
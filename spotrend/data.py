@@ -1,9 +1,349 @@
+import json
+import os
+import threading
+import numpy as np
+from spotrend.exceptions import *
+from spotrend.ids import normalize_id
+from spotrend.tokens import dump_json
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pc = pq = None
+
+# columns exported for each resource type: name -> (path in the resource object, arrow type).
+# A "*" segment of the path selects every element of a list, the column is then a list.
+default_columns = {
+    "tracks": {
+        "id": (("id",), "string"),
+        "name": (("name",), "string"),
+        "popularity": (("popularity",), "int64"),
+        "duration_ms": (("duration_ms",), "int64"),
+        "explicit": (("explicit",), "bool"),
+        "disc_number": (("disc_number",), "int64"),
+        "track_number": (("track_number",), "int64"),
+        "isrc": (("external_ids", "isrc"), "string"),
+        "album_id": (("album", "id"), "string"),
+        "album_name": (("album", "name"), "string"),
+        "release_date": (("album", "release_date"), "string"),
+        "artist_ids": (("artists", "*", "id"), "string"),
+        "artist_names": (("artists", "*", "name"), "string"),
+    },
+    "albums": {
+        "id": (("id",), "string"),
+        "name": (("name",), "string"),
+        "album_type": (("album_type",), "string"),
+        "label": (("label",), "string"),
+        "popularity": (("popularity",), "int64"),
+        "release_date": (("release_date",), "string"),
+        "release_date_precision": (("release_date_precision",), "string"),
+        "total_tracks": (("total_tracks",), "int64"),
+        "upc": (("external_ids", "upc"), "string"),
+        "artist_ids": (("artists", "*", "id"), "string"),
+        "genres": (("genres", "*"), "string"),
+    },
+    "artists": {
+        "id": (("id",), "string"),
+        "name": (("name",), "string"),
+        "popularity": (("popularity",), "int64"),
+        "followers": (("followers", "total"), "int64"),
+        "genres": (("genres", "*"), "string"),
+    },
+    "playlists": {
+        "id": (("id",), "string"),
+        "name": (("name",), "string"),
+        "description": (("description",), "string"),
+        "owner_id": (("owner", "id"), "string"),
+        "public": (("public",), "bool"),
+        "collaborative": (("collaborative",), "bool"),
+        "snapshot_id": (("snapshot_id",), "string"),
+        "followers": (("followers", "total"), "int64"),
+        "total_tracks": (("tracks", "total"), "int64"),
+    },
+}
+
 
 class DataUtils():
-    pass
+
+    @staticmethod
+    def require_arrow() -> None:
+        if pa is None:
+            raise SpotrendRequestError(
+                'The data export requires pyarrow. Please, install it with pip install pyarrow.')
+
 
 class DataImport(DataUtils):
-    pass
+    """
+    Bulk export of resource objects in columnar batches. The responses are buffered up to
+    batch_size objects, converted by Arrow in a single pass keeping only the exported fields,
+    and the columns are extracted from the nested arrays without visiting the rows in Python.
+    The batches are written to Parquet one at a time, so the memory held by an export is
+    bounded by the batch size and not by the number of rows.
+    """
+
+    def __init__(self, type: str = "tracks", columns: dict = None, batch_size: int = 10000):
+        """
+        - Parameters:
+            - type (str): the resource type of the exported objects, e.g. tracks
+            - columns (dict): the exported columns as name -> (path, arrow type), by default the ones of the type
+            - batch_size (int): maximum number of rows of each batch
+        - Excepts:
+            - SpotrendInvalidDataError: if the type has no default columns
+        """
+        self.require_arrow()
+        if columns is None and type not in default_columns:
+            raise SpotrendInvalidDataError(f'There are no default columns for the type {type}.')
+        self.type = type
+        self.columns = columns if columns is not None else default_columns[type]
+        self.batch_size = batch_size
+        self.struct = self._struct_type([(path, pa.type_for_alias(kind)) for path, kind in self.columns.values()])
+        self.schema = pa.schema([
+            (name, pa.list_(pa.type_for_alias(kind)) if "*" in path else pa.type_for_alias(kind))
+            for name, (path, kind) in self.columns.items()])
+
+    def items(self, stream):
+        """
+        Yield the resource objects of a stream of responses. The stream can mix single objects,
+        pages ({"items": [...]}), several-items responses ({"tracks": [...]}) and saved items
+        ({"added_at": ..., "track": {...}}), as returned by the methods of Spotrend.
+        """
+        singular = self.type[:-1]
+        for response in stream:
+            if response is None:
+                continue
+            if hasattr(response, "raw"):
+                response = response.raw
+            if isinstance(response.get("items"), list):
+                nested = response["items"]
+            elif isinstance(response.get(self.type), list):
+                nested = response[self.type]
+            elif isinstance(response.get(self.type), dict) and isinstance(response[self.type].get("items"), list):
+                nested = response[self.type]["items"]
+            else:
+                nested = [response]
+            for item in nested:
+                if item is not None and isinstance(item.get(singular), dict):
+                    item = item[singular]
+                if item is not None:
+                    yield item
+
+    def to_record_batch(self, items: list):
+        """
+        Convert a list of resource objects in an Arrow record batch
+        - Returns:
+            - pyarrow.RecordBatch: one row for each object, with the columns of the export
+        """
+        struct = pa.array(items, type=self.struct)
+        arrays = [self._extract(struct, path).cast(self.schema.field(name).type)
+                  for name, (path, _) in self.columns.items()]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def to_frame(self, stream):
+        """
+        Convert a stream of responses in a pandas DataFrame, the list columns hold arrays
+        """
+        return self.to_table(stream).to_pandas()
+
+    def to_table(self, stream):
+        """
+        Convert a stream of responses in an Arrow table
+        """
+        return pa.Table.from_batches(list(self.batches(stream)), schema=self.schema)
+
+    def batches(self, stream):
+        """
+        Yield the record batches of a stream of responses, each one of at most batch_size rows
+        """
+        buffer = []
+        for item in self.items(stream):
+            buffer.append(item)
+            if len(buffer) >= self.batch_size:
+                yield self.to_record_batch(buffer)
+                buffer = []
+        if buffer:
+            yield self.to_record_batch(buffer)
+
+    def to_parquet(self, stream, path: str, compression: str = "zstd") -> int:
+        """
+        Write a stream of responses in a Parquet file, one row group for each batch
+        - Parameters:
+            - stream (iterable): the responses, e.g. Spotrend.iter_user_saved_albums()
+            - path (str): the Parquet file to write
+            - compression (str): the compression codec of the columns
+        - Returns:
+            - int: the number of rows written
+        """
+        rows = 0
+        with pq.ParquetWriter(path, self.schema, compression=compression) as writer:
+            for batch in self.batches(stream):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+    @staticmethod
+    def _struct_type(leaves: list):
+        # build the nested struct type holding only the exported fields
+        tree = {}
+        for path, kind in leaves:
+            node = tree
+            for segment in path[:-1]:
+                node = node.setdefault(segment, {})
+            node[path[-1]] = kind
+
+        def build(node):
+            if not isinstance(node, dict):
+                return node
+            if "*" in node:
+                return pa.list_(build(node["*"]))
+            return pa.struct([(name, build(child)) for name, child in node.items()])
+
+        return build(tree)
+
+    @staticmethod
+    def _extract(array, path: tuple):
+        # select the path in a nested array, a "*" segment maps the rest of the path on each list element
+        for index, segment in enumerate(path):
+            if segment == "*":
+                lengths = pc.fill_null(pc.list_value_length(array), 0).to_numpy(zero_copy_only=False)
+                offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+                # a null offset marks a null list, the last offset closes the values
+                nulls = np.append(array.is_null().to_numpy(zero_copy_only=False), False)
+                values = DataImport._extract(pc.list_flatten(array), path[index + 1:])
+                return pa.ListArray.from_arrays(pa.array(offsets, mask=nulls), values)
+            array = pc.struct_field(array, [array.type.get_field_index(segment)])
+        return array
+
+
+class ChangeSet():
+    """
+    Changes of a synchronized resource since the previous checkpoint
+    """
+
+    def __init__(self, resource: str, added: list = None, removed: list = None, modified: list = None):
+        """
+        - Parameters:
+            - resource (str): the synchronized resource, e.g. me/albums or playlists/{id}
+            - added (list): the items added since the checkpoint
+            - removed (list): the ids of the items removed since the checkpoint
+            - modified (list): the items added again, with a new added_at, since the checkpoint
+        """
+        self.resource = resource
+        self.added = added or []
+        self.removed = removed or []
+        self.modified = modified or []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def __repr__(self) -> str:
+        return (f"ChangeSet({self.resource!r}, added={len(self.added)}, "
+                f"removed={len(self.removed)}, modified={len(self.modified)})")
+
+
+class CheckpointStore():
+    """
+    JSON file holding the checkpoint of each synchronized resource, rewritten atomically
+    """
+
+    def __init__(self, path: str = "spotrend-sync.json"):
+        self.path = path
+        self.checkpoints = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.checkpoints = json.load(f)
+
+    def get(self, resource: str) -> dict:
+        return self.checkpoints.get(resource)
+
+    def set(self, resource: str, checkpoint: dict) -> None:
+        with self._lock:
+            self.checkpoints[resource] = checkpoint
+            dump_json(self.path, self.checkpoints)
+
 
 class DataIntegration(DataUtils):
-    pass
+    """
+    Incremental synchronization of the user library. A checkpoint is kept for each resource:
+    the added_at of the saved items, the snapshot_id of the playlists and the total count.
+    Saved items are listed newest first, so a sync stops reading at the first item already
+    seen, and the full listing is read only when the total shows that items were removed.
+    Playlists are read again only when their snapshot_id changed.
+    """
+
+    def __init__(self, spotrend, checkpoints: CheckpointStore = None):
+        """
+        - Parameters:
+            - spotrend (Spotrend): the facade used to read the library
+            - checkpoints (CheckpointStore): the store of the checkpoints, by default spotrend-sync.json
+        """
+        self.spotrend = spotrend
+        self.checkpoints = checkpoints if checkpoints is not None else CheckpointStore()
+
+    def sync(self, playlist_ids: list = ()) -> dict:
+        """
+        Synchronize the saved albums, the saved shows and the given playlists
+        - Returns:
+            - dict: the ChangeSet of each resource
+        """
+        changes = [self.sync_saved_albums(), self.sync_saved_shows()]
+        changes.extend(self.sync_playlist(playlist_id) for playlist_id in playlist_ids)
+        return {change.resource: change for change in changes}
+
+    def sync_saved_albums(self) -> ChangeSet:
+        return self._sync_saved("me/albums", "album", lambda: self.spotrend.get_user_saved_albums(limit=50))
+
+    def sync_saved_shows(self) -> ChangeSet:
+        return self._sync_saved("me/shows", "show", lambda: self.spotrend.get_user_saved_shows(limit=50))
+
+    def sync_playlist(self, playlist_id: str) -> ChangeSet:
+        """
+        Synchronize the items of a playlist, they are read only if the snapshot_id changed
+        """
+        playlist_id = normalize_id(playlist_id, "playlists")
+        resource = f"playlists/{playlist_id}"
+        checkpoint = self.checkpoints.get(resource)
+        snapshot = self.spotrend.client.make_request(resource, method="GET", fields="snapshot_id")
+        if checkpoint is not None and checkpoint["snapshot_id"] == snapshot["snapshot_id"]:
+            return ChangeSet(resource)
+        known = checkpoint["items"] if checkpoint is not None else {}
+        current = {}
+        change = ChangeSet(resource)
+        for item in self.spotrend.iter_playlist_items(playlist_id):
+            track = item.get("track")
+            item_id = track and (track.get("id") or track.get("uri"))
+            if item_id is None or item_id in current:
+                continue
+            current[item_id] = item.get("added_at")
+            if item_id not in known:
+                change.added.append(item)
+            elif known[item_id] != current[item_id]:
+                change.modified.append(item)
+        change.removed = [item_id for item_id in known if item_id not in current]
+        self.checkpoints.set(resource, {"snapshot_id": snapshot["snapshot_id"], "items": current})
+        return change
+
+    def _sync_saved(self, resource: str, key: str, page_request) -> ChangeSet:
+        checkpoint = self.checkpoints.get(resource) or {"total": 0, "items": {}}
+        known = checkpoint["items"]
+        first = page_request()
+        change = ChangeSet(resource)
+        current = dict(known)
+        for item in self.spotrend._iter_items(lambda: first):
+            item_id, added_at = item[key]["id"], item["added_at"]
+            if known.get(item_id) == added_at:
+                break
+            if item_id in known:
+                change.modified.append(item)
+            else:
+                change.added.append(item)
+            current[item_id] = added_at
+        if checkpoint["total"] + len(change.added) != first["total"]:
+            # some items were removed, only a full listing tells which ones
+            listed = {item[key]["id"] for item in self.spotrend._iter_items(page_request)}
+            change.removed = [item_id for item_id in current if item_id not in listed]
+            current = {item_id: added_at for item_id, added_at in current.items() if item_id in listed}
+        self.checkpoints.set(resource, {"total": first["total"], "items": current})
+        return change
@@ -0,0 +1,149 @@
+import json
+import re
+from functools import lru_cache
+from spotrend.exceptions import *
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# JSON decoders selectable by name, each one decodes bytes or str into Python objects
+decoders = {
+    "json": json.loads,
+}
+if orjson is not None:
+    decoders["orjson"] = orjson.loads
+
+# endpoints accepting the fields parameter of the Spotify API, matched on the request url
+_fields_endpoints = re.compile(r"/playlists/[0-9A-Za-z]+(?:/tracks)?/?$")
+_field_token = re.compile(r"\s*(?:(!?\w+)|([(),.]))")
+
+
+def get_decoder(decoder=None):
+    """
+    Return a JSON decoder
+    - Parameters:
+        - decoder (str | callable): the name of a decoder, json or orjson, or a function decoding
+        bytes. Default: orjson if it is installed, the standard library otherwise.
+    - Excepts:
+        - SpotrendRequestError: if the decoder is not available
+    """
+    if callable(decoder):
+        return decoder
+    if decoder is None:
+        return decoders.get("orjson", json.loads)
+    if decoder not in decoders:
+        raise SpotrendRequestError(
+            f'The {decoder} decoder is not available. Please, install it with pip install {decoder}.')
+    return decoders[decoder]
+
+
+def supports_fields(url: str) -> bool:
+    """
+    True if the endpoint of the url filters its response with the fields parameter
+    """
+    return bool(_fields_endpoints.search(url.split("?", 1)[0]))
+
+
+class Projection():
+    """
+    Client-side filter of a response following the syntax of the fields parameter of the
+    Spotify API: comma separated fields, a dot or parentheses select the fields of a nested
+    object and a leading ! excludes a field, e.g. name,tracks.items(added_at,track(name,id)).
+    The projection applies to every object of a list, the fields missing from the response
+    are skipped.
+    """
+
+    def __init__(self, fields: str):
+        """
+        - Parameters:
+            - fields (str): the fields to keep
+        - Excepts:
+            - SpotrendInvalidDataError: if the fields are malformed
+        """
+        self.fields = fields.replace(" ", "")
+        self.include, self.exclude = parse_fields(self.fields)
+
+    def apply(self, value):
+        """
+        Return a copy of the value holding only the projected fields
+        """
+        return self._apply(value, (self.include, self.exclude))
+
+    def _apply(self, value, node):
+        include, exclude = node
+        if isinstance(value, list):
+            return [self._apply(item, node) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if include:
+            return {key: value[key] if child is None else self._apply(value[key], child)
+                    for key, child in include.items() if key in value}
+        return {key: item for key, item in value.items() if key not in exclude}
+
+    def __repr__(self) -> str:
+        return f"Projection({self.fields!r})"
+
+
+@lru_cache(maxsize=256)
+def parse_fields(fields: str) -> tuple:
+    """
+    Parse a fields expression into a tree of (included fields, excluded fields) nodes, an
+    included field maps to its own node or to None when it is kept whole
+    - Excepts:
+        - SpotrendInvalidDataError: if the fields are malformed
+    """
+    tokens = []
+    position = 0
+    while position < len(fields):
+        match = _field_token.match(fields, position)
+        if match is None:
+            raise SpotrendInvalidDataError(f'The fields {fields!r} are malformed at position {position}.')
+        tokens.append(match[1] or match[2])
+        position = match.end()
+    tokens.append(None)
+    node, index = _parse_group(tokens, 0, fields)
+    if tokens[index] is not None:
+        raise SpotrendInvalidDataError(f'The fields {fields!r} are malformed near {tokens[index]!r}.')
+    return node
+
+
+def _parse_group(tokens: list, index: int, fields: str) -> tuple:
+    include, exclude = {}, set()
+    while True:
+        name = tokens[index]
+        if name is None or name in "(),.":
+            raise SpotrendInvalidDataError(f'The fields {fields!r} are missing a field name.')
+        index += 1
+        if name.startswith("!"):
+            exclude.add(name[1:])
+            separator = tokens[index]
+        else:
+            child, index = _parse_child(tokens, index, fields)
+            if name in include:
+                # a field selected twice keeps the union of its selections
+                previous = include[name]
+                child = None if previous is None or child is None else (
+                    dict(previous[0], **child[0]), previous[1] | child[1])
+            include[name] = child
+            separator = tokens[index]
+        if separator != ",":
+            return (include, exclude), index
+        index += 1
+
+
+def _parse_child(tokens: list, index: int, fields: str) -> tuple:
+    token = tokens[index]
+    if token == ".":
+        name = tokens[index + 1]
+        if name is None or name in "(),." or name.startswith("!"):
+            raise SpotrendInvalidDataError(f'The fields {fields!r} are missing a field name.')
+        child, index = _parse_child(tokens, index + 2, fields)
+        return ({name: child}, set()), index
+    if token == "(":
+        child, index = _parse_group(tokens, index + 1, fields)
+        if tokens[index] != ")":
+            raise SpotrendInvalidDataError(f'The fields {fields!r} have an unbalanced parenthesis.')
+        return child, index + 1
+    return None, index
@@ -17,6 +17,14 @@ class SpotrendRequestError(Exception):
     pass
 
 
+class SpotrendConnectionError(SpotrendRequestError):
+    """
+    This exception would be raised when the Spotify API cannot be reached, 
+    such as a connection reset or a timeout, after the last retry.
+    """
+    pass
+
+
 class SpotrendPermissionError(Exception):
     """
     This exception would be raised when the user does not 
@@ -0,0 +1,211 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from spotrend.exceptions import *
+from spotrend.ids import normalize_id
+from spotrend.tokens import dump_json
+
+
+class ArtistGraph():
+    """
+    Artist similarity graph in compressed sparse row form: the related artists of the artist i
+    are indices[indptr[i]:indptr[i + 1]]. The arrays are saved as .npy files and can be loaded
+    as memory maps, so a large graph is queried without being read in memory.
+    """
+
+    def __init__(self, ids: list, indptr, indices, names: list = None, popularity=None):
+        """
+        - Parameters:
+            - ids (list): the Spotify id of each node
+            - indptr (array): the offsets of the related artists of each node in indices, of length len(ids) + 1
+            - indices (array): the node indexes of the related artists
+            - names (list): optional name of each node
+            - popularity (array): optional popularity of each node, -1 if unknown
+        """
+        self.ids = list(ids)
+        self.index = {artist_id: index for index, artist_id in enumerate(self.ids)}
+        self.indptr = indptr
+        self.indices = indices
+        self.names = names if names is not None else [None] * len(self.ids)
+        self.popularity = popularity if popularity is not None else np.full(len(self.ids), -1, dtype=np.int16)
+
+    @classmethod
+    def from_edges(cls, ids: list, edges: dict, artists: dict = None):
+        """
+        Build the graph of a list of node ids and a mapping id -> related ids
+        - Parameters:
+            - artists (dict): optional id -> (name, popularity) of the nodes
+        """
+        index = {artist_id: position for position, artist_id in enumerate(ids)}
+        counts = np.zeros(len(ids) + 1, dtype=np.int64)
+        counts[1:] = [len(edges.get(artist_id, ())) for artist_id in ids]
+        indptr = np.cumsum(counts)
+        indices = np.fromiter((index[related] for artist_id in ids for related in edges.get(artist_id, ())),
+                              dtype=np.int32, count=int(indptr[-1]))
+        artists = artists or {}
+        names = [artists.get(artist_id, (None, None))[0] for artist_id in ids]
+        popularity = np.array([artists.get(artist_id, (None, -1))[1] for artist_id in ids], dtype=np.int16)
+        return cls(ids, indptr, indices, names, popularity)
+
+    def save(self, path: str) -> None:
+        """
+        Save the graph in a folder: ids.txt (id and name of each node), indptr.npy, indices.npy and popularity.npy
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "ids.txt"), "w") as f:
+            f.write("".join(f"{artist_id}\t{name or ''}\n" for artist_id, name in zip(self.ids, self.names)))
+        np.save(os.path.join(path, "indptr.npy"), np.asarray(self.indptr))
+        np.save(os.path.join(path, "indices.npy"), np.asarray(self.indices))
+        np.save(os.path.join(path, "popularity.npy"), np.asarray(self.popularity))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """
+        Load a graph saved in a folder, the arrays are memory mapped unless mmap is False
+        """
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "ids.txt")) as f:
+            rows = [line.rstrip("\n").split("\t", 1) for line in f]
+        return cls([row[0] for row in rows],
+                   np.load(os.path.join(path, "indptr.npy"), mmap_mode=mode),
+                   np.load(os.path.join(path, "indices.npy"), mmap_mode=mode),
+                   [row[1] or None for row in rows],
+                   np.load(os.path.join(path, "popularity.npy"), mmap_mode=mode))
+
+    def neighbours(self, artist_id: str) -> list:
+        """
+        Return the ids of the related artists of an artist
+        - Excepts:
+            - SpotrendNotFoundError: if the artist is not in the graph
+        """
+        node = self._node(artist_id)
+        return [self.ids[index] for index in self.indices[self.indptr[node]:self.indptr[node + 1]]]
+
+    def shortest_path(self, source: str, target: str) -> list:
+        """
+        Return the shortest chain of related artists from source to target, None if there is none
+        - Excepts:
+            - SpotrendNotFoundError: if an artist is not in the graph
+        """
+        start, end = self._node(source), self._node(target)
+        parents = np.full(len(self.ids), -1, dtype=np.int64)
+        parents[start] = start
+        frontier = np.array([start])
+        while len(frontier) and parents[end] < 0:
+            # expand the whole level at once: every edge leaving the frontier
+            starts, stops = self.indptr[frontier], self.indptr[frontier + 1]
+            lengths = stops - starts
+            if not lengths.sum():
+                break
+            sources = np.repeat(frontier, lengths)
+            offsets = np.cumsum(lengths) - lengths
+            positions = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+            targets = np.asarray(self.indices[positions], dtype=np.int64)
+            fresh = parents[targets] < 0
+            targets, sources = targets[fresh], sources[fresh]
+            targets, first = np.unique(targets, return_index=True)
+            parents[targets] = sources[first]
+            frontier = targets
+        if parents[end] < 0:
+            return None
+        path = [end]
+        while path[-1] != start:
+            path.append(int(parents[path[-1]]))
+        return [self.ids[node] for node in reversed(path)]
+
+    def _node(self, artist_id: str) -> int:
+        node = self.index.get(artist_id)
+        if node is None:
+            raise SpotrendNotFoundError(f'The artist {artist_id} is not in the graph.')
+        return node
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class GraphCrawler():
+    """
+    Breadth-first crawler of the related artists. Each level of the visit is requested in
+    parallel, every artist is requested once, and the artists known only by id are hydrated
+    with the several-artists endpoint. The state is saved after each level, so an interrupted
+    crawl resumes from the last completed level.
+    """
+
+    def __init__(self, spotrend, max_depth: int = 2, max_workers: int = 8, state_file: str = None):
+        """
+        - Parameters:
+            - spotrend (Spotrend): the facade used to request the artists
+            - max_depth (int): number of hops from the seeds, the artists found at the last hop are not expanded
+            - max_workers (int): number of related-artists requests sent concurrently
+            - state_file (str): optional JSON file where the crawl state is saved after each level
+        """
+        self.spotrend = spotrend
+        self.max_depth = max_depth
+        self.max_workers = max_workers
+        self.state_file = state_file
+
+    def crawl(self, seed_ids: list) -> ArtistGraph:
+        """
+        Visit the related artists of the seeds up to max_depth hops
+        - Returns:
+            - ArtistGraph: the graph of the visited artists
+        """
+        # URIs and URLs of the seeds are keyed on their ids, like the related artists
+        seed_ids = [normalize_id(seed_id, "artists") for seed_id in seed_ids]
+        state = self._load()
+        if state is None or state["seeds"] != list(seed_ids):
+            state = {"seeds": list(seed_ids), "depth": 0, "order": list(dict.fromkeys(seed_ids)),
+                     "frontier": list(dict.fromkeys(seed_ids)), "edges": {}, "artists": {}}
+        order, edges, artists = state["order"], state["edges"], state["artists"]
+        visited = set(order)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while state["depth"] < self.max_depth and state["frontier"]:
+                frontier = state["frontier"]
+                following = []
+                for artist_id, related in zip(frontier, executor.map(self._related, frontier)):
+                    edges[artist_id] = []
+                    for artist in related:
+                        edges[artist_id].append(artist["id"])
+                        artists.setdefault(artist["id"], self._summary(artist))
+                        if artist["id"] not in visited:
+                            visited.add(artist["id"])
+                            order.append(artist["id"])
+                            following.append(artist["id"])
+                state["frontier"] = following
+                state["depth"] += 1
+                self._save(state)
+        self._hydrate([artist_id for artist_id in order if artist_id not in artists], artists)
+        self._save(state)
+        return ArtistGraph.from_edges(order, edges, artists)
+
+    def _related(self, artist_id: str) -> list:
+        try:
+            response = self.spotrend.get_artist_related_artist(artist_id)
+        except SpotrendNotFoundError:
+            return []
+        return [artist for artist in (response or {}).get("artists", []) if artist is not None]
+
+    def _hydrate(self, artist_ids: list, artists: dict) -> None:
+        if not artist_ids:
+            return
+        for artist in self.spotrend.get_several_artists(artist_ids)["artists"]:
+            if artist is None:
+                continue
+            artist = artist.raw if hasattr(artist, "raw") else artist
+            artists[artist["id"]] = self._summary(artist)
+
+    @staticmethod
+    def _summary(artist: dict) -> tuple:
+        popularity = artist.get("popularity")
+        return artist.get("name"), popularity if popularity is not None else -1
+
+    def _load(self) -> dict:
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return None
+        with open(self.state_file) as f:
+            return json.load(f)
+
+    def _save(self, state: dict) -> None:
+        if self.state_file is not None:
+            dump_json(self.state_file, state)
@@ -0,0 +1,58 @@
+import logging
+import threading
+
+logger = logging.getLogger("spotrend")
+
+# events emitted by the clients and the keyword arguments passed to their callbacks
+events = {
+    "before_send": ("method", "url", "params", "attempt"),
+    "after_response": ("method", "url", "status", "elapsed", "size", "attempt"),
+    "retry": ("method", "url", "status", "delay", "attempt", "error"),
+    "token_refresh": ("grant", "status", "elapsed"),
+    "cache_hit": ("method", "url", "revalidated"),
+}
+
+
+class Hooks():
+    """
+    Registry of the callbacks observing the requests of a client. Each event calls its callbacks
+    in registration order with keyword arguments, a failing callback is logged and never breaks
+    the request, and an event without callbacks costs a single lookup.
+    """
+
+    def __init__(self):
+        self.callbacks = {event: () for event in events}
+        self._lock = threading.Lock()
+
+    def register(self, event: str, callback) -> None:
+        """
+        Call a function on each occurrence of an event
+        - Parameters:
+            - event (str): one of before_send, after_response, retry, token_refresh and cache_hit
+            - callback (callable): function receiving the arguments of the event as keywords
+        - Excepts:
+            - ValueError: if the event is unknown
+        """
+        if event not in events:
+            raise ValueError(f"Unknown event {event}, the events are {', '.join(events)}")
+        with self._lock:
+            # the tuple is replaced, so emit can iterate without holding the lock
+            self.callbacks[event] = self.callbacks[event] + (callback,)
+
+    def unregister(self, event: str, callback) -> None:
+        """
+        Stop calling a function on an event, unknown callbacks are ignored
+        """
+        with self._lock:
+            self.callbacks[event] = tuple(registered for registered in self.callbacks.get(event, ())
+                                          if registered != callback)
+
+    def emit(self, event: str, **payload) -> None:
+        """
+        Call the callbacks of an event
+        """
+        for callback in self.callbacks[event]:
+            try:
+                callback(**payload)
+            except Exception:
+                logger.exception("The %s hook %r failed", event, callback)
@@ -0,0 +1,105 @@
+import re
+from functools import lru_cache
+from spotrend.exceptions import *
+
+# resource type of each kind of Spotify URI and URL, e.g. spotify:track:... -> tracks
+id_types = {
+    "album": "albums",
+    "artist": "artists",
+    "audiobook": "audiobooks",
+    "chapter": "chapters",
+    "episode": "episodes",
+    "playlist": "playlists",
+    "show": "shows",
+    "track": "tracks",
+}
+
+_kinds = "|".join(id_types)
+_id_pattern = re.compile(
+    rf"(?:spotify:(?P<uri_kind>{_kinds}):(?P<uri_id>[0-9A-Za-z]{{22}})"
+    rf"|https?://open\.spotify\.com/(?:intl-[A-Za-z-]+/)?(?:embed/)?(?P<url_kind>{_kinds})/(?P<url_id>[0-9A-Za-z]{{22}})"
+    rf"(?:[?#].*)?"
+    rf"|(?P<id>[0-9A-Za-z]{{22}}))")
+
+
+@lru_cache(maxsize=4096)
+def parse_id(value: str) -> tuple:
+    """
+    Parse a Spotify id, URI (spotify:track:...) or URL (https://open.spotify.com/track/...)
+    - Returns:
+        - tuple: the resource type (None for a bare id) and the base62 id
+    - Excepts:
+        - SpotrendInvalidDataError: if the value is not a Spotify id, URI or URL
+    """
+    if len(value) == 22 and value.isascii() and value.isalnum():
+        return None, value
+    match = _id_pattern.fullmatch(value.strip()) if isinstance(value, str) else None
+    if match is None:
+        raise SpotrendInvalidDataError(f'{value!r} is not a Spotify id, URI or URL.')
+    kind = match["uri_kind"] or match["url_kind"]
+    return id_types.get(kind), match["uri_id"] or match["url_id"] or match["id"]
+
+
+def normalize_id(value: str, type: str = None) -> str:
+    """
+    Return the base62 id of a Spotify id, URI or URL
+    - Parameters:
+        - value (str): the id, URI or URL
+        - type (str): the expected resource type, e.g. tracks
+    - Excepts:
+        - SpotrendInvalidDataError: if the value is malformed or is of another type
+    """
+    if not isinstance(value, str):
+        raise SpotrendInvalidDataError(f'{value!r} is not a Spotify id, URI or URL.')
+    kind, lookup_id = parse_id(value)
+    if type is not None and kind is not None and kind != type:
+        raise SpotrendInvalidDataError(f'{value!r} is a resource of type {kind}, not {type}.')
+    return lookup_id
+
+
+def normalize_ids(values: list, type: str = None) -> tuple:
+    """
+    Normalize a list of Spotify ids, URIs and URLs in a single pass and deduplicate them
+    - Parameters:
+        - values (list): the ids, URIs or URLs, of mixed forms
+        - type (str): the expected resource type, e.g. tracks
+    - Returns:
+        - tuple: the distinct ids in order of first appearance, and the position of each input among them
+    - Excepts:
+        - SpotrendInvalidDataError: if a value is malformed or is of another type
+    """
+    positions = []
+    unique = {}
+    for value in values:
+        lookup_id = normalize_id(value, type)
+        position = unique.get(lookup_id)
+        if position is None:
+            position = unique[lookup_id] = len(unique)
+        positions.append(position)
+    return list(unique), positions
+
+
+def infer_type(values: list) -> str:
+    """
+    Return the resource type shared by a list of URIs and URLs, None if it cannot be inferred
+    - Excepts:
+        - SpotrendInvalidDataError: if the values are of different types
+    """
+    kinds = {parse_id(value)[0] for value in values} - {None}
+    if len(kinds) > 1:
+        raise SpotrendInvalidDataError(f'The ids are of different types: {", ".join(sorted(kinds))}.')
+    return kinds.pop() if kinds else None
+
+
+def expand(result, positions: list):
+    """
+    Map a result computed on the distinct ids back to the order of the input ids: lists are
+    expanded, the lists of a several-items response too, any other result is returned as is
+    """
+    if isinstance(result, list):
+        return [result[position] for position in positions]
+    if isinstance(result, dict) and len(result) == 1:
+        key, values = next(iter(result.items()))
+        if isinstance(values, list):
+            return {key: [values[position] for position in positions]}
+    return result
@@ -31,6 +31,29 @@ items = (
     "playlists",
 )
 
+# maximum number of ids accepted by a single request for each batch endpoint
+batch_limits = {
+    "albums": 20,
+    "artists": 50,
+    "audiobooks": 50,
+    "chapters": 50,
+    "episodes": 50,
+    "shows": 50,
+    "tracks": 50,
+    "me/albums": 20,
+    "me/albums/contains": 20,
+    "me/audiobooks": 50,
+    "me/audiobooks/contains": 50,
+    "me/episodes": 50,
+    "me/episodes/contains": 50,
+    "me/following": 50,
+    "me/following/contains": 50,
+    "me/shows": 50,
+    "me/shows/contains": 50,
+    "me/tracks": 50,
+    "me/tracks/contains": 50,
+}
+
 page = """
 <html>
   <head>
@@ -73,4 +96,4 @@ page = """
 </html>
 """
 
-__all__ = ["items", "scopes", "page"]
\ No newline at end of file
+__all__ = ["items", "scopes", "batch_limits", "page"]
\ No newline at end of file
@@ -0,0 +1,181 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from spotrend.exceptions import *
+from spotrend.ids import normalize_ids
+from spotrend.items import batch_limits
+
+# endpoint and extra parameters of the library of each resource type
+library_endpoints = {
+    "albums": ("me/albums", {}),
+    "tracks": ("me/tracks", {}),
+    "episodes": ("me/episodes", {}),
+    "shows": ("me/shows", {}),
+    "audiobooks": ("me/audiobooks", {}),
+    "artists": ("me/following", {"type": "artist"}),
+}
+
+# errors worth retrying once the retries of the client are exhausted, an unexpected status is not
+transient_errors = (SpotrendServerError, SpotrendQuotaError, SpotrendConnectionError)
+
+
+class MutationReport():
+    """
+    Result of a bulk library mutation, keyed by id: each id is changed, unchanged if the library
+    already was in the requested state, or failed with the error of its last attempt.
+    """
+
+    def __init__(self, type: str, action: str):
+        self.type = type
+        self.action = action
+        self.results = {}
+        self.errors = {}
+        self.requests = 0
+
+    @property
+    def changed(self) -> list:
+        return [lookup_id for lookup_id, result in self.results.items() if result == "changed"]
+
+    @property
+    def unchanged(self) -> list:
+        return [lookup_id for lookup_id, result in self.results.items() if result == "unchanged"]
+
+    @property
+    def failed(self) -> list:
+        return [lookup_id for lookup_id, result in self.results.items() if result == "failed"]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __getitem__(self, lookup_id: str) -> str:
+        return self.results[lookup_id]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __repr__(self) -> str:
+        return (f"MutationReport({self.action} {self.type}: changed={len(self.changed)}, "
+                f"unchanged={len(self.unchanged)}, failed={len(self.failed)}, requests={self.requests})")
+
+
+class LibraryEditor():
+    """
+    Bulk save, remove, follow and unfollow of the library of the current user. The ids are
+    normalized and deduplicated, diffed against the library with the contains endpoints so only
+    the real changes are sent, split by the limit of the endpoint and sent concurrently. A chunk
+    failing after the retries of the client is retried as a whole, and the ids of a chunk still
+    failing are reported with its error instead of aborting the other chunks.
+    """
+
+    def __init__(self, spotrend, max_workers: int = 8, retries: int = 2, diff: bool = True):
+        """
+        - Parameters:
+            - spotrend (Spotrend): the facade sending the requests on behalf of the user
+            - max_workers (int): number of chunks sent at the same time
+            - retries (int): attempts added for a chunk failing with a transient error
+            - diff (bool): check the library first and send only the ids whose state changes
+        """
+        self.spotrend = spotrend
+        self.max_workers = max_workers
+        self.retries = retries
+        self.diff = diff
+
+    def save(self, type: str, lookup_ids: list) -> MutationReport:
+        """
+        Save resources in the library of the current user
+        - Parameters:
+            - type (str): albums, tracks, episodes, shows, audiobooks or artists
+            - lookup_ids (list): the ids, URIs or URLs of the resources
+        - Excepts:
+            - SpotrendInvalidDataError: if the type has no library or an id is malformed
+        """
+        return self.mutate(type, lookup_ids, "PUT")
+
+    def remove(self, type: str, lookup_ids: list) -> MutationReport:
+        """
+        Remove resources from the library of the current user, see save
+        """
+        return self.mutate(type, lookup_ids, "DELETE")
+
+    def follow(self, artist_ids: list) -> MutationReport:
+        return self.save("artists", artist_ids)
+
+    def unfollow(self, artist_ids: list) -> MutationReport:
+        return self.remove("artists", artist_ids)
+
+    def contains(self, type: str, lookup_ids: list) -> dict:
+        """
+        Return the ids in the library of the current user mapped on True, on False if they are
+        missing and on None if their check failed
+        """
+        endpoint, params = self._endpoint(type)
+        lookup_ids, _ = normalize_ids(lookup_ids, type)
+        return self._contains(endpoint, params, lookup_ids, MutationReport(type, "check"))
+
+    def mutate(self, type: str, lookup_ids: list, method: str) -> MutationReport:
+        """
+        Send a PUT (save) or a DELETE (remove) for the ids whose state in the library changes
+        """
+        endpoint, params = self._endpoint(type)
+        lookup_ids, _ = normalize_ids(lookup_ids, type)
+        report = MutationReport(type, "save" if method == "PUT" else "remove")
+        pending = lookup_ids
+        if self.diff and lookup_ids:
+            flags = self._contains(endpoint, params, lookup_ids, report)
+            # an id whose check failed is sent anyway, both mutations are idempotent
+            target = method == "PUT"
+            pending = [lookup_id for lookup_id in lookup_ids if flags.get(lookup_id) is not target]
+            report.results.update((lookup_id, "unchanged") for lookup_id in lookup_ids
+                                  if flags.get(lookup_id) is target)
+        for chunk, result in self._run(endpoint, method, params, pending, report):
+            if isinstance(result, Exception):
+                report.results.update((lookup_id, "failed") for lookup_id in chunk)
+                report.errors.update((lookup_id, result) for lookup_id in chunk)
+            else:
+                report.results.update((lookup_id, "changed") for lookup_id in chunk)
+        # the report follows the order of the ids
+        report.results = {lookup_id: report.results[lookup_id] for lookup_id in lookup_ids}
+        return report
+
+    def _endpoint(self, type: str) -> tuple:
+        if type not in library_endpoints:
+            raise SpotrendInvalidDataError(
+                f'The {type} cannot be saved in the library, the types are {", ".join(library_endpoints)}.')
+        return library_endpoints[type]
+
+    def _contains(self, endpoint: str, params: dict, lookup_ids: list, report: MutationReport) -> dict:
+        flags = {}
+        for chunk, result in self._run(f"{endpoint}/contains", "GET", params, lookup_ids, report):
+            flags.update(zip(chunk, result if isinstance(result, list) else [None] * len(chunk)))
+        return flags
+
+    def _run(self, endpoint: str, method: str, params: dict, lookup_ids: list, report: MutationReport) -> list:
+        """
+        Send the chunks of ids concurrently and return each chunk with its response, or with the error of its last attempt
+        """
+        size = batch_limits.get(endpoint, 20)
+        chunks = [lookup_ids[i:i + size] for i in range(0, len(lookup_ids), size)]
+        if not chunks:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            results = list(executor.map(lambda chunk: self._send(endpoint, method, params, chunk), chunks))
+        report.requests += sum(attempts for _, attempts in results)
+        return [(chunk, result) for chunk, (result, _) in zip(chunks, results)]
+
+    def _send(self, endpoint: str, method: str, params: dict, chunk: list) -> tuple:
+        """
+        Send the request of a chunk, return its response or its error with the number of attempts
+        """
+        client = self.spotrend.client
+        attempt = 0
+        while True:
+            try:
+                return client.make_request(endpoint, method=method, params=dict(params, ids=chunk)), attempt + 1
+            except transient_errors as error:
+                if attempt >= self.retries:
+                    return error, attempt + 1
+                time.sleep(client.rate_limiter.backoff(attempt))
+                attempt += 1
+            except (SpotrendAuthError, SpotrendPermissionError, SpotrendNotFoundError,
+                    SpotrendInvalidDataError, SpotrendRequestError) as error:
+                return error, attempt + 1
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class MarketMatrix():
+    """
+    Market by item view of a fan-out over several markets. Each distinct item, e.g. a track,
+    is kept once, and matrix[m, i] is the 1-based rank of the item i in the market m, 0 if
+    the item is missing from the market.
+    """
+
+    def __init__(self, markets: list, items: list, matrix):
+        """
+        - Parameters:
+            - markets (list): the ISO 3166-1 alpha-2 codes of the rows
+            - items (list): the distinct objects of the columns
+            - matrix (array): the rank of each item in each market
+        """
+        self.markets = list(markets)
+        self.items = list(items)
+        self.matrix = matrix
+        self.ids = [item["id"] for item in self.items]
+
+    @classmethod
+    def from_lists(cls, markets: list, lists: list):
+        """
+        Build the matrix from the ranked lists of items of each market, the items are deduplicated by id
+        """
+        columns = {}
+        items = []
+        for ranked in lists:
+            for item in ranked or ():
+                if item is not None and item["id"] not in columns:
+                    columns[item["id"]] = len(items)
+                    items.append(item)
+        size = max([len(ranked or ()) for ranked in lists] + [0])
+        matrix = np.zeros((len(markets), len(items)), dtype=np.uint8 if size < 256 else np.uint16)
+        for row, ranked in enumerate(lists):
+            for rank, item in enumerate(ranked or (), start=1):
+                if item is not None:
+                    matrix[row, columns[item["id"]]] = rank
+        return cls(markets, items, matrix)
+
+    def markets_of(self, item_id: str) -> list:
+        """
+        Return the markets where an item is present
+        """
+        column = self.ids.index(item_id)
+        return [self.markets[row] for row in np.flatnonzero(self.matrix[:, column])]
+
+    def items_in(self, market: str) -> list:
+        """
+        Return the items of a market ordered by rank
+        """
+        row = self.matrix[self.markets.index(market)]
+        columns = np.flatnonzero(row)
+        return [self.items[column] for column in columns[np.argsort(row[columns], kind="stable")]]
+
+    def coverage(self):
+        """
+        Return the number of markets where each item is present, in the order of the items
+        """
+        return np.count_nonzero(self.matrix, axis=0)
+
+    def to_frame(self):
+        """
+        Return the matrix as a pandas DataFrame indexed by market, with a column for each item id
+        """
+        import pandas as pd
+        return pd.DataFrame(self.matrix, index=self.markets, columns=self.ids)
+
+    def __repr__(self) -> str:
+        return f"MarketMatrix(markets={len(self.markets)}, items={len(self.items)})"
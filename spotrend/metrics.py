@@ -0,0 +1,175 @@
+import re
+import threading
+import urllib.parse
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from spotrend.hooks import *
+
+# upper bounds in seconds of the latency histogram buckets
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_id_segment = re.compile(r"^[0-9A-Za-z]{22}$")
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Return the endpoint template of a request url, the ids are replaced by {id}, e.g.
+    https://api.spotify.com/v1/albums/4aawyAB9vmqN3uQ7FjRGTy/tracks -> albums/{id}/tracks
+    """
+    path = urllib.parse.urlsplit(url).path
+    segments = [segment for segment in path.split("/") if segment]
+    if segments and re.fullmatch(r"v\d+", segments[0]):
+        segments = segments[1:]
+    template = []
+    for segment in segments:
+        if _id_segment.match(segment) or (template and template[-1] == "users"):
+            segment = "{id}"
+        template.append(segment)
+    return "/".join(template)
+
+
+class EndpointMetrics():
+    """
+    Counters of the requests sent to a single endpoint with a single method
+    """
+
+    __slots__ = ("statuses", "buckets", "latency_sum", "bytes_in", "retries", "cache_hits")
+
+    def __init__(self, buckets: int):
+        self.statuses = Counter()
+        self.buckets = [0] * (buckets + 1)
+        self.latency_sum = 0.0
+        self.bytes_in = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+
+class MetricsCollector():
+    """
+    Per-endpoint metrics of the requests of one or more clients: counts by status code, latency
+    histograms, bytes received, retries, cache hits and token refreshes. The collector is fed by
+    the hooks of the clients it is attached to and can be exported in the Prometheus text format.
+    """
+
+    def __init__(self, buckets: tuple = latency_buckets):
+        """
+        - Parameters:
+            - buckets (tuple): increasing upper bounds in seconds of the latency histogram
+        """
+        self.bounds = tuple(buckets)
+        self.endpoints = defaultdict(lambda: EndpointMetrics(len(self.bounds)))
+        self.token_refreshes = Counter()
+        self._lock = threading.Lock()
+
+    def attach(self, hooks: Hooks):
+        """
+        Register the collector on the hooks of a client, e.g. collector.attach(client.hooks)
+        - Returns:
+            - MetricsCollector: the collector itself
+        """
+        hooks.register("after_response", self.on_response)
+        hooks.register("retry", self.on_retry)
+        hooks.register("cache_hit", self.on_cache_hit)
+        hooks.register("token_refresh", self.on_token_refresh)
+        return self
+
+    def detach(self, hooks: Hooks) -> None:
+        hooks.unregister("after_response", self.on_response)
+        hooks.unregister("retry", self.on_retry)
+        hooks.unregister("cache_hit", self.on_cache_hit)
+        hooks.unregister("token_refresh", self.on_token_refresh)
+
+    def on_response(self, method: str, url: str, status: int, elapsed: float, size: int, **_) -> None:
+        key = (get_endpoint(url), method)
+        with self._lock:
+            metrics = self.endpoints[key]
+            metrics.statuses[status] += 1
+            metrics.buckets[bisect_left(self.bounds, elapsed)] += 1
+            metrics.latency_sum += elapsed
+            metrics.bytes_in += size
+
+    def on_retry(self, method: str, url: str, **_) -> None:
+        with self._lock:
+            self.endpoints[(get_endpoint(url), method)].retries += 1
+
+    def on_cache_hit(self, method: str, url: str, **_) -> None:
+        with self._lock:
+            self.endpoints[(get_endpoint(url), method)].cache_hits += 1
+
+    def on_token_refresh(self, grant: str, status: int, **_) -> None:
+        with self._lock:
+            self.token_refreshes[(grant, status)] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Return a copy of the metrics, keyed by "METHOD endpoint"
+        """
+        with self._lock:
+            endpoints = {
+                f"{method} {endpoint}": {
+                    "requests": metrics.requests,
+                    "statuses": dict(metrics.statuses),
+                    "latency_buckets": dict(zip(self.bounds + (float("inf"),), metrics.buckets)),
+                    "latency_sum": metrics.latency_sum,
+                    "bytes_in": metrics.bytes_in,
+                    "retries": metrics.retries,
+                    "cache_hits": metrics.cache_hits,
+                }
+                for (endpoint, method), metrics in sorted(self.endpoints.items())
+            }
+            refreshes = {f"{grant} {status}": count for (grant, status), count in self.token_refreshes.items()}
+        return {"endpoints": endpoints, "token_refreshes": refreshes}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.endpoints.clear()
+            self.token_refreshes.clear()
+
+    def to_prometheus(self, prefix: str = "spotrend") -> str:
+        """
+        Export the metrics in the Prometheus text exposition format
+        - Parameters:
+            - prefix (str): prefix of the metric names
+        """
+        with self._lock:
+            endpoints = sorted((key, metrics) for key, metrics in self.endpoints.items())
+            lines = [
+                f"# HELP {prefix}_requests_total Responses received from the Spotify API.",
+                f"# TYPE {prefix}_requests_total counter",
+            ]
+            for (endpoint, method), metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",method="{method}",'
+                                 f'status="{status}"}} {count}')
+            lines += [
+                f"# HELP {prefix}_request_duration_seconds Latency of the requests to the Spotify API.",
+                f"# TYPE {prefix}_request_duration_seconds histogram",
+            ]
+            for (endpoint, method), metrics in endpoints:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(self.bounds + (float("inf"),), metrics.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {metrics.latency_sum}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {cumulative}")
+            for name, attribute, description in (
+                    ("response_bytes_total", "bytes_in", "Bytes received from the Spotify API."),
+                    ("retries_total", "retries", "Requests retried after an error or a 429."),
+                    ("cache_hits_total", "cache_hits", "Responses served by the cache or revalidated with an ETag.")):
+                lines += [f"# HELP {prefix}_{name} {description}", f"# TYPE {prefix}_{name} counter"]
+                for (endpoint, method), metrics in endpoints:
+                    lines.append(f'{prefix}_{name}{{endpoint="{endpoint}",method="{method}"}} '
+                                 f'{getattr(metrics, attribute)}')
+            lines += [
+                f"# HELP {prefix}_token_refreshes_total Token requests sent to the Spotify accounts service.",
+                f"# TYPE {prefix}_token_refreshes_total counter",
+            ]
+            for (grant, status), count in sorted(self.token_refreshes.items()):
+                lines.append(f'{prefix}_token_refreshes_total{{grant="{grant}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,407 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from spotrend.items import *
+from spotrend.decoding import Projection
+
+# markets served by the mock server
+mock_markets = ["DE", "ES", "FR", "GB", "IT", "US"]
+
+
+def mock_id(prefix: str, index: int) -> str:
+    """
+    Deterministic 22 characters base62 id of the mock catalog
+    """
+    return f"{prefix}{index:0{22 - len(prefix)}d}"
+
+
+class MockSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and the body are written separately, Nagle would delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.mock.handle(self, "GET")
+
+    def do_POST(self):
+        self.server.mock.handle(self, "POST")
+
+    def do_PUT(self):
+        self.server.mock.handle(self, "PUT")
+
+    def do_DELETE(self):
+        self.server.mock.handle(self, "DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockSpotifyServer():
+    """
+    In-process mock of the Spotify accounts service and Web API, serving a deterministic
+    catalog on localhost. It implements the paging objects, the ids batching with the limits
+    of each endpoint, the token endpoint with expiring tokens (401 on an expired token),
+    429 responses with Retry-After, ETags, and injected latency and errors, so the client
+    can be exercised and measured offline.
+    """
+
+    def __init__(self, tracks: int = 1000, albums: int = 100, artists: int = 50, playlists: int = 10,
+                 token_ttl: float = 3600, rate_limit: int = None, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        """
+        - Parameters:
+            - tracks, albums, artists, playlists (int): size of the catalog
+            - token_ttl (float): seconds before the issued tokens expire
+            - rate_limit (int): requests accepted in each second, the others get a 429, None disables the limit
+            - latency (float): seconds added to every response
+            - error_rate (float): fraction of the Web API requests failing with a 503
+            - seed (int): seed of the generated catalog and of the injected errors
+        """
+        self.token_ttl = token_ttl
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.tokens = {}
+        self.throttled = 0
+        self.retry_after = 1
+        self.calls = Counter()
+        self.statuses = Counter()
+        self.window = (0, 0)
+        self._lock = threading.Lock()
+        self.build_catalog(tracks, albums, artists, playlists)
+        self.httpd = ThreadingHTTPServer((host, port), MockSpotifyHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def build_catalog(self, tracks: int, albums: int, artists: int, playlists: int) -> None:
+        rng = random.Random(0)
+        self.artists = {}
+        for index in range(artists):
+            artist_id = mock_id("ar", index)
+            self.artists[artist_id] = {
+                "id": artist_id, "name": f"Artist {index}", "type": "artist", "uri": f"spotify:artist:{artist_id}",
+                "popularity": rng.randint(0, 100), "genres": rng.sample(["pop", "rock", "jazz", "indie", "rap"], 2),
+                "followers": {"href": None, "total": rng.randint(0, 10 ** 6)},
+            }
+        artist_ids = list(self.artists)
+        self.albums = {}
+        for index in range(albums):
+            album_id = mock_id("al", index)
+            self.albums[album_id] = {
+                "id": album_id, "name": f"Album {index}", "type": "album", "uri": f"spotify:album:{album_id}",
+                "album_type": "album", "release_date": f"{2000 + index % 24}-01-01", "release_date_precision": "day",
+                "label": f"Label {index % 7}", "popularity": rng.randint(0, 100), "genres": [],
+                "available_markets": list(mock_markets), "external_ids": {"upc": f"{index:012d}"},
+                "artists": [self.simplified(self.artists[artist_ids[index % len(artist_ids)]])] if artist_ids else [],
+                "track_ids": [],
+            }
+        album_ids = list(self.albums)
+        self.tracks = {}
+        for index in range(tracks):
+            track_id = mock_id("tr", index)
+            album = self.albums[album_ids[index % len(album_ids)]] if album_ids else None
+            album_artists = album["artists"] if album is not None else []
+            if album is not None:
+                album["track_ids"].append(track_id)
+            self.tracks[track_id] = {
+                "id": track_id, "name": f"Track {index}", "type": "track", "uri": f"spotify:track:{track_id}",
+                "popularity": rng.randint(0, 100), "duration_ms": rng.randint(120000, 360000),
+                "explicit": rng.random() < 0.1, "disc_number": 1,
+                "track_number": len(album["track_ids"]) if album is not None else 1, "is_local": False,
+                "external_ids": {"isrc": f"MOCK{index:08d}"}, "available_markets": list(mock_markets),
+                "album": self.simplified(album) if album is not None else None, "artists": album_artists,
+            }
+        for album in self.albums.values():
+            album["total_tracks"] = len(album["track_ids"])
+        track_ids = list(self.tracks)
+        self.playlists = {}
+        for index in range(playlists):
+            playlist_id = mock_id("pl", index)
+            self.playlists[playlist_id] = {
+                "id": playlist_id, "name": f"Playlist {index}", "type": "playlist",
+                "uri": f"spotify:playlist:{playlist_id}", "description": "", "public": True, "collaborative": False,
+                "owner": {"id": "mock", "type": "user"}, "followers": {"href": None, "total": index},
+                "snapshot_id": uuid.UUID(int=index).hex,
+                "track_ids": [track_ids[(index * 31 + offset) % len(track_ids)]
+                              for offset in range(rng.randint(50, 250))] if track_ids else [],
+            }
+        self.saved_albums = [{"added_at": f"2023-01-{day % 28 + 1:02d}T00:00:00Z", "album_id": album_id}
+                             for day, album_id in enumerate(album_ids[:30])]
+        # ids in the library of the user for each type, the saved albums included
+        self.library = {type: set() for type in ("albums", "tracks", "episodes", "shows", "audiobooks", "artists")}
+        self.library["albums"].update(saved["album_id"] for saved in self.saved_albums)
+
+    @staticmethod
+    def simplified(resource: dict) -> dict:
+        return {key: resource[key] for key in ("id", "name", "type", "uri", "album_type", "release_date")
+                if key in resource}
+
+    def start(self):
+        """
+        Serve the requests in a background thread
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="spotrend-mock", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def client(self, **kwargs):
+        """
+        Return a Client of the mock server: the catalog requests use the client credentials grant
+        and a user token with a refresh token is already issued for the /me endpoints
+        """
+        from spotrend.client import Client
+        kwargs.setdefault("grant", "client_credentials")
+        kwargs.setdefault("token_file", None)
+        client = Client("mock-id", "mock-secret", f"{self.url}/callback", **kwargs)
+        client.api_url = f"{self.url}/v1"
+        client.accounts_url = self.url
+        client.tokens.update(self.issue_token(refresh=True))
+        return client
+
+    def issue_token(self, refresh: bool = False) -> dict:
+        """
+        Issue an access token valid for token_ttl seconds
+        """
+        access_token = uuid.uuid4().hex
+        with self._lock:
+            self.tokens[access_token] = time.monotonic() + self.token_ttl
+        token = {"access_token": access_token, "token_type": "Bearer", "expires_in": self.token_ttl}
+        if refresh:
+            token["refresh_token"] = uuid.uuid4().hex
+        return token
+
+    def expire_tokens(self) -> None:
+        """
+        Expire every issued token, the next requests get a 401
+        """
+        with self._lock:
+            self.tokens.clear()
+
+    def throttle(self, count: int = 1, retry_after: int = 1) -> None:
+        """
+        Answer 429 with Retry-After to the next count requests of the Web API
+        """
+        with self._lock:
+            self.throttled += count
+            self.retry_after = retry_after
+
+    def handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urllib.parse.urlsplit(handler.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        if parsed.path == "/api/token" and method == "POST":
+            with self._lock:
+                self.calls["api/token"] += 1
+            status, payload, headers = self.token(dict(urllib.parse.parse_qsl(body.decode())))
+        else:
+            status, payload, headers = self.api(handler, method, parsed.path, params)
+        content = json.dumps(payload).encode() if payload is not None else b""
+        if status == 200 and method == "GET" and parsed.path != "/api/token":
+            etag = f'"{hashlib.md5(content).hexdigest()}"'
+            headers["ETag"] = etag
+            if handler.headers.get("If-None-Match") == etag:
+                status, content = 304, b""
+        with self._lock:
+            self.statuses[status] += 1
+        handler.send_response(status)
+        headers.setdefault("Content-Type", "application/json")
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def token(self, form: dict) -> tuple:
+        if form.get("grant_type") not in ("client_credentials", "refresh_token", "authorization_code"):
+            return 400, {"error": "unsupported_grant_type"}, {}
+        return 200, self.issue_token(refresh=form["grant_type"] == "authorization_code"), {}
+
+    def api(self, handler: BaseHTTPRequestHandler, method: str, path: str, params: dict) -> tuple:
+        authorization = handler.headers.get("Authorization", "")
+        now = time.monotonic()
+        with self._lock:
+            expires = self.tokens.get(authorization[len("Bearer "):])
+            if expires is None or expires <= now:
+                return self.error(401, "The access token expired")
+            if self.throttled:
+                self.throttled -= 1
+                return self.error(429, "API rate limit exceeded", {"Retry-After": str(self.retry_after)})
+            if self.rate_limit is not None:
+                second, count = self.window
+                if int(now) != second:
+                    second, count = int(now), 0
+                self.window = (second, count + 1)
+                if count >= self.rate_limit:
+                    return self.error(429, "API rate limit exceeded", {"Retry-After": "1"})
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if failed:
+            return self.error(503, "Service unavailable")
+        segments = path.strip("/").split("/")
+        if not segments or segments[0] != "v1":
+            return self.error(404, "Not found")
+        segments = segments[1:]
+        with self._lock:
+            self.calls["/".join("{id}" if len(segment) == 22 else segment for segment in segments)] += 1
+        if segments[0] == "me" and len(segments) == 2 and method in ("PUT", "DELETE"):
+            return self.mutate(method, segments, params)
+        if method != "GET":
+            return (200, None, {}) if method in ("PUT", "DELETE") else self.error(405, "Method not allowed")
+        return self.route(path, segments, params)
+
+    def mutate(self, method: str, segments: list, params: dict) -> tuple:
+        """
+        Save or remove ids in the library of the user
+        """
+        kind = f"{params.get('type', '')}s" if segments[1] == "following" else segments[1]
+        ids = [lookup_id for lookup_id in params.get("ids", "").split(",") if lookup_id]
+        if kind not in self.library or not ids or len(ids) > batch_limits.get("/".join(segments), 50):
+            return self.error(400, "Invalid ids")
+        with self._lock:
+            if method == "PUT":
+                self.library[kind].update(ids)
+            else:
+                self.library[kind].difference_update(ids)
+        return 200, None, {}
+
+    def route(self, path: str, segments: list, params: dict) -> tuple:
+        collections = {"tracks": self.tracks, "albums": self.albums, "artists": self.artists,
+                       "playlists": self.playlists}
+        if segments == ["markets"]:
+            return 200, {"markets": list(mock_markets)}, {}
+        if segments == ["me"]:
+            return 200, {"id": "mock", "type": "user", "display_name": "Mock"}, {}
+        if segments[0] == "me" and segments[-1] == "contains" and len(segments) == 3:
+            kind = f"{params.get('type', '')}s" if segments[1] == "following" else segments[1]
+            ids = [lookup_id for lookup_id in params.get("ids", "").split(",") if lookup_id]
+            if kind not in self.library or not ids or len(ids) > batch_limits.get("/".join(segments), 50):
+                return self.error(400, "Invalid ids")
+            return 200, [lookup_id in self.library[kind] for lookup_id in ids], {}
+        if segments == ["me", "albums"]:
+            items = [{"added_at": saved["added_at"], "album": self.album(self.albums[saved["album_id"]])}
+                     for saved in self.saved_albums]
+            return self.page(path, items, params, 50)
+        if segments == ["browse", "new-releases"]:
+            albums = [self.simplified(album) for album in list(self.albums.values())[::-1]]
+            status, page, headers = self.page(path, albums, params, 50)
+            return status, {"albums": page} if status == 200 else page, headers
+        if len(segments) == 1 and segments[0] in collections:
+            kind = segments[0]
+            ids = [lookup_id for lookup_id in params.get("ids", "").split(",") if lookup_id]
+            if not ids or len(ids) > batch_limits.get(kind, 50):
+                return self.error(400, "Invalid ids")
+            return 200, {kind: [self.resource(kind, lookup_id) for lookup_id in ids]}, {}
+        if len(segments) >= 2 and segments[0] in collections:
+            kind, lookup_id = segments[0], segments[1]
+            if lookup_id not in collections[kind]:
+                return self.error(404, "Non existing id")
+            if len(segments) == 2:
+                return 200, self.project(kind, self.resource(kind, lookup_id), params), {}
+            if segments[2:] == ["tracks"] and kind == "albums":
+                return self.page(path, [self.simplified(self.tracks[track_id])
+                                        for track_id in self.albums[lookup_id]["track_ids"]], params, 50)
+            if segments[2:] == ["tracks"] and kind == "playlists":
+                status, page, headers = self.page(path, self.playlists[lookup_id]["track_ids"], params, 100,
+                                                  self.playlist_item)
+                return status, self.project(kind, page, params) if status == 200 else page, headers
+            if segments[2:] == ["top-tracks"] and kind == "artists":
+                top = [track for track in self.tracks.values() if track["artists"]
+                       and track["artists"][0]["id"] == lookup_id]
+                top.sort(key=lambda track: (-track["popularity"], track["id"]))
+                return 200, {"tracks": top[:10]}, {}
+            if segments[2:] == ["related-artists"] and kind == "artists":
+                artist_ids = list(self.artists)
+                position = artist_ids.index(lookup_id)
+                related = [self.artists[artist_ids[(position + step) % len(artist_ids)]] for step in (1, 2, 3)]
+                return 200, {"artists": [artist for artist in related if artist["id"] != lookup_id]}, {}
+        return self.error(404, "Service not found")
+
+    @staticmethod
+    def project(kind: str, resource: dict, params: dict) -> dict:
+        """
+        Filter a playlist response with the fields parameter, like the Spotify API does
+        """
+        if kind != "playlists" or not params.get("fields"):
+            return resource
+        return Projection(params["fields"]).apply(resource)
+
+    def resource(self, kind: str, lookup_id: str) -> dict:
+        if kind == "tracks":
+            return self.tracks.get(lookup_id)
+        if kind == "albums":
+            return self.album(self.albums[lookup_id]) if lookup_id in self.albums else None
+        if kind == "playlists":
+            return self.playlist(self.playlists[lookup_id]) if lookup_id in self.playlists else None
+        return self.artists.get(lookup_id)
+
+    def album(self, album: dict) -> dict:
+        tracks = [self.simplified(self.tracks[track_id]) for track_id in album["track_ids"]]
+        resource = {key: value for key, value in album.items() if key != "track_ids"}
+        resource["tracks"] = {"href": None, "items": tracks[:50], "limit": 50, "offset": 0,
+                              "total": len(tracks), "next": None, "previous": None}
+        return resource
+
+    def playlist(self, playlist: dict) -> dict:
+        resource = {key: value for key, value in playlist.items() if key != "track_ids"}
+        items = [self.playlist_item(track_id) for track_id in playlist["track_ids"][:100]]
+        resource["tracks"] = {"href": None, "items": items, "limit": 100, "offset": 0,
+                              "total": len(playlist["track_ids"]), "next": None, "previous": None}
+        return resource
+
+    def playlist_item(self, track_id: str) -> dict:
+        return {"added_at": "2023-01-01T00:00:00Z", "track": self.tracks[track_id]}
+
+    def page(self, path: str, items: list, params: dict, max_limit: int, item=None) -> tuple:
+        """
+        Return a paging object of the items, the optional item function builds only the objects of the page
+        """
+        try:
+            limit, offset = int(params.get("limit", 20)), int(params.get("offset", 0))
+        except ValueError:
+            return self.error(400, "Invalid limit or offset")
+        if limit < 1 or limit > max_limit or offset < 0:
+            return self.error(400, "Invalid limit")
+
+        def link(position: int) -> str:
+            return f"{self.url}{path}?{urllib.parse.urlencode(dict(params, offset=position, limit=limit))}"
+
+        return 200, {
+            "href": link(offset),
+            "items": [item(value) for value in items[offset:offset + limit]] if item else items[offset:offset + limit],
+            "limit": limit,
+            "offset": offset,
+            "total": len(items),
+            "next": link(offset + limit) if offset + limit < len(items) else None,
+            "previous": link(max(0, offset - limit)) if offset > 0 else None,
+        }, {}
+
+    @staticmethod
+    def error(status: int, message: str, headers: dict = None) -> tuple:
+        return status, {"error": {"status": status, "message": message}}, headers or {}
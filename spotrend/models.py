@@ -0,0 +1,313 @@
+import json
+import sys
+import threading
+import tracemalloc
+
+# global index of the market codes, a set of markets is stored as a bitmask over it
+_markets = {}
+_market_codes = []
+_markets_lock = threading.Lock()
+
+
+def encode_markets(markets: list) -> int:
+    """
+    Encode a list of ISO 3166-1 alpha-2 market codes in a bitmask
+    """
+    mask = 0
+    for market in markets:
+        index = _markets.get(market)
+        if index is None:
+            with _markets_lock:
+                index = _markets.get(market)
+                if index is None:
+                    index = _markets[market] = len(_market_codes)
+                    _market_codes.append(sys.intern(market))
+        mask |= 1 << index
+    return mask
+
+
+def decode_markets(mask: int) -> list:
+    """
+    Decode a bitmask of markets in the list of the market codes
+    """
+    markets = []
+    index = 0
+    while mask:
+        if mask & 1:
+            markets.append(_market_codes[index])
+        mask >>= 1
+        index += 1
+    return markets
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Model():
+    """
+    Compact read-only view of a Spotify resource. The scalar fields are stored in slots,
+    the repeated strings are interned, the available markets are kept as a bitmask and
+    every other field is kept as compact JSON, decoded on the first access and kept decoded
+    until release is called. The original payload is available through the raw property.
+    """
+    __slots__ = ("_rest", "_decoded")
+    # scalar fields stored in slots
+    fields = ()
+    # scalar fields whose values repeat across resources
+    interned = ("type",)
+
+    def __init__(self, payload: dict):
+        rest = dict(payload)
+        for name in self.fields:
+            value = rest.pop(name, None)
+            object.__setattr__(self, name, _intern(value) if name in self.interned else value)
+        self._decode_special(rest)
+        object.__setattr__(self, "_rest", json.dumps(rest, separators=(",", ":")).encode() if rest else b"")
+        object.__setattr__(self, "_decoded", None)
+
+    def _decode_special(self, rest: dict) -> None:
+        pass
+
+    def _encode_special(self, payload: dict) -> None:
+        pass
+
+    @property
+    def rest(self) -> dict:
+        """
+        The fields of the payload not stored in slots, decoded once and shared by the following
+        accesses, so it must not be modified
+        """
+        decoded = self._decoded
+        if decoded is None:
+            decoded = json.loads(self._rest) if self._rest else {}
+            object.__setattr__(self, "_decoded", decoded)
+        return decoded
+
+    def release(self) -> None:
+        """
+        Drop the decoded fields to get the compact footprint back, they are decoded again on the next access
+        """
+        object.__setattr__(self, "_decoded", None)
+
+    @property
+    def raw(self) -> dict:
+        """
+        The original payload of the resource, the null scalar fields are omitted
+        """
+        payload = {name: getattr(self, name) for name in self.fields if getattr(self, name) is not None}
+        self._encode_special(payload)
+        if self._rest:
+            payload.update(json.loads(self._rest))
+        return payload
+
+    def __getattr__(self, name: str):
+        # only called for the attributes not stored in slots
+        if name.startswith("_"):
+            raise AttributeError(name)
+        rest = self.rest
+        if name in rest:
+            return rest[name]
+        raise AttributeError(f"{type(self).__name__} has no field {name}")
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.id))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r}, name={self.name!r})"
+
+    def __reduce__(self):
+        return (type(self), (self.raw,))
+
+
+class MarketsMixin():
+    """
+    Stores available_markets as a bitmask over the global market index
+    """
+    __slots__ = ()
+
+    def _decode_special(self, rest: dict) -> None:
+        super()._decode_special(rest)
+        markets = rest.pop("available_markets", None)
+        object.__setattr__(self, "_available_markets", encode_markets(markets) if markets is not None else None)
+
+    def _encode_special(self, payload: dict) -> None:
+        super()._encode_special(payload)
+        if self._available_markets is not None:
+            payload["available_markets"] = self.available_markets
+
+    @property
+    def available_markets(self) -> list:
+        return decode_markets(self._available_markets) if self._available_markets is not None else None
+
+
+class FollowersMixin():
+    """
+    Stores followers.total as an integer field, the href of the followers object is always null
+    """
+    __slots__ = ()
+
+    def _decode_special(self, rest: dict) -> None:
+        super()._decode_special(rest)
+        followers = rest.pop("followers", None)
+        object.__setattr__(self, "followers_total", followers.get("total") if followers else None)
+
+    def _encode_special(self, payload: dict) -> None:
+        super()._encode_special(payload)
+        if self.followers_total is not None:
+            payload["followers"] = {"href": None, "total": self.followers_total}
+
+
+class Artist(FollowersMixin, Model):
+    __slots__ = ("id", "name", "uri", "type", "popularity", "genres", "followers_total")
+    fields = ("id", "name", "uri", "type", "popularity")
+
+    def _decode_special(self, rest: dict) -> None:
+        super()._decode_special(rest)
+        genres = rest.pop("genres", None)
+        object.__setattr__(self, "genres", tuple(map(sys.intern, genres)) if genres is not None else None)
+
+    def _encode_special(self, payload: dict) -> None:
+        super()._encode_special(payload)
+        if self.genres is not None:
+            payload["genres"] = list(self.genres)
+
+
+class Album(MarketsMixin, Model):
+    __slots__ = ("id", "name", "uri", "type", "album_type", "release_date", "release_date_precision",
+                 "total_tracks", "popularity", "label", "_available_markets")
+    fields = ("id", "name", "uri", "type", "album_type", "release_date", "release_date_precision",
+              "total_tracks", "popularity", "label")
+    interned = ("type", "album_type", "release_date_precision", "label")
+
+    @property
+    def artists(self) -> list:
+        return [Artist(artist) for artist in self.rest.get("artists", [])]
+
+    @property
+    def tracks(self) -> list:
+        return [Track(track) for track in self.rest.get("tracks", {}).get("items", [])]
+
+
+class Track(MarketsMixin, Model):
+    __slots__ = ("id", "name", "uri", "type", "popularity", "duration_ms", "explicit", "track_number",
+                 "disc_number", "is_local", "_available_markets")
+    fields = ("id", "name", "uri", "type", "popularity", "duration_ms", "explicit", "track_number",
+              "disc_number", "is_local")
+
+    @property
+    def album(self) -> Album:
+        album = self.rest.get("album")
+        return Album(album) if album is not None else None
+
+    @property
+    def artists(self) -> list:
+        return [Artist(artist) for artist in self.rest.get("artists", [])]
+
+
+class Playlist(FollowersMixin, Model):
+    __slots__ = ("id", "name", "uri", "type", "snapshot_id", "public", "collaborative",
+                 "followers_total")
+    fields = ("id", "name", "uri", "type", "snapshot_id", "public", "collaborative")
+
+    @property
+    def tracks(self) -> list:
+        items = self.rest.get("tracks", {}).get("items", [])
+        return [Track(item["track"]) for item in items if item.get("track") is not None]
+
+
+class Show(MarketsMixin, Model):
+    __slots__ = ("id", "name", "uri", "type", "publisher", "media_type", "total_episodes", "explicit",
+                 "_available_markets")
+    fields = ("id", "name", "uri", "type", "publisher", "media_type", "total_episodes", "explicit")
+    interned = ("type", "publisher", "media_type")
+
+    @property
+    def episodes(self) -> list:
+        return [Episode(episode) for episode in self.rest.get("episodes", {}).get("items", [])]
+
+
+class Episode(Model):
+    __slots__ = ("id", "name", "uri", "type", "duration_ms", "release_date", "release_date_precision",
+                 "explicit", "language")
+    fields = ("id", "name", "uri", "type", "duration_ms", "release_date", "release_date_precision",
+              "explicit", "language")
+    interned = ("type", "release_date_precision", "language")
+
+    @property
+    def show(self) -> Show:
+        show = self.rest.get("show")
+        return Show(show) if show is not None else None
+
+
+class Chapter(MarketsMixin, Model):
+    __slots__ = ("id", "name", "uri", "type", "chapter_number", "duration_ms", "release_date",
+                 "release_date_precision", "explicit", "_available_markets")
+    fields = ("id", "name", "uri", "type", "chapter_number", "duration_ms", "release_date",
+              "release_date_precision", "explicit")
+    interned = ("type", "release_date_precision")
+
+
+# model of each resource type of the items tuple, audiobooks are kept as dict
+models = {
+    "albums": Album,
+    "artists": Artist,
+    "chapters": Chapter,
+    "episodes": Episode,
+    "playlists": Playlist,
+    "shows": Show,
+    "tracks": Track,
+}
+
+
+def parse(payload: dict, type: str):
+    """
+    Wrap a resource payload in the model of its type, unknown types and empty payloads are returned as they are
+    - Parameters:
+        - payload (dict): the resource object returned by the Spotify API
+        - type (str): the resource type, e.g. tracks
+    """
+    model = models.get(type)
+    if model is None or not payload or isinstance(payload, Model):
+        return payload
+    return model(payload)
+
+
+def measure(payloads: list, type: str) -> dict:
+    """
+    Measure the memory held by a list of payloads as dicts and as models
+    - Parameters:
+        - payloads (list): JSON encoded resource objects of the same type
+        - type (str): the resource type, e.g. tracks
+    - Returns:
+        - dict: bytes per entity held by the dicts and by the models
+    """
+    def held(build) -> int:
+        # a trace started by the caller is left running
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        start = tracemalloc.take_snapshot()
+        objects = build()
+        end = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        size = sum(stat.size_diff for stat in end.compare_to(start, "filename"))
+        del objects
+        return size
+
+    count = max(1, len(payloads))
+    dicts = held(lambda: [json.loads(payload) for payload in payloads])
+    compact = held(lambda: [parse(json.loads(payload), type) for payload in payloads])
+    return {
+        "entities": len(payloads),
+        "dict_bytes_per_entity": dicts / count,
+        "model_bytes_per_entity": compact / count,
+        "ratio": dicts / compact if compact else None,
+    }
@@ -1,10 +1,120 @@
-class Singleton(type):
-    _instances = {}
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(
-                Singleton, cls).__call__(*args, **kwargs)
+
+class Registry():
+    """
+    Thread-safe registry of shared instances created on demand by a factory.
+    The registry is bounded: the least recently used instances are evicted when
+    it is full, and the instances left idle longer than idle_timeout are dropped.
+    """
+
+    def __init__(self, factory, maxsize: int = 128, idle_timeout: float = None, on_evict=None):
+        """
+        - Parameters:
+            - factory (callable): function creating the instance of a key
+            - maxsize (int): maximum number of instances kept in the registry
+            - idle_timeout (float): seconds after which an unused instance is evicted, None keeps them
+            - on_evict (callable): optional function called with each evicted instance
+        """
+        self.factory = factory
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, *args, **kwargs):
+        """
+        Return the instance of the key, it is created with factory(*args, **kwargs) if missing
+        """
+        evicted = []
+        with self._lock:
+            now = time.monotonic()
+            entry = self.entries.pop(key, None)
+            instance = entry[0] if entry is not None else self.factory(*args, **kwargs)
+            self.entries[key] = (instance, now)
+            evicted.extend(self._sweep(now))
+        for stale in evicted:
+            self._evicted(stale)
+        return instance
+
+    def evict(self, key) -> None:
+        """
+        Remove the instance of the key from the registry
+        """
+        with self._lock:
+            entry = self.entries.pop(key, None)
+        if entry is not None:
+            self._evicted(entry[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self.entries.values())
+            self.entries.clear()
+        for instance, _ in entries:
+            self._evicted(instance)
+
+    def _sweep(self, now: float) -> list:
+        evicted = []
+        if self.idle_timeout is not None:
+            while self.entries:
+                key, (instance, used) = next(iter(self.entries.items()))
+                if now - used <= self.idle_timeout:
+                    break
+                del self.entries[key]
+                evicted.append(instance)
+        while len(self.entries) > self.maxsize:
+            evicted.append(self.entries.popitem(last=False)[1][0])
+        return evicted
+
+    def _evicted(self, instance) -> None:
+        if self.on_evict is not None:
+            self.on_evict(instance)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class SingleFlight():
+    """
+    Deduplicate concurrent calls: while a call for a key is in flight, the other callers
+    asking for the same key wait for its outcome instead of running their own call.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) once for all the concurrent callers of the key
+        - Returns:
+            - the result of the call, shared by every caller
+        """
+        with self._lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
         else:
-            cls._instances[cls].__init__(*args, **kwargs)
-        return cls._instances[cls]
\ No newline at end of file
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self.calls[key]
+
+    def __len__(self) -> int:
+        return len(self.calls)
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket():
+    """
+    Thread-safe token bucket. Callers reserve a token and receive the delay they have to wait
+    before sending the request, so the same bucket can be used by threads and coroutines.
+    """
+
+    def __init__(self, rate: float = 20.0, capacity: float = None):
+        """
+        - Parameters:
+            - rate (float): tokens added per second, None disables the throttling
+            - capacity (float): maximum burst of tokens, by default one second of requests
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            if self.rate is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Reserve tokens from the bucket
+        - Returns:
+            - float: seconds to wait before the reserved tokens are available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.rate is None:
+                return max(0.0, self.updated - now)
+            self.tokens -= tokens
+            ready = self.updated + max(0.0, -self.tokens) / self.rate
+            return max(0.0, ready - now)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """
+        Block until the reserved tokens are available
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for the given seconds, e.g. after a 429 with Retry-After
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            resume = now + seconds
+            if resume > self.updated:
+                self.tokens = min(self.tokens, 0.0)
+                self.updated = resume
+
+
+class RateLimiter():
+    """
+    Rate limiting policy shared by the clients: a token bucket on the outgoing calls,
+    Retry-After handling for the 429 responses and exponential backoff with full jitter
+    for the 5xx responses and the network errors.
+    """
+
+    def __init__(self, rate: float = 20.0, capacity: float = None, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        """
+        - Parameters:
+            - rate (float): sustained requests per second, None disables the throttling
+            - capacity (float): maximum burst of requests
+            - max_retries (int): maximum number of retries of a single request
+            - backoff_base (float): seconds of the first backoff window
+            - backoff_cap (float): maximum seconds of a backoff window
+        """
+        self.bucket = TokenBucket(rate, capacity)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def reserve(self) -> float:
+        """
+        Reserve a request slot and return the seconds to wait before sending it
+        """
+        return self.bucket.reserve()
+
+    def acquire(self) -> None:
+        """
+        Block until a request slot is available
+        """
+        self.bucket.acquire()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter for the given retry attempt
+        """
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def retry_delay(self, status: int, retry_after: str = None, attempt: int = 0) -> float:
+        """
+        Return the seconds to wait before retrying a response, None if it must not be retried.
+        A 429 pauses the whole bucket, so every caller sharing it slows down.
+        - Parameters:
+            - status (int): the status code of the response
+            - retry_after (str): the Retry-After header of the response
+            - attempt (int): the number of retries already done
+        """
+        if attempt >= self.max_retries:
+            return None
+        if status == 429:
+            delay = self.parse_retry_after(retry_after)
+            if delay is None:
+                delay = self.backoff(attempt)
+            self.bucket.pause(delay)
+            return delay
+        if status >= 500:
+            return self.backoff(attempt)
+        return None
+
+    @staticmethod
+    def parse_retry_after(retry_after: str = None) -> float:
+        """
+        Parse a Retry-After header, expressed either in seconds or as an HTTP date
+        """
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+def dump_json(path: str, value) -> None:
+    """
+    Write a JSON file atomically: the value is written in a temporary file replacing the file,
+    so a reader never sees a partial file.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=folder, prefix=".spotrend-", suffix=".json")
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(value, f)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class TokenManager():
+    """
+    Thread-safe owner of an access token. The absolute expiry time is recorded when the token
+    is issued and the token is refreshed shortly before it, so the requests never pay a 401
+    round trip for an expired token. Concurrent callers share a single refresh.
+    """
+
+    def __init__(self, refresher, token_file: str = "token.json", margin: float = 60):
+        """
+        - Parameters:
+            - refresher (callable): function receiving the current token (or None) and returning a new token response
+            - token_file (str): path where the token is persisted, None disables the persistence
+            - margin (float): seconds before the expiry when the token is proactively refreshed
+        """
+        self.refresher = refresher
+        self.token_file = token_file
+        self.margin = margin
+        self.token = None
+        self._lock = threading.RLock()
+
+    @property
+    def access_token(self) -> str:
+        return self.get()["access_token"]
+
+    def load(self) -> dict:
+        """
+        Load the persisted token, if any
+        - Returns:
+            - dict: the loaded token or None
+        """
+        if self.token_file is None or not os.path.exists(self.token_file):
+            return None
+        try:
+            with open(self.token_file) as f:
+                token = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # a token saved without its expiry is older than the file, it is refreshed on first use
+        token.setdefault("expires_at", 0)
+        with self._lock:
+            self.token = token
+        return self.token
+
+    def save(self) -> None:
+        """
+        Persist the token atomically: it is written in a temporary file replacing the token file.
+        """
+        if self.token_file is None or self.token is None:
+            return
+        dump_json(self.token_file, self.token)
+
+    def update(self, token: dict) -> dict:
+        """
+        Replace the token with a new token response and persist it
+        """
+        with self._lock:
+            if self.token is not None and "refresh_token" not in token and "refresh_token" in self.token:
+                token = dict(token, refresh_token=self.token["refresh_token"])
+            self.token = self._stamp(dict(token))
+            self.save()
+            return self.token
+
+    def expiring(self, token: dict = None) -> bool:
+        """
+        True if the token is missing or expires within the refresh margin
+        """
+        token = token if token is not None else self.token
+        return token is None or token["expires_at"] - self.margin <= time.time()
+
+    def get(self) -> dict:
+        """
+        Return a valid token, refreshing it first if it is about to expire
+        """
+        token = self.token
+        if self.expiring(token):
+            return self.refresh(token)
+        return token
+
+    def refresh(self, stale: dict = None) -> dict:
+        """
+        Refresh the token once. The callers passing the token they saw as stale skip the
+        refresh if another caller already replaced it.
+        - Parameters:
+            - stale (dict): the token rejected or seen as expired by the caller
+        """
+        with self._lock:
+            if self.token is not None and self.token is not stale and not self.expiring():
+                return self.token
+            token = self.refresher(self.token)
+            if token is not self.token:
+                self.update(token)
+            return self.token
+
+    @staticmethod
+    def _stamp(token: dict) -> dict:
+        token["expires_at"] = time.time() + int(token.get("expires_in", 3600))
+        return token
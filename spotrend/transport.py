@@ -0,0 +1,200 @@
+import base64
+import json
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from spotrend.cache import ResponseCache
+from spotrend.exceptions import *
+
+# response headers kept in the recorded cassettes
+recorded_headers = ("Content-Type", "ETag", "Retry-After", "Cache-Control")
+# token fields replaced in the recorded cassettes
+redacted_fields = ("access_token", "refresh_token")
+# connections kept alive for each host, as many as the market fan-out workers of Spotrend so a
+# full fan-out returns its connections to the pool instead of discarding them
+default_pool_maxsize = 32
+
+
+class Transport():
+    """
+    Pooled HTTP transport used by the client for every call to the Spotify accounts and Web API.
+    A single requests session keeps the TCP+TLS connections alive between calls, so the
+    handshake is paid once per pooled connection instead of once per request.
+    The transport can be shared across threads and across clients.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = default_pool_maxsize, pool_block: bool = False,
+                 connect_timeout: float = 3.05, read_timeout: float = 27, keep_alive: bool = True, gzip: bool = True):
+        """
+        - Parameters:
+            - pool_connections (int): number of per-host connection pools to cache
+            - pool_maxsize (int): maximum number of connections kept alive for each host
+            - pool_block (bool): if True, callers wait for a free connection instead of opening an extra one
+            - connect_timeout (float): seconds to wait for the connection to be established
+            - read_timeout (float): seconds to wait for the server to send the response
+            - keep_alive (bool): reuse the connections between requests
+            - gzip (bool): negotiate gzip/deflate compressed payloads
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block, max_retries=0)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate" if gzip else "identity",
+            "Connection": "keep-alive" if keep_alive else "close",
+        })
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session
+        - Parameters:
+            - method (str): the HTTP method of the request
+            - url (str): the absolute url of the resource
+            - kwargs: any other argument accepted by requests.Session.request
+        - Returns:
+            - requests.Response: the response of the server
+        """
+        if self.closed:
+            raise RuntimeError("The transport has been closed.")
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send a POST request through the pooled session
+        """
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Close every pooled connection. The transport cannot be used after this call.
+        """
+        with self._lock:
+            if not self.closed:
+                self.closed = True
+                self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_record_key(method: str, url: str, params: dict = None) -> str:
+    """
+    Key of a recorded request: the method and the normalized url and params
+    """
+    return f"{method.upper()} {ResponseCache.get_key(url, params)}"
+
+
+class RecordingTransport(Transport):
+    """
+    Transport saving every response in a cassette, a JSON lines file replayed by the
+    ReplayTransport. The authorization headers are not recorded and the tokens issued
+    by the accounts service are redacted.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        """
+        - Parameters:
+            - path (str): the cassette file, the new responses are appended to it
+            - kwargs: the options of the pooled Transport
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.recorded = 0
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        response = super().request(method, url, **kwargs)
+        content = response.content
+        if "/api/token" in url and response.status_code == 200:
+            token = response.json()
+            content = json.dumps({key: "redacted" if key in redacted_fields else value
+                                  for key, value in token.items()}).encode()
+        record = {
+            "key": get_record_key(method, url, kwargs.get("params")),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in recorded_headers if name in response.headers},
+        }
+        try:
+            record["body"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_base64"] = base64.b64encode(content).decode()
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self.recorded += 1
+        return response
+
+
+class ReplayTransport():
+    """
+    Transport serving the responses of a cassette without any network access. The responses
+    recorded for the same request are served in order, the last one is then served again.
+    """
+
+    def __init__(self, path: str):
+        """
+        - Parameters:
+            - path (str): the cassette written by a RecordingTransport
+        - Excepts:
+            - SpotrendRequestError: if the cassette does not exist
+        """
+        if not os.path.exists(path):
+            raise SpotrendRequestError(f'The cassette {path} does not exist.')
+        self.path = path
+        self.records = {}
+        self.positions = {}
+        self.closed = False
+        self._lock = threading.Lock()
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.records.setdefault(record["key"], []).append(record)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Return the recorded response of a request
+        - Excepts:
+            - SpotrendRequestError: if the request was not recorded
+        """
+        key = get_record_key(method, url, kwargs.get("params"))
+        with self._lock:
+            records = self.records.get(key)
+            if not records:
+                raise SpotrendRequestError(f'There is no recorded response for {key}.')
+            position = self.positions.get(key, 0)
+            self.positions[key] = min(position + 1, len(records) - 1)
+            record = records[position]
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.headers = CaseInsensitiveDict(record["headers"])
+        if "body_base64" in record:
+            response._content = base64.b64decode(record["body_base64"])
+        else:
+            response._content = record["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,237 @@
+import datetime
+import os
+import threading
+import time
+import numpy as np
+from spotrend.exceptions import *
+
+# metrics recorded for each resource object: name -> path of the value in the object
+metrics = {
+    "popularity": ("popularity",),
+    "followers": ("followers", "total"),
+}
+
+# dtype of each column of a partition
+columns = {
+    "time": np.dtype("<i8"),
+    "entity": np.dtype("<i4"),
+    "value": np.dtype("<f8"),
+}
+
+
+def to_epoch(moment) -> int:
+    """
+    Convert a datetime, a date or epoch seconds in epoch seconds, None is now
+    """
+    if moment is None:
+        return int(time.time())
+    if isinstance(moment, datetime.datetime):
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return int(moment.timestamp())
+    if isinstance(moment, datetime.date):
+        return int(datetime.datetime(moment.year, moment.month, moment.day, tzinfo=datetime.timezone.utc).timestamp())
+    return int(moment)
+
+
+def to_day(epoch: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(epoch))
+
+
+class TrendStore():
+    """
+    Append-only time-series store of the popularity and followers snapshots. The points are
+    partitioned by day in a folder for each day, with a binary file for each column of each
+    metric (time, entity, value); the files are only appended and are read as memory maps,
+    so the queries aggregate the points with NumPy without loading or parsing them.
+    The Spotify ids are mapped on integer indexes kept in the entities file.
+    """
+
+    def __init__(self, path: str = "spotrend-trends"):
+        """
+        - Parameters:
+            - path (str): the folder of the store, created if missing
+        """
+        self.path = path
+        self.entities = []
+        self.index = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        entities_file = os.path.join(path, "entities.txt")
+        if os.path.exists(entities_file):
+            with open(entities_file) as f:
+                self.entities = f.read().split()
+            self.index = {entity: index for index, entity in enumerate(self.entities)}
+
+    def record(self, resources: list, timestamp=None) -> int:
+        """
+        Record the metrics of a list of resource objects taken at the same moment
+        - Parameters:
+            - resources (list): the artist, track or album objects (dicts or models)
+            - timestamp: the moment of the snapshot as datetime or epoch seconds, by default now
+        - Returns:
+            - int: the number of points recorded
+        """
+        epoch = to_epoch(timestamp)
+        folder = os.path.join(self.path, to_day(epoch))
+        recorded = 0
+        with self._lock:
+            os.makedirs(folder, exist_ok=True)
+            rows = {metric: ([], []) for metric in metrics}
+            known = len(self.entities)
+            for resource in resources:
+                if resource is None:
+                    continue
+                payload = resource.raw if hasattr(resource, "raw") else resource
+                entity = self._entity(payload["id"])
+                for metric, path in metrics.items():
+                    value = payload
+                    for segment in path:
+                        value = value.get(segment) if isinstance(value, dict) else None
+                    if value is not None:
+                        rows[metric][0].append(entity)
+                        rows[metric][1].append(value)
+            if len(self.entities) > known:
+                with open(os.path.join(self.path, "entities.txt"), "a") as f:
+                    f.write("".join(entity + "\n" for entity in self.entities[known:]))
+            for metric, (entities, values) in rows.items():
+                if not entities:
+                    continue
+                self._repair(folder, metric)
+                arrays = {
+                    "time": np.full(len(entities), epoch, dtype=columns["time"]),
+                    "entity": np.asarray(entities, dtype=columns["entity"]),
+                    "value": np.asarray(values, dtype=columns["value"]),
+                }
+                for column, array in arrays.items():
+                    with open(os.path.join(folder, f"{metric}.{column}"), "ab") as f:
+                        array.tofile(f)
+                recorded += len(entities)
+        return recorded
+
+    def snapshot(self, spotrend, artist_ids: list = (), track_ids: list = (), album_ids: list = (),
+                 timestamp=None) -> int:
+        """
+        Fetch the artists, tracks and albums with the several-items endpoints and record their metrics
+        - Parameters:
+            - spotrend (Spotrend): the facade used to fetch the resources
+        - Returns:
+            - int: the number of points recorded
+        """
+        resources = []
+        if artist_ids:
+            resources.extend(spotrend.get_several_artists(list(artist_ids))["artists"])
+        if track_ids:
+            resources.extend(spotrend.get_several_tracks(list(track_ids))["tracks"])
+        if album_ids:
+            resources.extend(spotrend.get_several_albums(list(album_ids))["albums"])
+        return self.record(resources, timestamp=timestamp)
+
+    def load(self, metric: str, start=None, end=None) -> tuple:
+        """
+        Return the points of a metric between start and end, both included
+        - Returns:
+            - tuple: the arrays of the times, entity indexes and values
+        - Excepts:
+            - SpotrendInvalidDataError: if the metric is unknown
+        """
+        if metric not in metrics:
+            raise SpotrendInvalidDataError(f'The metric {metric} is not recorded.')
+        start = to_epoch(start) if start is not None else None
+        end = to_epoch(end) if end is not None else None
+        parts = {column: [] for column in columns}
+        for day in sorted(os.listdir(self.path)):
+            folder = os.path.join(self.path, day)
+            if not os.path.isdir(folder):
+                continue
+            if start is not None and day < to_day(start) or end is not None and day > to_day(end):
+                continue
+            part = self._read(folder, metric)
+            if part is not None:
+                for column in columns:
+                    parts[column].append(part[column])
+        if not parts["time"]:
+            return tuple(np.empty(0, dtype=dtype) for dtype in columns.values())
+        times, entities, values = (np.concatenate(parts[column]) for column in columns)
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        return times[mask], entities[mask], values[mask]
+
+    def range(self, entity_id: str, metric: str = "popularity", start=None, end=None) -> tuple:
+        """
+        Return the history of a metric of an entity between start and end
+        - Parameters:
+            - entity_id (str): the Spotify id of the artist, track or album
+            - metric (str): popularity or followers
+        - Returns:
+            - tuple: the arrays of the times (epoch seconds) and values, ordered by time
+        """
+        times, entities, values = self.load(metric, start, end)
+        index = self.index.get(entity_id)
+        mask = entities == index if index is not None else np.zeros(len(entities), dtype=bool)
+        order = np.argsort(times[mask], kind="stable")
+        return times[mask][order], values[mask][order]
+
+    def top_movers(self, metric: str = "popularity", start=None, end=None, k: int = 10,
+                   absolute: bool = False) -> list:
+        """
+        Return the entities whose metric changed the most between their first and last point in the window
+        - Parameters:
+            - metric (str): popularity or followers
+            - k (int): the number of entities returned
+            - absolute (bool): rank by the size of the change instead of the growth
+        - Returns:
+            - list: (entity id, first value, last value, change) tuples, the largest change first
+        """
+        times, entities, values = self.load(metric, start, end)
+        if not len(times):
+            return []
+        order = np.lexsort((times, entities))
+        entities, values = entities[order], values[order]
+        boundaries = np.flatnonzero(np.diff(entities)) + 1
+        first = np.concatenate([[0], boundaries])
+        last = np.concatenate([boundaries - 1, [len(entities) - 1]])
+        change = values[last] - values[first]
+        score = np.abs(change) if absolute else change
+        k = min(k, len(score))
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top], kind="stable")]
+        return [(self.entities[entities[first[i]]], float(values[first[i]]), float(values[last[i]]), float(change[i]))
+                for i in top]
+
+    def _entity(self, entity_id: str) -> int:
+        # called holding the lock
+        index = self.index.get(entity_id)
+        if index is None:
+            index = self.index[entity_id] = len(self.entities)
+            self.entities.append(entity_id)
+        return index
+
+    @staticmethod
+    def _repair(folder: str, metric: str) -> None:
+        """
+        Truncate the columns of a metric to the rows written in all of them, an interrupted
+        append would otherwise shift the rows appended after it
+        """
+        paths = {column: os.path.join(folder, f"{metric}.{column}") for column in columns}
+        sizes = {column: os.path.getsize(path) if os.path.exists(path) else 0 for column, path in paths.items()}
+        rows = min(sizes[column] // dtype.itemsize for column, dtype in columns.items())
+        for column, dtype in columns.items():
+            if sizes[column] != rows * dtype.itemsize:
+                with open(paths[column], "r+b") as f:
+                    f.truncate(rows * dtype.itemsize)
+
+    @staticmethod
+    def _read(folder: str, metric: str) -> dict:
+        part = {}
+        for column, dtype in columns.items():
+            path = os.path.join(folder, f"{metric}.{column}")
+            if not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+                return None
+            part[column] = np.memmap(path, dtype=dtype, mode="r", shape=(os.path.getsize(path) // dtype.itemsize,))
+        # an interrupted last append can leave the columns of different lengths
+        size = min(len(array) for array in part.values())
+        return {column: array[:size] for column, array in part.items()}
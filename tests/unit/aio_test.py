@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+from spotrend.aio import *
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    web = None
+
+
+def spotify_id(name):
+    return name.rjust(22, "0")
+
+
+class StubClient():
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+        self.tokens = TokenManager(self.renew_token, token_file=None)
+        self.tokens.update({"access_token": "expired", "expires_in": 3600})
+        self.refreshes = 0
+        self.rate_limiter = RateLimiter(rate=None, backoff_base=0.01)
+        self.cache = None
+        self.etags = None
+        self.hooks = Hooks()
+        self.cache_namespace = "stub"
+
+    def get_tokens(self, url, method="GET"):
+        return self.tokens
+
+    def get_url(self, endpoint):
+        if endpoint.startswith("http"):
+            return endpoint
+        return f"{self.api_url}/{endpoint.lstrip('/')}"
+
+    def renew_token(self, token):
+        self.refreshes += 1
+        return {"access_token": "valid", "expires_in": 3600}
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class AsyncSpotrendTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def artist(request):
+            if request.headers["Authorization"] != "Bearer valid":
+                return web.json_response({}, status=401)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return web.json_response({"id": request.match_info["id"], "market": request.query.get("market")})
+
+        self.throttled = 2
+
+        async def album(request):
+            if self.throttled:
+                self.throttled -= 1
+                return web.json_response({}, status=429, headers={"Retry-After": "0"})
+            if request.match_info["id"] == spotify_id("missing"):
+                return web.json_response({"error": {"status": 404, "message": "Non existing id"}}, status=404)
+            return web.json_response({"id": request.match_info["id"]})
+
+        async def album_tracks(request):
+            offset, limit = int(request.query["offset"]), int(request.query["limit"])
+            following = request.url.update_query(offset=offset + limit) if offset + limit < 120 else None
+            return web.json_response({
+                "items": [{"offset": i} for i in range(offset, min(offset + limit, 120))],
+                "next": str(following) if following else None})
+
+        self.playlist_downloads = 0
+
+        async def playlist(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304)
+            self.playlist_downloads += 1
+            return web.json_response({"id": request.match_info["id"]}, headers={"ETag": '"v1"'})
+
+        app = web.Application()
+        app.router.add_get("/v1/playlists/{id}", playlist)
+        app.router.add_get("/v1/albums/{id}/tracks", album_tracks)
+        app.router.add_get("/v1/albums/{id}", album)
+        app.router.add_get("/v1/artists/{id}", artist)
+        app.router.add_get("/v1/tracks/{id}", artist)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.stub = StubClient(str(self.server.make_url("/v1")))
+        self.client = AsyncClient(client=self.stub, concurrency=5)
+        self.spotrend = AsyncSpotrend(client=self.client)
+
+    async def asyncTearDown(self):
+        await self.spotrend.close()
+        await self.server.close()
+
+    async def test_bounded_concurrency_and_shared_refresh(self):
+        ids = [f"artist{i}" for i in range(30)]
+        results = await asyncio.gather(*(self.client.make_request(f"artists/{i}") for i in ids))
+        self.assertEqual([result["id"] for result in results], ids)
+        self.assertLessEqual(self.max_in_flight, 5)
+        self.assertEqual(self.stub.refreshes, 1)
+
+    async def test_facade_returns_awaitables(self):
+        self.stub.tokens.update({"access_token": "valid", "expires_in": 3600})
+        track = await self.spotrend.get_track(spotify_id("track0"), market="IT")
+        self.assertEqual(track, {"id": spotify_id("track0"), "market": "IT"})
+
+    async def test_sync_context_manager_is_refused(self):
+        with self.assertRaises(TypeError):
+            with self.spotrend:
+                pass
+        async with AsyncSpotrend(client=AsyncClient(client=self.stub)) as spotrend:
+            self.assertIsInstance(spotrend, AsyncSpotrend)
+
+    async def test_retry_after_and_errors(self):
+        self.stub.tokens.update({"access_token": "valid", "expires_in": 3600})
+        self.assertEqual(await self.spotrend.get_album(spotify_id("album0")), {"id": spotify_id("album0")})
+        self.assertEqual(self.throttled, 0)
+        with self.assertRaises(SpotrendNotFoundError):
+            await self.spotrend.get_album(spotify_id("missing"))
+
+    async def test_async_pagination(self):
+        self.stub.tokens.update({"access_token": "valid", "expires_in": 3600})
+        offsets = [track["offset"] async for track in self.spotrend.iter_album_tracks(spotify_id("album0"))]
+        self.assertEqual(offsets, list(range(120)))
+
+    async def test_etag_revalidation(self):
+        self.stub.tokens.update({"access_token": "valid", "expires_in": 3600})
+        self.stub.etags = ETagStore()
+        for _ in range(3):
+            self.assertEqual(await self.spotrend.get_playlist(spotify_id("playlist0")), {"id": spotify_id("playlist0")})
+        self.assertEqual(self.playlist_downloads, 1)
+        self.assertEqual(self.stub.etags.stats()["revalidations"], 2)
+
+    async def test_identical_requests_are_coalesced(self):
+        self.stub.tokens.update({"access_token": "valid", "expires_in": 3600})
+        results = await asyncio.gather(*(self.spotrend.get_artist(spotify_id("artist0")) for _ in range(10)))
+        self.assertEqual(results, [{"id": spotify_id("artist0"), "market": None}] * 10)
+        self.assertEqual(self.max_in_flight, 1)
+        self.assertEqual(self.client.inflight, {})
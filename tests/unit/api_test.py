@@ -0,0 +1,208 @@
+import threading
+import time
+import unittest
+from spotrend.api import *
+
+
+def spotify_id(name):
+    return name.rjust(22, "0")
+
+
+class FakeClient():
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def make_request(self, endpoint, method="GET", params=None, data=None):
+        with self.lock:
+            self.calls.append((endpoint, method, dict(params or {})))
+        ids = (params or {}).get("ids", [])
+        if endpoint.endswith("/contains"):
+            return [lookup_id.endswith("0") for lookup_id in ids]
+        if method == "GET":
+            return {endpoint: [{"id": lookup_id} for lookup_id in ids]}
+        return {}
+
+    def close(self):
+        pass
+
+
+class ChunkingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.spotrend = Spotrend(client=self.client, max_workers=4)
+
+    def test_several_resources_are_chunked_in_order(self):
+        track_ids = [spotify_id(f"track{i}") for i in range(120)]
+        result = self.spotrend.get_several_tracks(track_ids, market="IT")
+        self.assertEqual([track["id"] for track in result["tracks"]], track_ids)
+        self.assertEqual(len(self.client.calls), 3)
+        self.assertTrue(all(len(params["ids"]) <= 50 and params["market"] == "IT"
+                            for _, _, params in self.client.calls))
+
+    def test_album_chunk_size(self):
+        self.spotrend.get_several_albums([spotify_id(f"album{i}") for i in range(41)])
+        self.assertEqual(sorted(len(params["ids"]) for _, _, params in self.client.calls), [1, 20, 20])
+
+    def test_contains_and_status_merge(self):
+        show_ids = [spotify_id(f"show{i}") for i in range(75)]
+        self.assertEqual(self.spotrend.check_user_saved_shows(show_ids), [i % 10 == 0 for i in range(75)])
+        self.assertTrue(self.spotrend.delete_show_from_current_user(show_ids))
+        self.assertTrue(self.spotrend.put_several_resources([spotify_id(f"track{i}") for i in range(60)], "tracks"))
+
+    def test_failed_chunk(self):
+        make_request = self.client.make_request
+
+        def failing(endpoint, method="GET", params=None, data=None):
+            if spotify_id("show60") in params["ids"]:
+                raise SpotrendServerError("The Spotify API failed with status 503.")
+            return make_request(endpoint, method, params, data)
+
+        self.client.make_request = failing
+        with self.assertRaises(SpotrendServerError):
+            self.spotrend.get_several_shows([spotify_id(f"show{i}") for i in range(75)])
+        with self.assertRaises(SpotrendServerError):
+            self.spotrend.put_show_for_current_user([spotify_id(f"show{i}") for i in range(75)])
+
+    def test_models(self):
+        spotrend = Spotrend(client=self.client, models=True)
+        tracks = spotrend.get_several_tracks([spotify_id("a"), spotify_id("b")])["tracks"]
+        self.assertEqual([type(track) for track in tracks], [Track, Track])
+        self.assertEqual(tracks[1].raw, {"id": spotify_id("b")})
+
+    def test_ids_are_normalized(self):
+        track_id = spotify_id("track0")
+        lookup_ids = [track_id, f"spotify:track:{track_id}", f"https://open.spotify.com/track/{track_id}?si=x"]
+        result = self.spotrend.get_several_tracks(lookup_ids)
+        self.assertEqual(result, {"tracks": [{"id": track_id}] * 3})
+        self.assertEqual([params["ids"] for _, _, params in self.client.calls], [[track_id]])
+        with self.assertRaises(SpotrendInvalidDataError):
+            self.spotrend.get_several_tracks([track_id, "not an id"])
+        with self.assertRaises(SpotrendInvalidDataError):
+            self.spotrend.get_track(f"spotify:album:{track_id}")
+        self.assertEqual(self.client.calls[1:], [])
+
+    def test_single_and_sub_resource_ids_are_normalized(self):
+        track_id, show_id = spotify_id("track0"), spotify_id("show0")
+        self.spotrend.get_track(f"https://open.spotify.com/intl-it/track/{track_id}?si=x")
+        self.spotrend.get_show_episodes(f"spotify:show:{show_id}")
+        self.spotrend.get_playlist_items(f"https://open.spotify.com/playlist/{spotify_id('playlist0')}")
+        self.spotrend.get_album_tracks(f"spotify:album:{spotify_id('album0')}")
+        self.spotrend.get_artist_related_artist(f"https://open.spotify.com/artist/{spotify_id('artist0')}")
+        self.assertEqual([endpoint for endpoint, _, _ in self.client.calls], [
+            f"tracks/{track_id}", f"shows/{show_id}/episodes", f"playlists/{spotify_id('playlist0')}/tracks",
+            f"albums/{spotify_id('album0')}/tracks", f"artists/{spotify_id('artist0')}/related-artists"])
+        with self.assertRaises(SpotrendInvalidDataError):
+            self.spotrend.get_show_episodes(f"spotify:episode:{show_id}")
+
+    def test_encode_params(self):
+        params = encode_params({"ids": ["a", "b"], "limit": 20, "market": None})
+        self.assertEqual(params, {"ids": "a,b", "limit": "20"})
+
+
+class PagingClient(FakeClient):
+
+    def __init__(self, total):
+        super().__init__()
+        self.total = total
+
+    def make_request(self, endpoint, method="GET", params=None, data=None):
+        with self.lock:
+            self.calls.append((endpoint, method, dict(params or {})))
+        if endpoint.startswith("https://"):
+            endpoint, query = endpoint[len("https://api/"):].split("?")
+            params = dict(pair.split("=") for pair in query.split("&"))
+        offset, limit = int(params["offset"]), int(params["limit"])
+        next_offset = offset + limit
+        page = {
+            "items": [{"offset": i} for i in range(offset, min(next_offset, self.total))],
+            "next": f"https://api/{endpoint}?offset={next_offset}&limit={limit}" if next_offset < self.total else None,
+        }
+        return {"albums": page} if endpoint == "browse/new-releases" else page
+
+
+class PaginationTest(unittest.TestCase):
+
+    def test_iter_album_tracks(self):
+        client = PagingClient(total=120)
+        spotrend = Spotrend(client=client)
+        offsets = [track["offset"] for track in spotrend.iter_album_tracks(spotify_id("album"))]
+        self.assertEqual(offsets, list(range(120)))
+        self.assertEqual(len(client.calls), 3)
+
+    def test_iter_new_releases_wrapped_page(self):
+        spotrend = Spotrend(client=PagingClient(total=7))
+        self.assertEqual(len(list(spotrend.iter_new_releases(country="IT", limit=5))), 7)
+
+    def test_lazy_prefetch(self):
+        client = PagingClient(total=500)
+        spotrend = Spotrend(client=client)
+        episodes = spotrend.iter_show_episodes(spotify_id("show"), limit=10)
+        self.assertEqual(next(episodes)["offset"], 0)
+        episodes.close()
+        self.assertLessEqual(len(client.calls), 2)
+
+
+class BatchingTest(unittest.TestCase):
+
+    def test_single_gets_are_batched(self):
+        client = FakeClient()
+        spotrend = Spotrend(client=client, batching=True, batch_window=0.05)
+        results = {}
+
+        def get_track(track_id):
+            results[track_id] = spotrend.get_track(track_id, market="IT")
+
+        threads = [threading.Thread(target=get_track, args=(spotify_id(f"track{i}"),)) for i in range(60)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        spotrend.close()
+        self.assertEqual(results, {spotify_id(f"track{i}"): {"id": spotify_id(f"track{i}")} for i in range(60)})
+        self.assertEqual(len(client.calls), 2)
+        self.assertTrue(all(params["market"] == "IT" for _, _, params in client.calls))
+
+    def test_missing_resource(self):
+        client = FakeClient()
+        client.make_request = lambda endpoint, method="GET", params=None, data=None: {"artists": [None]}
+        spotrend = Spotrend(client=client, batching=True)
+        with self.assertRaises(SpotrendNotFoundError):
+            spotrend.get_artist(spotify_id("missing"))
+        spotrend.close()
+
+
+class MarketsClient(FakeClient):
+
+    def make_request(self, endpoint, method="GET", params=None, data=None):
+        super().make_request(endpoint, method, params, data)
+        if endpoint == "markets":
+            return {"markets": ["IT", "FR", "US"]}
+        time.sleep(0.05)
+        market = params["market"] if "market" in params else params["country"]
+        tracks = [{"id": "hit"}, {"id": f"local-{market}"}]
+        if endpoint == "browse/new-releases":
+            return {"albums": {"items": tracks}}
+        return {"tracks": tracks if market != "US" else tracks[::-1]}
+
+
+class FanOutTest(unittest.TestCase):
+
+    def test_top_tracks_by_market(self):
+        client = MarketsClient()
+        start = time.monotonic()
+        matrix = Spotrend(client=client).get_artist_top_tracks_by_market(spotify_id("artist0"))
+        self.assertLess(time.monotonic() - start, 0.14)
+        self.assertEqual(matrix.markets, ["IT", "FR", "US"])
+        self.assertEqual(matrix.ids, ["hit", "local-IT", "local-FR", "local-US"])
+        self.assertEqual(matrix.matrix.tolist(), [[1, 2, 0, 0], [1, 0, 2, 0], [2, 0, 0, 1]])
+        self.assertEqual(matrix.markets_of("local-FR"), ["FR"])
+        self.assertEqual([item["id"] for item in matrix.items_in("US")], ["local-US", "hit"])
+        self.assertEqual(matrix.coverage().tolist(), [3, 1, 1, 1])
+
+    def test_new_releases_by_market(self):
+        matrix = Spotrend(client=MarketsClient()).get_new_releases_by_market(["IT", "IT"], limit=2)
+        self.assertEqual(matrix.markets, ["IT"])
+        self.assertEqual(matrix.ids, ["hit", "local-IT"])
@@ -0,0 +1,22 @@
+import unittest
+from spotrend.benchmark import *
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_run(self):
+        results = Benchmark(concurrency=4, scale=0.02).run(["single_get", "token_refresh"])
+        single = results["results"]["single_get"]
+        self.assertEqual((single["operations"], single["errors"]), (20, 0))
+        self.assertGreaterEqual(single["requests"], 20)
+        self.assertLessEqual(single["p50_ms"], single["p99_ms"])
+        self.assertGreater(single["peak_allocated_bytes"], 0)
+        refresh = results["results"]["token_refresh"]
+        self.assertEqual(refresh["errors"], 0)
+        self.assertEqual(refresh["token_requests"], 1)
+
+    def test_compare(self):
+        baseline = {"results": {"single_get": {"requests_per_second": 100, "p95_ms": 10, "p99_ms": 20}}}
+        current = {"results": {"single_get": {"requests_per_second": 80, "p95_ms": 10.5, "p99_ms": None},
+                               "pagination": {"requests_per_second": 1}}}
+        self.assertEqual(compare(baseline, current), ["single_get.requests_per_second: 100 -> 80 (-20.0%)"])
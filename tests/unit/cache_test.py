@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+import unittest
+from spotrend.cache import *
+
+
+class MemoryCacheTest(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = MemoryCache(maxsize=2)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        cache.get("a")
+        cache.set("c", b"3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), b"1")
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl(self):
+        cache = MemoryCache()
+        cache.set("a", b"1", ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class SqliteCacheTest(unittest.TestCase):
+
+    def test_persistence_and_eviction(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "cache.sqlite")
+            cache = SqliteCache(path, maxsize=2)
+            cache.set("a", b"1", ttl=60)
+            cache.set("b", b"2", ttl=60)
+            cache.set("c", b"3", ttl=60)
+            self.assertEqual(cache.evictions, 1)
+            cache.close()
+            cache = SqliteCache(path, maxsize=2)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.get("c"), b"3")
+            cache.set("d", b"4", ttl=-1)
+            self.assertIsNone(cache.get("d"))
+            cache.close()
+
+    def test_count(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = SqliteCache(os.path.join(folder, "cache.sqlite"), maxsize=3)
+            cache.set("a", b"1")
+            cache.set("a", b"2")
+            cache.set("b", b"3")
+            self.assertEqual(len(cache), 2)
+            cache.delete("a")
+            cache.delete("missing")
+            self.assertEqual(len(cache), 1)
+            for key in "cdef":
+                cache.set(key, b"4")
+            self.assertEqual((len(cache), cache.evictions), (3, 2))
+            self.assertEqual(len(cache), cache.connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0])
+            cache.clear()
+            self.assertEqual(len(cache), 0)
+            cache.close()
+
+
+class CacheBackendTest(unittest.TestCase):
+
+    def test_incomplete_backend(self):
+        class GetOnlyCache(CacheBackend):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            GetOnlyCache()
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_key_normalization(self):
+        first = ResponseCache.get_key("https://api.spotify.com/v1/tracks?market=IT", {"ids": "a,b"})
+        second = ResponseCache.get_key("https://api.spotify.com/v1/tracks", {"ids": "a,b", "market": "IT"})
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, ResponseCache.get_key("https://api.spotify.com/v1/tracks", {"ids": "a,b"}))
+        self.assertNotEqual(ResponseCache.get_key("https://api.spotify.com/v1/me", namespace="id:user1.json"),
+                            ResponseCache.get_key("https://api.spotify.com/v1/me", namespace="id:user2.json"))
+
+    def test_resource_ttls(self):
+        cache = ResponseCache(ttls={"playlists": 60})
+        self.assertEqual(cache.get_ttl("https://api.spotify.com/v1/recommendations/available-genre-seeds"), 86400)
+        self.assertEqual(cache.get_ttl("https://api.spotify.com/v1/playlists/abc"), 60)
+        self.assertEqual(cache.get_ttl("https://api.spotify.com/v1/me/albums"), 0)
+
+    def test_stats(self):
+        cache = ResponseCache(MemoryCache(maxsize=1))
+        url = "https://api.spotify.com/v1/artists/a"
+        self.assertIsNone(cache.get(url))
+        cache.set(url, None, b"{}")
+        self.assertEqual(cache.get(url), b"{}")
+        cache.set("https://api.spotify.com/v1/artists/b", None, b"{}")
+        cache.set("https://api.spotify.com/v1/me", None, b"{}")
+        self.assertIsNone(cache.get("https://api.spotify.com/v1/me"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "evictions": 1, "size": 1})
+
+
+class ETagStoreTest(unittest.TestCase):
+
+    def test_validators(self):
+        store = ETagStore()
+        url = "https://api.spotify.com/v1/playlists/a"
+        self.assertIsNone(store.get(url))
+        store.set(url, {"market": "IT"}, '"abc"', b'{"id": "a"}')
+        self.assertIsNone(store.get(url))
+        self.assertEqual(store.get(url, {"market": "IT"}), ('"abc"', b'{"id": "a"}'))
@@ -0,0 +1,190 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from spotrend.client import *
+
+
+class FakeResponse():
+
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode() if payload is not None else b""
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeTransport():
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        pass
+
+
+class ClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.folder.name, "token.json")
+        self.oauth2 = mock.patch.object(Client, "oauth2", side_effect=AssertionError("interactive flow started"))
+        self.oauth2.start()
+
+    def tearDown(self):
+        self.oauth2.stop()
+        self.folder.cleanup()
+
+    def get_client(self, responses, **kwargs):
+        self.transport = FakeTransport(responses)
+        return Client("id", "secret", "http://localhost:8080", transport=self.transport,
+                      rate_limiter=RateLimiter(rate=None), token_file=self.token_file, **kwargs)
+
+    def test_client_credentials_for_catalog(self):
+        client = self.get_client([
+            FakeResponse(payload={"access_token": "app", "expires_in": 3600}),
+            FakeResponse(payload={"id": "artist"}),
+        ], grant="client_credentials")
+        self.assertEqual(client.make_request("artists/artist"), {"id": "artist"})
+        method, url, kwargs = self.transport.calls[0]
+        self.assertEqual(kwargs["data"], {"grant_type": "client_credentials"})
+        self.assertEqual(self.transport.calls[1][2]["headers"]["Authorization"], "Bearer app")
+        self.assertFalse(os.path.exists(self.token_file))
+
+    def test_cached_token_is_reused(self):
+        with open(self.token_file, "w") as f:
+            json.dump({"access_token": "cached", "refresh_token": "refresh",
+                       "expires_in": 3600, "expires_at": time.time() + 3600}, f)
+        client = self.get_client([FakeResponse(payload={"id": "me"})])
+        self.assertEqual(client.make_request("me"), {"id": "me"})
+        self.assertEqual(self.transport.calls[0][2]["headers"]["Authorization"], "Bearer cached")
+
+    def test_user_scoped_endpoint_starts_authorization(self):
+        client = self.get_client([], grant="client_credentials")
+        self.assertTrue(client.is_user_scoped("me/albums"))
+        self.assertFalse(client.is_user_scoped("artists/a"))
+        self.assertTrue(client.is_user_scoped("playlists/a/tracks", method="POST"))
+        with self.assertRaisesRegex(AssertionError, "interactive flow"):
+            client.make_request("me/albums")
+
+    def test_retry_after_and_401_refresh(self):
+        with open(self.token_file, "w") as f:
+            json.dump({"access_token": "old", "refresh_token": "refresh",
+                       "expires_in": 3600, "expires_at": time.time() + 3600}, f)
+        client = self.get_client([
+            FakeResponse(401),
+            FakeResponse(payload={"access_token": "new", "expires_in": 3600}),
+            FakeResponse(429, headers={"Retry-After": "0"}),
+            FakeResponse(payload={"id": "track"}),
+        ])
+        self.assertEqual(client.make_request("tracks/track"), {"id": "track"})
+        self.assertEqual(self.transport.calls[1][2]["data"]["grant_type"], "refresh_token")
+        self.assertEqual(self.transport.calls[3][2]["headers"]["Authorization"], "Bearer new")
+        self.assertEqual(client.token["refresh_token"], "refresh")
+
+    def test_shared_cache_is_split_per_user(self):
+        cache = ResponseCache(MemoryCache())
+        clients = []
+        for user in ("user1", "user2"):
+            token_file = os.path.join(self.folder.name, f"{user}.json")
+            with open(token_file, "w") as f:
+                json.dump({"access_token": user, "expires_in": 3600, "expires_at": time.time() + 3600}, f)
+            clients.append(Client("id", "secret", "http://localhost:8080", rate_limiter=RateLimiter(rate=None),
+                                  transport=FakeTransport([FakeResponse(payload={"owner": user})] * 2),
+                                  cache=cache, token_file=token_file))
+        first, second = clients
+        self.assertEqual(first.make_request("playlists/private"), {"owner": "user1"})
+        self.assertEqual(first.make_request("playlists/private"), {"owner": "user1"})
+        self.assertEqual(second.make_request("playlists/private"), {"owner": "user2"})
+        self.assertEqual((len(first.transport.calls), len(second.transport.calls)), (1, 1))
+
+    def test_quota_error_after_retries(self):
+        client = self.get_client([FakeResponse(payload={"access_token": "app", "expires_in": 3600})] +
+                                 [FakeResponse(429, headers={"Retry-After": "0"})] * 3, grant="client_credentials")
+        client.rate_limiter.max_retries = 2
+        with self.assertRaises(SpotrendQuotaError):
+            client.make_request("albums/album")
+
+
+class ClientRegistryTest(unittest.TestCase):
+
+    def test_clients_are_shared_per_credentials(self):
+        registry = ClientRegistry(maxsize=2, transport=FakeTransport([]), rate_limiter=RateLimiter(rate=None))
+        first = registry.get_client("id", "secret", token_file="user1.json")
+        self.assertIs(registry.get_client("id", "secret", token_file="user1.json"), first)
+        second = registry.get_client("id", "secret", token_file="user2.json")
+        self.assertIsNot(first, second)
+        self.assertIs(first.transport, second.transport)
+        self.assertIs(first.rate_limiter, second.rate_limiter)
+        second.close()
+        registry.get_client("id", "secret", token_file="user3.json")
+        self.assertEqual(len(registry), 2)
+        self.assertNotIn(("id", "secret", None, "authorization_code", "user1.json"), registry)
+
+    def test_spotrend_users_of_one_app(self):
+        from spotrend.api import Spotrend
+        folder = tempfile.mkdtemp()
+        first = Spotrend("id", "secret", token_file=os.path.join(folder, "user1.json"))
+        second = Spotrend("id", "secret", token_file=os.path.join(folder, "user2.json"))
+        try:
+            self.assertIsNot(first.client, second.client)
+            self.assertEqual(second.client.token_file, os.path.join(folder, "user2.json"))
+            self.assertIs(first.client.transport, second.client.transport)
+            self.assertIs(Spotrend("id", "secret", token_file=os.path.join(folder, "user1.json")).client, first.client)
+        finally:
+            registry.clear()
+
+    def test_idle_eviction(self):
+        evicted = []
+        registry = Registry(lambda key: object(), idle_timeout=0.01, on_evict=evicted.append)
+        first = registry.get("a", "a")
+        time.sleep(0.02)
+        registry.get("b", "b")
+        self.assertEqual(evicted, [first])
+        self.assertEqual(len(registry), 1)
+
+
+class SlowTransport(FakeTransport):
+
+    def request(self, method, url, **kwargs):
+        time.sleep(0.05)
+        self.calls.append((method, url, kwargs))
+        return FakeResponse(payload={"url": url})
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_identical_requests_are_coalesced(self):
+        transport = SlowTransport([])
+        client = Client("id", "secret", transport=transport, rate_limiter=RateLimiter(rate=None), token_file=None)
+        client.tokens.update({"access_token": "valid", "expires_in": 3600})
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.make_request("artists/a", params={"market": "IT"})))
+                   for _ in range(8)]
+        threads.append(threading.Thread(target=lambda: results.append(client.make_request("artists/b"))))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 9)
+        self.assertEqual(len(transport.calls), 2)
+        self.assertEqual(len(client.inflight), 0)
+
+    def test_errors_are_shared(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("key", int, "not a number")
+        self.assertEqual(flight.do("key", int, "1"), 1)
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+import pyarrow.parquet as pq
+from spotrend.data import *
+
+track = {
+    "id": "t1", "name": "Song", "popularity": 50, "explicit": True,
+    "album": {"id": "a1", "name": "Album", "release_date": "2020-01-01"},
+    "artists": [{"id": "r1", "name": "First"}, {"id": "r2", "name": "Second"}],
+}
+
+
+class DataImportTest(unittest.TestCase):
+
+    def test_flatten(self):
+        stream = [
+            {"items": [{"added_at": "2023-01-01T00:00:00Z", "track": track}]},
+            {"tracks": [dict(track, id="t2", artists=None), None]},
+            dict(track, id="t3", artists=[]),
+        ]
+        rows = DataImport("tracks").to_table(stream).to_pylist()
+        self.assertEqual([row["id"] for row in rows], ["t1", "t2", "t3"])
+        self.assertEqual(rows[0]["album_id"], "a1")
+        self.assertEqual(rows[0]["artist_names"], ["First", "Second"])
+        self.assertEqual([row["artist_ids"] for row in rows[1:]], [None, []])
+        self.assertIsNone(rows[0]["isrc"])
+
+    def test_parquet_batches(self):
+        stream = ({"tracks": [dict(track, id=str(i)) for i in range(i, i + 10)]} for i in range(0, 50, 10))
+        path = os.path.join(tempfile.mkdtemp(), "tracks.parquet")
+        self.assertEqual(DataImport("tracks", batch_size=20).to_parquet(stream, path), 50)
+        parquet = pq.ParquetFile(path)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.read().column("id").to_pylist(), [str(i) for i in range(50)])
+
+    def test_frame_and_custom_columns(self):
+        frame = DataImport("artists", columns={"genre": (("genres", "*"), "string")}).to_frame(
+            [{"artists": [{"id": "a", "genres": ["rock", "pop"]}]}])
+        self.assertEqual(list(frame.columns), ["genre"])
+        self.assertEqual(list(frame["genre"][0]), ["rock", "pop"])
+
+    def test_unknown_type(self):
+        with self.assertRaises(SpotrendInvalidDataError):
+            DataImport("audiobooks")
+
+
+playlist_id = "37i9dQZF1DXcBWIGoYBM5M"
+
+
+class LibraryClient():
+
+    def __init__(self):
+        self.albums = [{"added_at": f"2023-01-{i + 1:02d}", "album": {"id": f"a{i}"}} for i in range(120)]
+        self.tracks = [{"added_at": "2023-01-01", "track": {"id": f"t{i}"}} for i in range(5)]
+        self.snapshot = "s1"
+        self.calls = []
+
+    def make_request(self, endpoint, method="GET", params=None, data=None, fields=None):
+        endpoint, _, query = endpoint.partition("?")
+        params = dict(params or {}, **dict(pair.split("=") for pair in query.split("&") if pair))
+        self.calls.append(endpoint)
+        if endpoint == f"playlists/{playlist_id}":
+            return {"snapshot_id": self.snapshot}
+        items = {"me/albums": lambda: sorted(self.albums, key=lambda item: item["added_at"], reverse=True),
+                 "me/shows": lambda: [], f"playlists/{playlist_id}/tracks": lambda: self.tracks}[endpoint]()
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 20))
+        following = f"{endpoint}?offset={offset + limit}&limit={limit}" if offset + limit < len(items) else None
+        return {"items": items[offset:offset + limit], "total": len(items), "next": following}
+
+    def close(self):
+        pass
+
+
+class DataIntegrationTest(unittest.TestCase):
+
+    def setUp(self):
+        from spotrend.api import Spotrend
+        self.client = LibraryClient()
+        self.path = os.path.join(tempfile.mkdtemp(), "sync.json")
+        self.integration = DataIntegration(Spotrend(client=self.client), CheckpointStore(self.path))
+
+    def test_saved_items(self):
+        self.assertEqual(len(self.integration.sync_saved_albums().added), 120)
+        self.client.albums.append({"added_at": "2023-06-01", "album": {"id": "new"}})
+        self.client.calls.clear()
+        change = self.integration.sync_saved_albums()
+        self.assertEqual([item["album"]["id"] for item in change.added], ["new"])
+        self.assertEqual(change.removed, [])
+        self.assertLessEqual(len(self.client.calls), 2)
+        del self.client.albums[0]
+        change = DataIntegration(self.integration.spotrend, CheckpointStore(self.path)).sync_saved_albums()
+        self.assertEqual((change.added, change.removed), ([], ["a0"]))
+
+    def test_playlist(self):
+        self.assertEqual(len(self.integration.sync_playlist(playlist_id).added), 5)
+        self.assertFalse(self.integration.sync_playlist(playlist_id))
+        self.assertFalse(self.integration.sync_playlist(f"https://open.spotify.com/playlist/{playlist_id}"))
+        self.client.snapshot = "s2"
+        self.client.tracks = self.client.tracks[1:] + [{"added_at": "2023-02-01", "track": {"id": "t9"}}]
+        self.client.tracks[0] = {"added_at": "2023-03-01", "track": {"id": "t1"}}
+        changes = self.integration.sync(playlist_ids=[playlist_id])
+        change = changes[f"playlists/{playlist_id}"]
+        self.assertEqual([item["track"]["id"] for item in change.added], ["t9"])
+        self.assertEqual([item["track"]["id"] for item in change.modified], ["t1"])
+        self.assertEqual(change.removed, ["t0"])
+        self.assertFalse(changes["me/shows"])
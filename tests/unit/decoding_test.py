@@ -0,0 +1,66 @@
+import json
+import unittest
+from spotrend.api import *
+from spotrend.decoding import *
+from spotrend.mock import *
+
+playlist = {
+    "name": "Daily",
+    "snapshot_id": "s1",
+    "tracks": {"total": 2, "items": [
+        {"added_at": "2023-01-01", "track": {"id": "t0", "name": "Zero", "available_markets": ["IT"]}},
+        {"added_at": "2023-01-02", "track": {"id": "t1", "name": "One", "available_markets": ["FR"]}},
+    ]},
+}
+
+
+class ProjectionTest(unittest.TestCase):
+
+    def test_apply(self):
+        projection = Projection("name, tracks.items(added_at,track(id))")
+        self.assertEqual(projection.fields, "name,tracks.items(added_at,track(id))")
+        self.assertEqual(projection.apply(playlist), {"name": "Daily", "tracks": {"items": [
+            {"added_at": "2023-01-01", "track": {"id": "t0"}}, {"added_at": "2023-01-02", "track": {"id": "t1"}}]}})
+        self.assertEqual(Projection("tracks(total),tracks.items(track(name))").apply(playlist),
+                         {"tracks": {"total": 2, "items": [{"track": {"name": "Zero"}}, {"track": {"name": "One"}}]}})
+        self.assertEqual(Projection("tracks.items(track(!available_markets))").apply(playlist)["tracks"]["items"][1],
+                         {"track": {"id": "t1", "name": "One"}})
+        self.assertEqual(Projection("missing,name").apply(playlist), {"name": "Daily"})
+
+    def test_malformed(self):
+        for fields in ("", "name,", "tracks(items", "tracks)", "tracks.(id)", "name;id"):
+            with self.assertRaises(SpotrendInvalidDataError):
+                Projection(fields)
+        self.assertFalse(Spotrend._field_regex("tracks(items"))
+        self.assertTrue(Spotrend._field_regex("description,uri"))
+
+    def test_decoder(self):
+        self.assertIs(get_decoder("json"), json.loads)
+        self.assertEqual(get_decoder()(b'{"a": [1]}'), {"a": [1]})
+        with self.assertRaises(SpotrendRequestError):
+            get_decoder("simdjson")
+        self.assertTrue(supports_fields("https://api.spotify.com/v1/playlists/37i9dQZF1DXcBWIGoYBM5M/tracks?limit=5"))
+        self.assertFalse(supports_fields("https://api.spotify.com/v1/tracks/4uLU6hMCjMI75M1A2tKUQC"))
+
+
+class FieldsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockSpotifyServer(tracks=40, albums=2, artists=2, playlists=1).start()
+        self.client = self.mock.client(rate_limiter=RateLimiter(rate=None), decoder="json")
+        self.spotrend = Spotrend(client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.mock.stop()
+
+    def test_server_and_client_side_fields(self):
+        playlist_id = list(self.mock.playlists)[0]
+        self.assertEqual(set(self.spotrend.get_playlist(playlist_id, fields="name,snapshot_id")), {"name", "snapshot_id"})
+        page = self.spotrend.get_playlist_items(playlist_id, limit=5, fields="total,items(track(id))")
+        self.assertEqual(page["total"], len(self.mock.playlists[playlist_id]["track_ids"]))
+        self.assertEqual([set(item["track"]) for item in page["items"]], [{"id"}] * 5)
+        track_id = list(self.mock.tracks)[0]
+        self.assertEqual(self.spotrend.get_resource(track_id, "tracks", fields="id,name")["id"], track_id)
+        several = self.spotrend.get_several_resources(list(self.mock.tracks)[:3], "tracks", fields="id")
+        self.assertEqual(several, {"tracks": [{"id": track_id} for track_id in list(self.mock.tracks)[:3]]})
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from spotrend.graph import *
+
+# a -> b, c; b -> d; c -> d, e; d -> f
+related = {"a": ["b", "c"], "b": ["d"], "c": ["d", "e"], "d": ["f"], "e": [], "f": ["a"]}
+
+
+def spotify_id(name):
+    return name.rjust(22, "0")
+
+
+def names(artist_ids):
+    return [artist_id.lstrip("0") for artist_id in artist_ids]
+
+
+class RelatedSpotrend():
+
+    def __init__(self, fail_on=None):
+        self.requested = []
+        self.fail_on = fail_on
+
+    def get_artist_related_artist(self, artist_id):
+        name = artist_id.lstrip("0")
+        if name == self.fail_on:
+            raise SpotrendServerError("unavailable")
+        self.requested.append(name)
+        return {"artists": [{"id": spotify_id(other), "name": other.upper(), "popularity": 10}
+                            for other in related[name]]}
+
+    def get_several_artists(self, artist_ids):
+        return {"artists": [{"id": artist_id, "name": artist_id.lstrip("0").upper(), "popularity": 50}
+                            for artist_id in artist_ids]}
+
+
+class GraphTest(unittest.TestCase):
+
+    def test_crawl(self):
+        spotrend = RelatedSpotrend()
+        graph = GraphCrawler(spotrend, max_depth=2, max_workers=2).crawl([spotify_id("a")])
+        self.assertEqual(sorted(spotrend.requested), ["a", "b", "c"])
+        self.assertEqual(names(graph.ids), ["a", "b", "c", "d", "e"])
+        self.assertEqual(names(graph.neighbours(spotify_id("c"))), ["d", "e"])
+        self.assertEqual(graph.neighbours(spotify_id("d")), [])
+        self.assertEqual(graph.names[0], "A")
+        self.assertEqual(graph.popularity[0], 50)
+
+    def test_shortest_path_and_persistence(self):
+        graph = GraphCrawler(RelatedSpotrend(), max_depth=5).crawl([spotify_id("a")])
+        path = os.path.join(tempfile.mkdtemp(), "graph")
+        graph.save(path)
+        loaded = ArtistGraph.load(path)
+        self.assertEqual(names(loaded.shortest_path(spotify_id("a"), spotify_id("f"))), ["a", "b", "d", "f"])
+        self.assertEqual(names(loaded.shortest_path(spotify_id("f"), spotify_id("e"))), ["f", "a", "c", "e"])
+        self.assertIsNone(loaded.shortest_path(spotify_id("e"), spotify_id("a")))
+        with self.assertRaises(SpotrendNotFoundError):
+            loaded.neighbours("z")
+
+    def test_resume(self):
+        state_file = os.path.join(tempfile.mkdtemp(), "crawl.json")
+        with self.assertRaises(SpotrendServerError):
+            GraphCrawler(RelatedSpotrend(fail_on="d"), max_depth=3, state_file=state_file).crawl([spotify_id("a")])
+        spotrend = RelatedSpotrend()
+        graph = GraphCrawler(spotrend, max_depth=3, state_file=state_file).crawl([spotify_id("a")])
+        self.assertEqual(sorted(spotrend.requested), ["d", "e"])
+        self.assertEqual(names(graph.neighbours(spotify_id("d"))), ["f"])
+
+    def test_uri_seeds(self):
+        graph = GraphCrawler(RelatedSpotrend(), max_depth=1).crawl([f"spotify:artist:{spotify_id('a')}"])
+        self.assertEqual(names(graph.ids), ["a", "b", "c"])
+        self.assertEqual(names(graph.neighbours(spotify_id("a"))), ["b", "c"])
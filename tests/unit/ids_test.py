@@ -0,0 +1,34 @@
+import unittest
+from spotrend.ids import *
+
+track_id = "4uLU6hMCjMI75M1A2tKUQC"
+
+
+class IdsTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_id(track_id), (None, track_id))
+        self.assertEqual(parse_id(f"spotify:track:{track_id}"), ("tracks", track_id))
+        self.assertEqual(parse_id(f"https://open.spotify.com/intl-it/album/{track_id}?si=abc"), ("albums", track_id))
+        for value in ("", "short", f"spotify:user:{track_id}", f"{track_id}!", f"https://example.com/track/{track_id}"):
+            with self.assertRaises(SpotrendInvalidDataError):
+                parse_id(value)
+
+    def test_normalize_ids(self):
+        values = [f"spotify:track:{track_id}", track_id, "0" * 22, f"https://open.spotify.com/track/{track_id}"]
+        self.assertEqual(normalize_ids(values, "tracks"), ([track_id, "0" * 22], [0, 0, 1, 0]))
+        with self.assertRaises(SpotrendInvalidDataError):
+            normalize_ids(values, "albums")
+        with self.assertRaises(SpotrendInvalidDataError):
+            normalize_id(None)
+
+    def test_infer_type(self):
+        self.assertEqual(infer_type([track_id, f"spotify:show:{track_id}"]), "shows")
+        self.assertIsNone(infer_type([track_id]))
+        with self.assertRaises(SpotrendInvalidDataError):
+            infer_type([f"spotify:show:{track_id}", f"spotify:track:{track_id}"])
+
+    def test_expand(self):
+        self.assertEqual(expand([True, False], [1, 0, 1]), [False, True, False])
+        self.assertEqual(expand({"tracks": ["a", "b"]}, [1, 1]), {"tracks": ["b", "b"]})
+        self.assertTrue(expand(True, [0, 0]))
@@ -0,0 +1,65 @@
+import unittest
+from spotrend.api import *
+from spotrend.library import *
+from spotrend.mock import *
+
+
+class LibraryEditorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockSpotifyServer(tracks=100, albums=120, artists=60).start()
+        self.client = self.mock.client(rate_limiter=RateLimiter(rate=None, backoff_base=0.001, max_retries=0))
+        self.editor = LibraryEditor(Spotrend(client=self.client), retries=1)
+
+    def tearDown(self):
+        self.client.close()
+        self.mock.stop()
+
+    def test_save_sends_only_changes(self):
+        album_ids = list(self.mock.albums)
+        report = self.editor.save("albums", album_ids + [f"spotify:album:{album_ids[0]}"])
+        self.assertEqual(len(report), 120)
+        self.assertEqual(report.unchanged, album_ids[:30])
+        self.assertEqual(report.changed, album_ids[30:])
+        self.assertEqual(report[album_ids[-1]], "changed")
+        # 6 checks and 5 saves of at most 20 albums
+        self.assertEqual(report.requests, 11)
+        self.assertEqual(self.mock.calls["me/albums"], 5)
+        self.assertEqual(self.mock.library["albums"], set(album_ids))
+        self.assertTrue(self.editor.remove("albums", album_ids[:50]).ok)
+        self.assertEqual(self.editor.contains("albums", album_ids[49:51]), {album_ids[49]: False, album_ids[50]: True})
+
+    def test_follow(self):
+        artist_ids = list(self.mock.artists)
+        self.assertEqual(len(self.editor.follow(artist_ids).changed), 60)
+        report = self.editor.unfollow(artist_ids[:10] + artist_ids[:10])
+        self.assertEqual((len(report.changed), report.requests), (10, 2))
+        self.assertEqual(len(self.mock.library["artists"]), 50)
+        with self.assertRaises(SpotrendInvalidDataError):
+            self.editor.save("playlists", artist_ids)
+
+    def test_failed_chunks_are_reported(self):
+        self.mock.error_rate = 1.0
+        track_ids = list(self.mock.tracks)[:60]
+        report = self.editor.save("tracks", track_ids)
+        self.assertEqual(report.failed, track_ids)
+        self.assertIsInstance(report.errors[track_ids[0]], SpotrendServerError)
+        # each of the 2 checks and 2 saves is attempted twice
+        self.assertEqual(report.requests, 8)
+        self.assertFalse(report.ok)
+
+    def test_only_transient_errors_are_retried(self):
+        make_request = self.client.make_request
+        track_ids = list(self.mock.tracks)[:20]
+        for error, attempts in ((SpotrendRequestError("The Spotify API answered with status 409."), 1),
+                                (SpotrendConnectionError("Cannot reach the Spotify API: reset"), 2)):
+            def failing(endpoint, method="GET", params=None, data=None, fields=None):
+                if method == "PUT":
+                    raise error
+                return make_request(endpoint, method, params, data)
+
+            self.client.make_request = failing
+            report = self.editor.save("tracks", track_ids)
+            self.assertIs(report.errors[track_ids[0]], error)
+            # a single check and the attempts of the save
+            self.assertEqual(report.requests, 1 + attempts)
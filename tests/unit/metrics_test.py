@@ -0,0 +1,55 @@
+import unittest
+from spotrend.api import *
+from spotrend.metrics import *
+from spotrend.mock import *
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockSpotifyServer(tracks=20, albums=2, artists=2).start()
+        self.client = self.mock.client(rate_limiter=RateLimiter(rate=None, backoff_base=0.01),
+                                       cache=ResponseCache(MemoryCache()))
+        self.metrics = MetricsCollector().attach(self.client.hooks)
+        self.spotrend = Spotrend(client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.mock.stop()
+
+    def test_get_endpoint(self):
+        self.assertEqual(get_endpoint("https://api.spotify.com/v1/albums/4aawyAB9vmqN3uQ7FjRGTy/tracks?limit=5"),
+                         "albums/{id}/tracks")
+        self.assertEqual(get_endpoint("https://api.spotify.com/v1/users/smedjan/playlists"), "users/{id}/playlists")
+        self.assertEqual(get_endpoint("http://127.0.0.1:8000/v1/me/albums"), "me/albums")
+
+    def test_collector(self):
+        track_id = list(self.mock.tracks)[0]
+        self.mock.expire_tokens()
+        self.mock.throttle(1, retry_after=0)
+        self.spotrend.get_track(track_id)
+        self.spotrend.get_track(track_id)
+        metrics = self.metrics.snapshot()
+        track = metrics["endpoints"]["GET tracks/{id}"]
+        self.assertEqual(track["statuses"], {401: 1, 429: 1, 200: 1})
+        self.assertEqual((track["requests"], track["retries"], track["cache_hits"]), (3, 1, 1))
+        self.assertEqual(sum(track["latency_buckets"].values()), 3)
+        self.assertGreater(track["bytes_in"], 0)
+        self.assertEqual(metrics["token_refreshes"], {"refresh_token 200": 1})
+        text = self.metrics.to_prometheus()
+        self.assertIn('spotrend_requests_total{endpoint="tracks/{id}",method="GET",status="429"} 1', text)
+        self.assertIn('spotrend_request_duration_seconds_bucket{endpoint="tracks/{id}",method="GET",le="+Inf"} 3', text)
+        self.assertIn('spotrend_token_refreshes_total{grant="refresh_token",status="200"} 1', text)
+        self.metrics.detach(self.client.hooks)
+        self.spotrend.get_track(list(self.mock.tracks)[1])
+        self.assertEqual(self.metrics.snapshot(), metrics)
+
+    def test_hooks(self):
+        sent = []
+        self.client.hooks.register("before_send", lambda **event: sent.append(event["url"]))
+        self.client.hooks.register("before_send", lambda **event: 1 / 0)
+        with self.assertLogs("spotrend", level="ERROR"):
+            self.assertEqual(self.spotrend.get_artist(list(self.mock.artists)[0])["type"], "artist")
+        self.assertEqual(len(sent), 1)
+        with self.assertRaises(ValueError):
+            self.client.hooks.register("before_sending", print)
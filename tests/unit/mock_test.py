@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from spotrend.api import *
+from spotrend.mock import *
+
+
+class MockServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockSpotifyServer(tracks=200, albums=10, artists=5).start()
+        self.client = self.mock.client(rate_limiter=RateLimiter(rate=None, backoff_base=0.01))
+        self.spotrend = Spotrend(client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.mock.stop()
+
+    def test_paging_and_batching(self):
+        track_ids = list(self.mock.tracks)[:120]
+        self.assertEqual([track["id"] for track in self.spotrend.get_several_tracks(track_ids)["tracks"]], track_ids)
+        self.assertEqual(self.mock.calls["tracks"], 3)
+        self.assertEqual(len(list(self.spotrend.iter_album_tracks(list(self.mock.albums)[0], limit=7))), 20)
+        self.assertEqual(len(list(self.spotrend.iter_user_saved_albums())), 10)
+        with self.assertRaises(SpotrendNotFoundError):
+            self.spotrend.get_track("0" * 22)
+        with self.assertRaises(SpotrendInvalidDataError):
+            self.spotrend.get_track("missing")
+
+    def test_token_expiry_and_throttling(self):
+        self.mock.expire_tokens()
+        artist_id = list(self.mock.artists)[0]
+        self.assertEqual(self.spotrend.get_artist(artist_id)["id"], artist_id)
+        self.mock.throttle(2, retry_after=0)
+        self.assertEqual(self.spotrend.get_album(list(self.mock.albums)[0])["total_tracks"], 20)
+        self.assertEqual(self.mock.statuses[401], 1)
+        self.assertEqual(self.mock.statuses[429], 2)
+
+    def test_record_and_replay(self):
+        cassette = os.path.join(tempfile.mkdtemp(), "cassette.jsonl")
+        recording = self.mock.client(transport=RecordingTransport(cassette))
+        track_id = list(self.mock.tracks)[5]
+        expected = Spotrend(client=recording).get_track(track_id, market="IT")
+        recording.transport.close()
+        self.assertNotIn("Bearer", open(cassette).read())
+        client = Client("id", "secret", "uri", transport=ReplayTransport(cassette), token_file=None)
+        client.api_url = f"{self.mock.url}/v1"
+        client.tokens.update({"access_token": "offline", "expires_in": 3600})
+        replay = Spotrend(client=client)
+        self.assertEqual(replay.get_track(track_id, market="IT"), expected)
+        with self.assertRaises(SpotrendRequestError):
+            replay.get_track(track_id)
+        self.assertEqual(self.mock.calls["tracks/{id}"], 1)
+
+
+class PlaylistExpansionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockSpotifyServer(tracks=500, albums=20, artists=10, playlists=1).start()
+        self.playlist_id = list(self.mock.playlists)[0]
+        self.mock.playlists[self.playlist_id]["track_ids"] = list(self.mock.tracks) * 2
+        self.client = self.mock.client(rate_limiter=RateLimiter(rate=None))
+        self.spotrend = Spotrend(client=self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.mock.stop()
+
+    def test_url_input(self):
+        url = f"https://open.spotify.com/playlist/{self.playlist_id}?si=x"
+        self.assertEqual(len(list(self.spotrend.expand_playlist_items(url))), 1000)
+        self.assertEqual(self.spotrend.get_playlist_items(url, limit=5)["total"], 1000)
+        track_id = list(self.mock.tracks)[0]
+        self.assertEqual(self.spotrend.get_track(f"https://open.spotify.com/track/{track_id}")["id"], track_id)
+
+    def test_items_in_order(self):
+        items = list(self.spotrend.expand_playlist_items(self.playlist_id, concurrency=4, buffer=3))
+        self.assertEqual([item["track"]["id"] for item in items], list(self.mock.tracks) * 2)
+        self.assertEqual(self.mock.calls["playlists/{id}/tracks"], 10)
+
+    def test_hydration(self):
+        items = list(self.spotrend.expand_playlist_items(self.playlist_id, hydrate=("artists", "albums")))
+        track = items[-1]["track"]
+        self.assertIn("popularity", track["artists"][0])
+        self.assertIn("total_tracks", track["album"])
+        self.assertEqual(self.mock.calls["artists"], 1)
+        self.assertEqual(self.mock.calls["albums"], 1)
+        with self.assertRaises(SpotrendInvalidDataError):
+            list(self.spotrend.expand_playlist_items(self.playlist_id, hydrate="genres"))
+
+    def test_pages_are_fetched_concurrently(self):
+        self.mock.latency = 0.05
+        start = time.perf_counter()
+        self.assertEqual(len(list(self.spotrend.expand_playlist_items(self.playlist_id, concurrency=9))), 1000)
+        # the first page, then the nine other pages in a single round-trip
+        self.assertLess(time.perf_counter() - start, 0.3)
+
+    def test_async(self):
+        from spotrend.aio import AsyncClient, AsyncSpotrend, aiohttp
+        if aiohttp is None:
+            self.skipTest("aiohttp is not installed")
+
+        async def expand():
+            async with AsyncSpotrend(client=AsyncClient(client=self.client)) as spotrend:
+                return [item async for item in spotrend.expand_playlist_items(self.playlist_id, hydrate="artists")]
+
+        items = asyncio.run(expand())
+        self.assertEqual([item["track"]["id"] for item in items], list(self.mock.tracks) * 2)
+        self.assertIn("popularity", items[0]["track"]["artists"][0])
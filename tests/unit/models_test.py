@@ -0,0 +1,84 @@
+import json
+import pickle
+import tracemalloc
+import unittest
+from unittest import mock
+from spotrend.models import *
+
+track = {
+    "id": "t1", "name": "Song", "uri": "spotify:track:t1", "type": "track", "popularity": 50,
+    "duration_ms": 200000, "explicit": False, "track_number": 1, "disc_number": 1, "is_local": False,
+    "available_markets": ["IT", "FR", "US"],
+    "external_urls": {"spotify": "https://open.spotify.com/track/t1"},
+    "album": {"id": "a1", "name": "Album", "type": "album", "album_type": "album", "available_markets": ["IT"]},
+    "artists": [{"id": "r1", "name": "Artist", "type": "artist"}],
+}
+
+
+class ModelsTest(unittest.TestCase):
+
+    def test_raw_round_trip(self):
+        model = parse(dict(track), "tracks")
+        self.assertIsInstance(model, Track)
+        self.assertEqual(model.raw, track)
+        self.assertEqual(pickle.loads(pickle.dumps(model)).raw, track)
+
+    def test_slots(self):
+        model = parse(dict(track), "tracks")
+        self.assertFalse(hasattr(model, "__dict__"))
+        self.assertEqual(model.duration_ms, 200000)
+        self.assertEqual(model.external_urls["spotify"], "https://open.spotify.com/track/t1")
+        with self.assertRaises(AttributeError):
+            model.name = "Other"
+        with self.assertRaises(AttributeError):
+            model.missing
+
+    def test_nested(self):
+        model = parse(dict(track), "tracks")
+        self.assertEqual(model.album.available_markets, ["IT"])
+        self.assertEqual(model.artists[0], Artist({"id": "r1"}))
+
+    def test_rest_is_decoded_once(self):
+        model = parse(dict(track), "tracks")
+        with mock.patch("spotrend.models.json.loads", wraps=json.loads) as loads:
+            for _ in range(3):
+                model.external_urls["spotify"]
+            model.album.name
+            model.artists
+            self.assertEqual(loads.call_count, 1)
+            model.release()
+            self.assertEqual(model.external_urls["spotify"], "https://open.spotify.com/track/t1")
+            self.assertEqual(loads.call_count, 2)
+        self.assertEqual(model.raw, track)
+
+    def test_markets(self):
+        mask = encode_markets(["IT", "FR"])
+        self.assertEqual(sorted(decode_markets(mask)), ["FR", "IT"])
+        self.assertEqual(decode_markets(encode_markets([])), [])
+
+    def test_interned_genres(self):
+        first = Artist({"id": "1", "genres": ["".join(["ro", "ck"])], "followers": {"href": None, "total": 3}})
+        second = Artist({"id": "2", "genres": ["".join(["ro", "ck"])]})
+        self.assertIs(first.genres[0], second.genres[0])
+        self.assertEqual(first.followers_total, 3)
+        self.assertEqual(first.raw["followers"], {"href": None, "total": 3})
+
+    def test_parse_passthrough(self):
+        audiobook = {"id": "b1"}
+        self.assertIs(parse(audiobook, "audiobooks"), audiobook)
+        self.assertIsNone(parse(None, "tracks"))
+
+    def test_measure(self):
+        payloads = [json.dumps(dict(track, id=f"t{i}", name=f"Song {i}")) for i in range(200)]
+        result = measure(payloads, "tracks")
+        self.assertEqual(result["entities"], 200)
+        self.assertGreater(result["ratio"], 1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_measure_keeps_the_trace_of_the_caller(self):
+        tracemalloc.start()
+        try:
+            measure([json.dumps(track)], "tracks")
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
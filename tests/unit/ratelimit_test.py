@@ -0,0 +1,55 @@
+import time
+import unittest
+from spotrend.client import *
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=100, capacity=5)
+        delays = [bucket.reserve() for _ in range(10)]
+        self.assertEqual(delays[:5], [0.0] * 5)
+        self.assertAlmostEqual(delays[9], 0.05, delta=0.01)
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=None)
+        self.assertEqual(bucket.reserve(), 0.0)
+        bucket.pause(0.5)
+        self.assertAlmostEqual(bucket.reserve(), 0.5, delta=0.05)
+
+    def test_acquire_sleeps(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_retry_delay(self):
+        limiter = RateLimiter(rate=None, max_retries=2, backoff_base=1, backoff_cap=4)
+        self.assertEqual(limiter.retry_delay(429, "3", 0), 3.0)
+        self.assertGreater(limiter.bucket.reserve(), 2.5)
+        self.assertLessEqual(limiter.retry_delay(503, None, 1), 2)
+        self.assertIsNone(limiter.retry_delay(503, None, 2))
+        self.assertIsNone(limiter.retry_delay(404, None, 0))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(RateLimiter.parse_retry_after("12"), 12.0)
+        self.assertIsNone(RateLimiter.parse_retry_after("soon"))
+        self.assertIsNone(RateLimiter.parse_retry_after(None))
+
+
+class StatusMappingTest(unittest.TestCase):
+
+    def test_errors(self):
+        for status, error in ((400, SpotrendInvalidDataError), (401, SpotrendAuthError),
+                              (403, SpotrendPermissionError), (404, SpotrendNotFoundError),
+                              (429, SpotrendQuotaError), (502, SpotrendServerError), (418, SpotrendRequestError)):
+            with self.assertRaises(error):
+                decode_response(status, b'{"error": {"status": 0, "message": "failure"}}')
+
+    def test_success(self):
+        self.assertEqual(decode_response(200, b'{"id": "a"}'), {"id": "a"})
+        self.assertEqual(decode_response(201, b""), {})
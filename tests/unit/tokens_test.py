@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from spotrend.tokens import *
+
+
+class TokenManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.folder.name, "token.json")
+        self.refreshes = 0
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def renew(self, token):
+        time.sleep(0.01)
+        self.refreshes += 1
+        return {"access_token": f"access{self.refreshes}", "expires_in": 3600}
+
+    def test_proactive_single_flight_refresh(self):
+        tokens = TokenManager(self.renew, self.token_file, margin=60)
+        tokens.update({"access_token": "old", "refresh_token": "refresh", "expires_in": 30})
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(tokens.access_token)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.refreshes, 1)
+        self.assertEqual(set(seen), {"access1"})
+        self.assertEqual(tokens.token["refresh_token"], "refresh")
+
+    def test_stale_refresh_is_skipped(self):
+        tokens = TokenManager(self.renew, None)
+        stale = tokens.update({"access_token": "old", "expires_in": 3600})
+        tokens.refresh(stale)
+        tokens.refresh(stale)
+        self.assertEqual(self.refreshes, 1)
+
+    def test_atomic_persistence(self):
+        tokens = TokenManager(self.renew, self.token_file)
+        tokens.update({"access_token": "saved", "expires_in": 3600})
+        self.assertEqual(os.listdir(self.folder.name), ["token.json"])
+        with open(self.token_file) as f:
+            self.assertEqual(json.load(f)["access_token"], "saved")
+        loaded = TokenManager(self.renew, self.token_file)
+        self.assertEqual(loaded.load()["expires_at"], tokens.token["expires_at"])
+        self.assertEqual(loaded.access_token, "saved")
+        self.assertEqual(self.refreshes, 0)
+
+    def test_legacy_token_file_is_refreshed(self):
+        with open(self.token_file, "w") as f:
+            json.dump({"access_token": "legacy", "refresh_token": "refresh", "expires_in": 3600}, f)
+        tokens = TokenManager(self.renew, self.token_file)
+        tokens.load()
+        self.assertTrue(tokens.expiring())
+        self.assertEqual(tokens.access_token, "access1")
+        self.assertEqual(tokens.token["refresh_token"], "refresh")
+        self.assertEqual(self.refreshes, 1)
@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+from spotrend.transport import *
+
+
+class TransportTest(unittest.TestCase):
+
+    def test_pool_configuration(self):
+        with Transport(pool_connections=4, pool_maxsize=32) as transport:
+            self.assertEqual(transport.adapter._pool_connections, 4)
+            self.assertEqual(transport.adapter._pool_maxsize, 32)
+            self.assertIs(transport.session.get_adapter("https://api.spotify.com"), transport.adapter)
+
+    def test_fan_out_fits_the_default_pool(self):
+        from spotrend.api import Spotrend
+        from spotrend.mock import MockSpotifyServer
+        with MockSpotifyServer(tracks=20, albums=5, artists=2) as server:
+            client = server.client()
+            try:
+                artist_id = next(iter(server.artists))
+                markets = [f"{first}{second}" for first in "ABCDEFG" for second in "ABCDEFG"]
+                with self.assertNoLogs("urllib3.connectionpool", "WARNING"):
+                    Spotrend(client=client).get_artist_top_tracks_by_market(artist_id, markets)
+            finally:
+                client.close()
+
+    def test_default_headers(self):
+        with Transport() as transport:
+            self.assertEqual(transport.session.headers["Accept-Encoding"], "gzip, deflate")
+            self.assertEqual(transport.session.headers["Connection"], "keep-alive")
+        with Transport(keep_alive=False, gzip=False) as transport:
+            self.assertEqual(transport.session.headers["Accept-Encoding"], "identity")
+            self.assertEqual(transport.session.headers["Connection"], "close")
+
+    def test_request_uses_timeouts(self):
+        transport = Transport(connect_timeout=1, read_timeout=2)
+        with mock.patch.object(transport.session, "request") as request:
+            transport.request("GET", "https://api.spotify.com/v1/markets")
+            request.assert_called_once_with(
+                "GET", "https://api.spotify.com/v1/markets", timeout=(1, 2))
+        transport.close()
+
+    def test_closed_transport(self):
+        transport = Transport()
+        transport.close()
+        transport.close()
+        with self.assertRaises(RuntimeError):
+            transport.request("GET", "https://api.spotify.com/v1/markets")
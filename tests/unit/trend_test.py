@@ -0,0 +1,55 @@
+import datetime
+import os
+import tempfile
+import unittest
+from spotrend.trend import *
+
+day = 86400
+start = 1700000000
+
+
+class TrendStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = TrendStore(self.path)
+        for offset, (first, second) in enumerate([(10, 50), (20, 45), (40, 44)]):
+            self.store.record([
+                {"id": "a", "popularity": first, "followers": {"total": first * 100}},
+                {"id": "b", "popularity": second},
+                None,
+            ], timestamp=start + offset * day)
+
+    def test_range(self):
+        times, values = self.store.range("a", start=start + day)
+        self.assertEqual(times.tolist(), [start + day, start + 2 * day])
+        self.assertEqual(values.tolist(), [20, 40])
+        self.assertEqual(self.store.range("b", "followers")[1].tolist(), [])
+        self.assertEqual(self.store.range("missing")[0].tolist(), [])
+
+    def test_top_movers(self):
+        self.assertEqual(self.store.top_movers(k=1), [("a", 10.0, 40.0, 30.0)])
+        self.assertEqual([entity for entity, *_ in self.store.top_movers(end=start + day, absolute=True)], ["a", "b"])
+        self.assertEqual(self.store.top_movers("followers")[0][3], 3000.0)
+
+    def test_reopen(self):
+        store = TrendStore(self.path)
+        store.record([{"id": "c", "popularity": 1}], timestamp=datetime.datetime(2023, 11, 17))
+        self.assertEqual(store.entities, ["a", "b", "c"])
+        self.assertEqual(len(store.load("popularity")[0]), 7)
+
+    def test_torn_write(self):
+        # an append interrupted after the time column, then a complete one
+        folder = os.path.join(self.path, to_day(start + 2 * day))
+        with open(os.path.join(folder, "popularity.time"), "ab") as f:
+            np.array([start + 2 * day + 1], dtype=columns["time"]).tofile(f)
+        with open(os.path.join(folder, "popularity.entity"), "ab") as f:
+            f.write(b"\x00\x00")
+        self.store.record([{"id": "a", "popularity": 41}], timestamp=start + 2 * day + 2)
+        times, values = self.store.range("a", start=start + 2 * day)
+        self.assertEqual(times.tolist(), [start + 2 * day, start + 2 * day + 2])
+        self.assertEqual(values.tolist(), [40, 41])
+
+    def test_unknown_metric(self):
+        with self.assertRaises(SpotrendInvalidDataError):
+            self.store.load("plays")